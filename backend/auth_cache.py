@@ -0,0 +1,280 @@
+"""Local verification and caching of Supabase access tokens.
+
+``get_current_user`` used to call ``supabase.auth.get_user(token)`` on every
+authenticated request, an extra GoTrue round trip before any real work.
+Supabase access tokens are JWTs, so they can be verified locally: with the
+project's JWT secret (HS256) or the public keys published at
+``/auth/v1/.well-known/jwks.json`` (asymmetric signing keys). Verified claims
+are kept in a bounded TTL+LRU cache keyed by the SHA-256 of the token, so
+repeat requests skip both the network and the signature check.
+
+Revocation: an entry never outlives ``AUTH_CACHE_TTL`` seconds (or the token's
+own ``exp``). ``TokenCache.invalidate``/``invalidate_user`` drop entries
+explicitly, and ``TokenCache.revoke`` additionally denylists a token until it
+expires so local verification rejects it too (used by logout).
+
+Every worker verifies tokens on its own, so a denylist in one process is not
+enough. With ``AUTH_REVOCATIONS_REDIS_URL`` set (or the content events or
+response cache Redis URL), ``SharedRevocations`` keeps revoked token hashes
+as Redis keys that expire with the token, checked before a token is
+verified, and announces each revocation on a pub/sub channel so the other
+workers drop it from their caches at once. A worker that loses the channel
+clears its cache when it resubscribes, so every token goes back through the
+Redis check.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import jwt
+
+from content_events import RedisTransport
+
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_LIFESPAN = float(os.getenv("SUPABASE_JWKS_LIFESPAN", "600"))
+AUTH_REVOCATIONS_REDIS_URL = (
+    os.getenv("AUTH_REVOCATIONS_REDIS_URL")
+    or os.getenv("CONTENT_EVENTS_REDIS_URL")
+    or os.getenv("RESPONSE_CACHE_REDIS_URL", "")
+)
+AUTH_REVOCATIONS_CHANNEL = os.getenv("AUTH_REVOCATIONS_CHANNEL", "auth-revocations")
+
+logger = logging.getLogger(__name__)
+
+_ASYMMETRIC_ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+
+class AuthUser:
+    """The subset of the GoTrue ``User`` object the handlers rely on."""
+
+    __slots__ = ("id", "email", "user_metadata", "app_metadata", "role", "claims")
+
+    def __init__(self, id: str, email: Optional[str] = None, user_metadata: Dict[str, Any] = None,
+                 app_metadata: Dict[str, Any] = None, role: Optional[str] = None, claims: Dict[str, Any] = None):
+        self.id = id
+        self.email = email
+        self.user_metadata = user_metadata or {}
+        self.app_metadata = app_metadata or {}
+        self.role = role
+        self.claims = claims or {}
+
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> "AuthUser":
+        return cls(
+            id=claims["sub"],
+            email=claims.get("email"),
+            user_metadata=claims.get("user_metadata"),
+            app_metadata=claims.get("app_metadata"),
+            role=claims.get("role"),
+            claims=claims,
+        )
+
+    @classmethod
+    def from_gotrue(cls, user) -> "AuthUser":
+        return cls(
+            id=user.id,
+            email=getattr(user, "email", None),
+            user_metadata=getattr(user, "user_metadata", None),
+            app_metadata=getattr(user, "app_metadata", None),
+            role=getattr(user, "role", None),
+        )
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def unverified_expiry(token: str) -> Optional[float]:
+    """``exp`` claim of a token whose signature was checked elsewhere."""
+    try:
+        return jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.PyJWTError:
+        return None
+
+
+class TokenCache:
+    """Bounded LRU of verified users with a per-entry deadline."""
+
+    def __init__(self, max_size: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[AuthUser]:
+        key = hash_token(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def put(self, token: str, user: AuthUser, token_exp: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        key = hash_token(token)
+        self._entries[key] = (expires_at, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, token: str):
+        self._entries.pop(hash_token(token), None)
+
+    def revoke(self, token: str, token_exp: Optional[float] = None) -> float:
+        """Drop the token and refuse it until it expires; returns when that is."""
+        return self.revoke_key(hash_token(token), token_exp)
+
+    def revoke_key(self, key: str, token_exp: Optional[float] = None) -> float:
+        """``revoke`` for a token known only by its ``hash_token``."""
+        self._entries.pop(key, None)
+        now = time.time()
+        self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+        expires_at = self._revoked[key] = token_exp or now + self.ttl
+        return expires_at
+
+    def is_revoked(self, token: str) -> bool:
+        expires_at = self._revoked.get(hash_token(token))
+        return expires_at is not None and expires_at > time.time()
+
+    def invalidate_user(self, user_id: str):
+        for key in [k for k, (_, user) in self._entries.items() if user.id == user_id]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "revoked": len(self._revoked),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SharedRevocations:
+    """Revoked tokens shared by every worker through a Redis-compatible server."""
+
+    def __init__(self, client, cache: TokenCache, prefix: str = "auth-revoked:", channel: str = AUTH_REVOCATIONS_CHANNEL):
+        self.client = client
+        self.cache = cache
+        self.prefix = prefix
+        self.transport = RedisTransport(client, channel)
+        self._connections = 0
+        self._listener = None
+        self.errors = 0
+
+    async def revoke(self, key: str, expires_at: float):
+        """Refuse the token on every worker until ``expires_at``."""
+        expires_in = max(1, math.ceil(expires_at - time.time()))
+        await self.client.set(self.prefix + key, "1", ex=expires_in)
+        await self.transport.publish(json.dumps({"key": key, "exp": expires_at}))
+
+    async def is_revoked(self, key: str) -> bool:
+        try:
+            return await self.client.get(self.prefix + key) is not None
+        except Exception:
+            # The local denylist and the tokens' expiry still apply
+            self.errors += 1
+            logger.warning("Could not check shared token revocations", exc_info=True)
+            return False
+
+    def receive(self, message: Any):
+        try:
+            revocation = json.loads(message)
+            self.cache.revoke_key(revocation["key"], revocation["exp"])
+        except Exception:
+            self.errors += 1
+            logger.warning("Ignoring malformed token revocation", exc_info=True)
+
+    def _connected(self):
+        self._connections += 1
+        if self._connections > 1:
+            # Revocations sent while the listener was away are lost; make
+            # every token pass is_revoked() again
+            self.cache.clear()
+
+    def start(self):
+        if self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self.transport.listen(self.receive, self._connected))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+def create_shared_revocations(cache: TokenCache) -> Optional[SharedRevocations]:
+    if not AUTH_REVOCATIONS_REDIS_URL:
+        return None
+    import redis.asyncio as redis
+
+    return SharedRevocations(redis.from_url(AUTH_REVOCATIONS_REDIS_URL), cache)
+
+
+class TokenVerifier:
+    """Verifies access tokens locally, falling back to GoTrue when it cannot."""
+
+    def __init__(self, supabase_url: Optional[str], jwt_secret: Optional[str] = None):
+        self.jwt_secret = jwt_secret
+        self._jwks_client = None
+        if supabase_url:
+            self._jwks_client = jwt.PyJWKClient(
+                f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json",
+                cache_keys=True,
+                lifespan=JWKS_LIFESPAN,
+                timeout=5,
+            )
+
+    def can_verify(self, token: str) -> bool:
+        """Whether ``verify`` has key material for this token's algorithm."""
+        try:
+            algorithm = jwt.get_unverified_header(token).get("alg")
+        except jwt.PyJWTError:
+            return False
+        if algorithm == "HS256":
+            return bool(self.jwt_secret)
+        return algorithm in _ASYMMETRIC_ALGORITHMS and self._jwks_client is not None
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Check signature, expiry and audience; return the claims.
+
+        May fetch the JWKS on a cold cache, so call it off the event loop.
+        """
+        algorithm = jwt.get_unverified_header(token).get("alg")
+        if algorithm == "HS256":
+            key = self.jwt_secret
+        else:
+            key = self._jwks_client.get_signing_key_from_jwt(token).key
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=JWT_AUDIENCE,
+            options={"require": ["exp", "sub"]},
+        )
@@ -0,0 +1,253 @@
+"""Content-change events: one place every catalog write is announced.
+
+The facet catalog, totals cache, response cache and in-memory search index
+all hold views of ``content``. Each write path used to update them by hand,
+and only on the worker that made the write; the others kept serving the old
+catalog until their own TTLs ran out. Writes now ``publish`` a change to a
+``ContentEventBus`` instead, and each view subscribes to it:
+
+* Subscribers on the writing worker run synchronously inside ``publish``, so
+  the response to the write and every later request on that worker already
+  see it. A failing subscriber is counted and logged, not raised to the
+  writer.
+* With ``CONTENT_EVENTS_REDIS_URL`` set (or ``RESPONSE_CACHE_REDIS_URL``,
+  if the response cache already shares a Redis server), changes are also
+  sent on a pub/sub channel to every other worker. They are batched for
+  ``CONTENT_EVENTS_FLUSH_SECONDS``, so a bulk import sends a few messages
+  rather than one per row. The rows travel with the batch while it has at
+  most ``CONTENT_EVENTS_MAX_ROWS`` of them; above that only ids are sent and
+  subscribers drop their whole view instead of patching it.
+* Other workers therefore drop stale entries within the flush interval plus
+  the pub/sub round trip. A listener that loses its connection resubscribes
+  and delivers a ``resync`` change, since messages sent while it was away
+  are gone. The views' own refresh TTLs remain a backstop if Redis is down.
+
+Without a Redis URL the bus only dispatches locally, as before.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+CONTENT_EVENTS_REDIS_URL = os.getenv("CONTENT_EVENTS_REDIS_URL") or os.getenv("RESPONSE_CACHE_REDIS_URL", "")
+CONTENT_EVENTS_CHANNEL = os.getenv("CONTENT_EVENTS_CHANNEL", "content-events")
+CONTENT_EVENTS_FLUSH_SECONDS = float(os.getenv("CONTENT_EVENTS_FLUSH_SECONDS", "0.05"))
+CONTENT_EVENTS_MAX_ROWS = int(os.getenv("CONTENT_EVENTS_MAX_ROWS", "100"))
+CONTENT_EVENTS_RETRY_SECONDS = float(os.getenv("CONTENT_EVENTS_RETRY_SECONDS", "1"))
+
+# saved: rows were inserted or updated; deleted: rows were removed;
+# resync: changes may have been missed, drop everything
+CHANGE_KINDS = ("saved", "deleted", "resync")
+
+logger = logging.getLogger(__name__)
+
+
+class ContentChange:
+    """One write to ``content``.
+
+    ``rows`` are the written rows, or None when a remote batch was too large
+    to carry them; ``ids`` is always set. ``previous`` is the row before an
+    update, known only on the writing worker. ``local`` is False for changes
+    received from another worker.
+    """
+
+    __slots__ = ("kind", "rows", "ids", "previous", "local")
+
+    def __init__(
+        self,
+        kind: str,
+        rows: Optional[List[dict]],
+        ids: Optional[List[str]] = None,
+        previous: Optional[dict] = None,
+        local: bool = True,
+    ):
+        self.kind = kind
+        self.rows = rows
+        self.ids = ids if ids is not None else [row["id"] for row in rows or ()]
+        self.previous = previous
+        self.local = local
+
+
+Subscriber = Callable[[ContentChange], None]
+
+
+class RedisTransport:
+    """Fan-out through a Redis pub/sub channel."""
+
+    def __init__(self, client, channel: str = CONTENT_EVENTS_CHANNEL, retry_seconds: float = CONTENT_EVENTS_RETRY_SECONDS):
+        self.client = client
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+
+    async def publish(self, message: str):
+        await self.client.publish(self.channel, message)
+
+    async def listen(self, deliver: Callable[[bytes], None], connected: Callable[[], None]):
+        """Pass each message to ``deliver`` until cancelled, resubscribing after errors."""
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                connected()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        deliver(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Content event channel lost; resubscribing", exc_info=True)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(self.retry_seconds)
+
+
+class ContentEventBus:
+    """Dispatches content changes to this worker's subscribers and to other workers."""
+
+    def __init__(
+        self,
+        transport: Optional[RedisTransport] = None,
+        flush_seconds: float = CONTENT_EVENTS_FLUSH_SECONDS,
+        max_rows: int = CONTENT_EVENTS_MAX_ROWS,
+    ):
+        self.transport = transport
+        self.flush_seconds = flush_seconds
+        self.max_rows = max_rows
+        # Tells this worker's own messages apart when they come back
+        self.worker_id = uuid.uuid4().hex
+        self.subscribers: List[Subscriber] = []
+        self._outbox: List[ContentChange] = []
+        self._flushing: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._connections = 0
+        self.published = 0
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+
+    def subscribe(self, subscriber: Subscriber) -> Subscriber:
+        """Call ``subscriber(change)`` for every change; usable as a decorator."""
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def publish(self, kind: str, rows: List[dict], previous: Optional[dict] = None):
+        """Announce a write made by this worker."""
+        change = ContentChange(kind, list(rows), previous=previous)
+        self.published += 1
+        self._dispatch(change)
+        if self.transport is not None:
+            self._outbox.append(change)
+            self._schedule_flush()
+
+    def _dispatch(self, change: ContentChange):
+        for subscriber in self.subscribers:
+            try:
+                subscriber(change)
+            except Exception:
+                self.errors += 1
+                logger.exception("Content event subscriber %r failed", subscriber)
+
+    # Fan-out
+
+    def _schedule_flush(self):
+        if self._flushing is not None and not self._flushing.done():
+            return
+        try:
+            self._flushing = asyncio.get_running_loop().create_task(self._flush(self.flush_seconds))
+        except RuntimeError:
+            # Published outside an event loop (scripts); nothing to send with
+            self._outbox.clear()
+
+    async def _flush(self, delay: float):
+        while self._outbox:
+            await asyncio.sleep(delay)
+            changes, self._outbox = self._outbox, []
+            try:
+                await self.transport.publish(self.encode(changes))
+                self.sent += 1
+            except Exception:
+                # Other workers catch up through their refresh TTLs
+                self.errors += 1
+                logger.warning("Could not send %d content changes", len(changes), exc_info=True)
+
+    def encode(self, changes: List[ContentChange]) -> str:
+        with_rows = sum(len(change.rows) for change in changes) <= self.max_rows
+        return json.dumps({
+            "origin": self.worker_id,
+            "changes": [
+                {"kind": change.kind, "ids": change.ids, "rows": change.rows if with_rows else None}
+                for change in changes
+            ],
+        }, separators=(",", ":"), default=str)
+
+    def receive(self, message: Any):
+        """Dispatch a batch sent by another worker; this worker's own are ignored."""
+        try:
+            batch = json.loads(message)
+            if batch["origin"] == self.worker_id:
+                return
+            changes = [
+                ContentChange(change["kind"], change["rows"], change["ids"], local=False)
+                for change in batch["changes"]
+                if change["kind"] in CHANGE_KINDS
+            ]
+        except Exception:
+            self.errors += 1
+            logger.warning("Ignoring malformed content event", exc_info=True)
+            return
+        self.received += 1
+        for change in changes:
+            self._dispatch(change)
+
+    def _connected(self):
+        self._connections += 1
+        if self._connections > 1:
+            # Whatever was sent while the listener was away is lost
+            self._dispatch(ContentChange("resync", None, [], local=False))
+
+    def start(self):
+        """Start listening for other workers' changes (needs a running loop)."""
+        if self.transport is not None and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self.transport.listen(self.receive, self._connected))
+
+    async def stop(self):
+        """Send anything still batched and stop listening."""
+        if self._flushing is not None and not self._flushing.done():
+            self._flushing.cancel()
+            try:
+                await self._flushing
+            except asyncio.CancelledError:
+                pass
+            if self._outbox:
+                await self._flush(0)
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "published": self.published,
+            "sent": self.sent,
+            "received": self.received,
+            "errors": self.errors,
+            "pending": len(self._outbox),
+            "fan_out": self.transport is not None,
+        }
+
+
+def create_content_events() -> ContentEventBus:
+    transport = None
+    if CONTENT_EVENTS_REDIS_URL:
+        import redis.asyncio as redis
+
+        transport = RedisTransport(redis.from_url(CONTENT_EVENTS_REDIS_URL))
+    return ContentEventBus(transport)
@@ -0,0 +1,19 @@
+"""Content columns and file formats shared by import and export.
+
+Kept apart from ``importer`` so the API can validate uploads and declare
+its routes without loading pandas; the import engine is only imported when
+an import actually runs.
+"""
+
+IMPORT_EXTENSIONS = (".csv", ".xlsx", ".xls", ".jsonl", ".ndjson", ".parquet", ".arrow", ".arrows", ".feather")
+JSONL_EXTENSIONS = (".jsonl", ".ndjson")
+ARROW_IPC_EXTENSIONS = (".arrow", ".arrows", ".feather")
+REQUIRED_FIELDS = ["title", "year", "country", "content_type", "synopsis", "rating"]
+FINGERPRINT_FIELDS = ["title", "original_title", "year", "country", "content_type"]
+# Columns an import writes, besides ``id``
+IMPORTED_FIELDS = [
+    "title", "original_title", "synopsis", "year", "country", "content_type", "rating", "poster_url",
+    "banner_url", "episodes", "duration", "genres", "streaming_platforms", "tags", "cast", "crew",
+]
+IMPORT_MODES = ("insert", "upsert")
+IMPORT_MODE_PATTERN = "^(" + "|".join(IMPORT_MODES) + ")$"
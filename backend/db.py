@@ -0,0 +1,116 @@
+"""Non-blocking access to the Supabase client.
+
+The supabase-py query builders are synchronous: ``.execute()`` performs an HTTP
+round trip on the calling thread. Running that directly inside an ``async def``
+handler stalls the whole event loop, so every request on the worker waits for
+the slowest PostgREST call. All database work goes through this module instead,
+which offloads the blocking call to a bounded thread pool and puts a deadline
+on every call.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from typing import Optional
+
+import httpx
+
+# Upper bound on concurrent PostgREST/GoTrue calls per worker
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "16"))
+# Per-call deadline in seconds
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "15"))
+# PostgREST caps un-ranged selects at max-rows (1000 on hosted Supabase)
+POSTGREST_MAX_ROWS = int(os.getenv("POSTGREST_MAX_ROWS", "1000"))
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="supabase")
+    return _executor
+
+
+class QueryStats:
+    """Number of PostgREST queries issued while handling one request."""
+
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def begin_query_stats() -> QueryStats:
+    """Start counting queries for the current request."""
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+class QueryTimeout(TimeoutError):
+    """Raised when a database call does not finish within its deadline."""
+
+
+# SQLSTATE classes/codes and PostgREST codes worth retrying: connection
+# failures, serialization failures and deadlocks, statement timeouts,
+# too many connections, and PostgREST's pool and schema-cache errors
+TRANSIENT_SQLSTATE_PREFIXES = ("08", "40", "53", "57P")
+TRANSIENT_CODES = {"57014", "PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether retrying the same database call later may succeed."""
+    if isinstance(error, (QueryTimeout, httpx.TransportError)):
+        return True
+    code = str(getattr(error, "code", None) or "")
+    return code in TRANSIENT_CODES or code.startswith(TRANSIENT_SQLSTATE_PREFIXES)
+
+
+async def run_sync(fn, *args, timeout: float = None, **kwargs):
+    """Run a blocking client call on the database thread pool."""
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout or DB_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise QueryTimeout(f"Database call timed out after {timeout or DB_TIMEOUT}s")
+
+
+async def execute(query, timeout: float = None):
+    """Execute a PostgREST query builder without blocking the event loop."""
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+    return await run_sync(query.execute, timeout=timeout)
+
+
+async def fetch_all(build_query, page_size: int = POSTGREST_MAX_ROWS):
+    """Read every row of a query, one ``range()`` page per request.
+
+    ``build_query`` returns a fresh, ordered query builder for each page.
+    """
+    rows = []
+    offset = 0
+    while True:
+        page = await execute(build_query().range(offset, offset + page_size - 1))
+        rows.extend(page.data)
+        if len(page.data) < page_size:
+            return rows
+        offset += page_size
+
+
+def shutdown():
+    """Stop accepting new database work and release the pool threads."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,209 @@
+"""Streaming catalog export.
+
+``/api/admin/content/export`` writes the whole (optionally filtered)
+``content`` table as CSV, JSONL or Parquet without holding it in memory.
+Rows are read in ``EXPORT_PAGE_ROWS`` keyset pages ordered by ``id`` (the
+primary key index, so every page costs the same however deep it is, and no
+``count`` query is needed), encoded page by page, and handed to a
+``StreamingResponse`` as they are ready. The next page is fetched while the
+current one is encoded, so peak memory is about two pages plus one Parquet
+row group, whatever the catalog size.
+
+Exports use the same columns and cell formats the importer reads: CSV
+joins ``genres``/``tags``/``streaming_platforms`` with commas and writes
+``cast``/``crew`` as JSON; Parquet stores the lists as ``list<string>``.
+``cast``/``crew`` are free-form JSONB, so Parquet keeps them as JSON text
+rather than guessing a struct schema per page.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import zlib
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from content_fields import IMPORTED_FIELDS
+from db import POSTGREST_MAX_ROWS
+
+# Rows per keyset page; PostgREST's max-rows caps it anyway
+EXPORT_PAGE_ROWS = int(os.getenv("EXPORT_PAGE_ROWS", str(POSTGREST_MAX_ROWS)))
+# Rows per Parquet row group, buffered before they are written
+EXPORT_ROW_GROUP_ROWS = int(os.getenv("EXPORT_ROW_GROUP_ROWS", "10000"))
+
+EXPORTED_FIELDS = ["id", *IMPORTED_FIELDS, "created_at", "updated_at"]
+LIST_FIELDS = ("genres", "streaming_platforms", "tags")
+JSON_FIELDS = ("cast", "crew")
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_FORMAT_PATTERN = "^(" + "|".join(EXPORT_FORMATS) + ")$"
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# (id of the last row already read or None, page size) -> next rows by id
+FetchPage = Callable[[Optional[str], int], Awaitable[List[dict]]]
+
+
+class CsvEncoder:
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.header = False
+
+    def _cell(self, field: str, value):
+        if value is None:
+            return ""
+        if field in LIST_FIELDS:
+            return ",".join(str(item) for item in value)
+        if field in JSON_FIELDS:
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    def encode(self, rows: List[dict]) -> bytes:
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        if not self.header:
+            self.writer.writerow(EXPORTED_FIELDS)
+            self.header = True
+        self.writer.writerows([self._cell(field, row.get(field)) for field in EXPORTED_FIELDS] for row in rows)
+        return self.buffer.getvalue().encode()
+
+    def close(self) -> bytes:
+        # An empty export still gets its header
+        return b"" if self.header else self.encode([])
+
+
+class JsonlEncoder:
+    def encode(self, rows: List[dict]) -> bytes:
+        lines = [json.dumps({field: row.get(field) for field in EXPORTED_FIELDS}, ensure_ascii=False, default=str) for row in rows]
+        return "".join(line + "\n" for line in lines).encode()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class _ByteSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last ``take``.
+
+    ``tell`` keeps counting from the start of the file, which the Parquet
+    writer needs for the offsets in its footer.
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+class ParquetEncoder:
+    def __init__(self, row_group_rows: Optional[int] = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        text, integer, strings = pa.string(), pa.int32(), pa.list_(pa.string())
+        types = {"year": integer, "episodes": integer, "duration": integer, "rating": pa.float64()}
+        types.update((field, strings) for field in LIST_FIELDS)
+        self.schema = pa.schema([(field, types.get(field, text)) for field in EXPORTED_FIELDS])
+        self.sink = _ByteSink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+        self.row_group_rows = row_group_rows or EXPORT_ROW_GROUP_ROWS
+        self.buffered: List[dict] = []
+
+    def _row(self, row: dict) -> dict:
+        values = {field: row.get(field) for field in EXPORTED_FIELDS}
+        for field in JSON_FIELDS:
+            if values[field] is not None:
+                values[field] = json.dumps(values[field], ensure_ascii=False)
+        for field in ("created_at", "updated_at"):
+            if values[field] is not None:
+                values[field] = str(values[field])
+        return values
+
+    def _write(self):
+        if self.buffered:
+            self.writer.write_table(self.pa.Table.from_pylist(self.buffered, schema=self.schema))
+            self.buffered = []
+
+    def encode(self, rows: List[dict]) -> bytes:
+        self.buffered.extend(self._row(row) for row in rows)
+        if len(self.buffered) >= self.row_group_rows:
+            self._write()
+        return self.sink.take()
+
+    def close(self) -> bytes:
+        self._write()
+        self.writer.close()
+        return self.sink.take()
+
+
+ENCODERS = {"csv": CsvEncoder, "jsonl": JsonlEncoder, "parquet": ParquetEncoder}
+
+
+def export_filename(export_format: str, compress: bool, stamp: str) -> str:
+    return f"catalog-{stamp}.{export_format}" + (".gz" if compress else "")
+
+
+async def export_pages(fetch: FetchPage, page_rows: Optional[int] = None, first: Optional[List[dict]] = None) -> AsyncIterator[List[dict]]:
+    """Every row ``fetch`` returns, one keyset page at a time.
+
+    The next page is requested before the current one is yielded. Reading
+    stops at the first empty page rather than a short one, so a PostgREST
+    max-rows lower than ``page_rows`` cannot end the export early.
+    """
+    page_rows = page_rows or EXPORT_PAGE_ROWS
+    page = first if first is not None else await fetch(None, page_rows)
+    following = None
+    try:
+        while page:
+            following = asyncio.ensure_future(fetch(page[-1]["id"], page_rows))
+            yield page
+            page = await following
+            following = None
+    finally:
+        if following is not None:
+            following.cancel()
+
+
+async def encode_stream(pages: AsyncIterator[List[dict]], export_format: str, compress: bool = False) -> AsyncIterator[bytes]:
+    """Encode ``pages`` as ``export_format``, optionally gzipped.
+
+    Encoding runs in the default executor so a large page does not stall
+    other requests on the worker.
+    """
+    loop = asyncio.get_running_loop()
+    encoder = await loop.run_in_executor(None, ENCODERS[export_format])
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(rows: Optional[List[dict]]) -> bytes:
+        data = encoder.encode(rows) if rows is not None else encoder.close()
+        if compressor is None:
+            return data
+        return compressor.compress(data) + (compressor.flush() if rows is None else b"")
+
+    async with aclosing(pages):
+        async for rows in pages:
+            data = await loop.run_in_executor(None, encode, rows)
+            if data:
+                yield data
+    data = await loop.run_in_executor(None, encode, None)
+    if data:
+        yield data
@@ -0,0 +1,139 @@
+"""Facet catalog: distinct countries, genres and content types with counts.
+
+``/api/countries``, ``/api/genres`` and ``/api/content-types`` used to pull a
+column for every row of ``content`` and dedupe it in Python on each call. The
+catalog keeps ``facet -> value -> count`` in memory instead, loaded from the
+``content_facets`` table (maintained by triggers, see ``supabase_schema.sql``)
+and adjusted incrementally by this worker's own content writes. Writes made
+by other workers arrive through ``content_events`` and force a reload; it
+also reloads after ``FACET_REFRESH_SECONDS`` in case one was missed.
+
+A write that lands while a load is reading may or may not be in what it
+reads, and counts cannot be patched twice safely, so such a load is
+thrown away and retried, up to ``FACET_LOAD_ATTEMPTS`` times.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+FACET_REFRESH_SECONDS = float(os.getenv("FACET_REFRESH_SECONDS", "300"))
+FACET_LOAD_ATTEMPTS = int(os.getenv("FACET_LOAD_ATTEMPTS", "3"))
+
+# facet name -> content column; "genres" is an array column
+FACETS = {
+    "country": "country",
+    "genres": "genres",
+    "content_type": "content_type",
+}
+
+LoadRows = Callable[[], Awaitable[List[dict]]]
+
+
+def _values(row: dict, facet: str) -> List[str]:
+    value = row.get(FACETS[facet])
+    if not value:
+        return []
+    if isinstance(value, list):
+        # Count each genre once per title
+        return [v for v in dict.fromkeys(value) if v]
+    return [value]
+
+
+class FacetCatalog:
+    """In-memory facet counts with a change version for ETags."""
+
+    def __init__(self, refresh_seconds: float = FACET_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.counts: Dict[str, Counter] = {facet: Counter() for facet in FACETS}
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self._etags: Dict[tuple, str] = {}
+        self._lock = asyncio.Lock()
+        # Writes and invalidations seen while a load runs
+        self._writes_during_load: Optional[int] = None
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.time() - self.loaded_at > self.refresh_seconds
+
+    async def ensure_loaded(self, load_facet_rows: LoadRows, load_content_rows: LoadRows):
+        """Load from the backing table, or scan ``content`` if it is empty."""
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if not self.is_stale():
+                return
+            for _ in range(max(1, FACET_LOAD_ATTEMPTS)):
+                self._writes_during_load = 0
+                try:
+                    counts = await self._read(load_facet_rows, load_content_rows)
+                    raced = self._writes_during_load > 0
+                finally:
+                    self._writes_during_load = None
+                if not raced:
+                    break
+            if counts != self.counts:
+                self.counts = counts
+                self.version += 1
+            # Still racing writes after the last attempt: serve these counts,
+            # but read again on the next access
+            self.loaded_at = None if raced else time.time()
+
+    @staticmethod
+    async def _read(load_facet_rows: LoadRows, load_content_rows: LoadRows) -> Dict[str, Counter]:
+        counts = {facet: Counter() for facet in FACETS}
+        facet_rows = await load_facet_rows()
+        if facet_rows:
+            for row in facet_rows:
+                if row["facet"] in counts and row["count"] > 0:
+                    counts[row["facet"]][row["value"]] = row["count"]
+        else:
+            for row in await load_content_rows():
+                for facet in FACETS:
+                    counts[facet].update(_values(row, facet))
+        return counts
+
+    def add(self, rows: Iterable[dict]):
+        self._apply(rows, 1)
+
+    def remove(self, rows: Iterable[dict]):
+        self._apply(rows, -1)
+
+    def invalidate(self):
+        """Force a reload on next access, e.g. after an out-of-band write."""
+        self.loaded_at = None
+        if self._writes_during_load is not None:
+            self._writes_during_load += 1
+
+    def _apply(self, rows: Iterable[dict], sign: int):
+        if self._writes_during_load is not None:
+            self._writes_during_load += 1
+        changed = False
+        for row in rows:
+            for facet in FACETS:
+                for value in _values(row, facet):
+                    counter = self.counts[facet]
+                    counter[value] += sign
+                    if counter[value] <= 0:
+                        del counter[value]
+                    changed = True
+        if changed:
+            self.version += 1
+
+    def values(self, facet: str) -> List[str]:
+        return sorted(self.counts[facet])
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {facet: dict(sorted(counter.items())) for facet, counter in self.counts.items()}
+
+    def etag(self, facet: Optional[str] = None) -> str:
+        key = (facet, self.version)
+        if key not in self._etags:
+            # Derived from the counts, not the version, so workers with the
+            # same data hand out the same validator
+            source = repr(self.snapshot() if facet is None else sorted(self.counts[facet].items()))
+            self._etags = {k: v for k, v in self._etags.items() if k[1] == self.version}
+            self._etags[key] = 'W/"%s"' % hashlib.md5(source.encode()).hexdigest()[:16]
+        return self._etags[key]
@@ -0,0 +1,170 @@
+"""Precomputed homepage rails for ``/api/content/featured``.
+
+Every homepage render asks for several rails (trending, new releases, top
+rated, a couple of countries), and each was an ``order().limit()`` query of
+its own. The rails are now built together into an in-memory snapshot: the
+top ``FEATURED_RAIL_SIZE`` titles of "trending", "new_releases",
+"top_rated" and "by_country" for every country in the facet catalog.
+Serving a rail is a dictionary lookup and a slice; each ``(rail, limit)``
+body and its ETag are rendered once per snapshot.
+
+The first request builds the snapshot (startup does no database work).
+From then on a background task rebuilds it every ``FEATURED_REFRESH_SECONDS``,
+and ``FEATURED_DEBOUNCE_SECONDS`` after a content write, so a bulk import
+triggers one rebuild rather than one per chunk. Requests keep getting the
+previous snapshot while a rebuild runs, and its age is sent with every
+response. Without the task (tests, scripts), a request that finds the
+snapshot stale or behind a write rebuilds it first.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+FEATURED_REFRESH_SECONDS = float(os.getenv("FEATURED_REFRESH_SECONDS", "300"))
+FEATURED_DEBOUNCE_SECONDS = float(os.getenv("FEATURED_DEBOUNCE_SECONDS", "1"))
+# The endpoint's largest limit
+FEATURED_RAIL_SIZE = int(os.getenv("FEATURED_RAIL_SIZE", "50"))
+
+RAIL_CATEGORIES = ("trending", "new_releases", "top_rated")
+
+RailKey = Tuple[str, Optional[str]]
+LoadRail = Callable[[str, Optional[str], int], Awaitable[List[dict]]]
+LoadCountries = Callable[[], Awaitable[List[str]]]
+
+logger = logging.getLogger(__name__)
+
+
+def rail_key(category: str, country: Optional[str]) -> Optional[RailKey]:
+    """Snapshot key for a request, or None if it is not a precomputed rail."""
+    if category in RAIL_CATEGORIES:
+        return category, None
+    if category == "by_country" and country:
+        return category, country
+    return None
+
+
+class FeaturedRails:
+    """Snapshot of every rail, swapped in whole when rebuilt."""
+
+    def __init__(
+        self,
+        refresh_seconds: float = FEATURED_REFRESH_SECONDS,
+        debounce_seconds: float = FEATURED_DEBOUNCE_SECONDS,
+        rail_size: int = FEATURED_RAIL_SIZE,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.debounce_seconds = debounce_seconds
+        self.rail_size = rail_size
+        self.rails: Optional[Dict[RailKey, List[dict]]] = None
+        self.built_at: Optional[float] = None
+        # Bumped by every write; a rebuild is current only if it started
+        # after the last one
+        self.generation = 0
+        self.built_generation = 0
+        self._rendered: Dict[Tuple[RailKey, int], Tuple[str, str]] = {}
+        self._lock = asyncio.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.rebuilds = 0
+        self.errors = 0
+
+    def age(self) -> Optional[float]:
+        return None if self.built_at is None else time.time() - self.built_at
+
+    def is_current(self) -> bool:
+        return (
+            self.rails is not None
+            and self.built_generation == self.generation
+            and self.age() <= self.refresh_seconds
+        )
+
+    async def ensure_loaded(self, load_rail: LoadRail, load_countries: LoadCountries):
+        """Build the snapshot now if there is none, or if no task keeps it current."""
+        if self.rails is not None and (self._task is not None or self.is_current()):
+            return
+        async with self._lock:
+            if self.rails is not None and (self._task is not None or self.is_current()):
+                return
+            await self._rebuild(load_rail, load_countries)
+
+    async def _rebuild(self, load_rail: LoadRail, load_countries: LoadCountries):
+        generation = self.generation
+        countries = await load_countries()
+        keys = [(category, None) for category in RAIL_CATEGORIES] + [("by_country", country) for country in countries]
+        rows = await asyncio.gather(*(load_rail(category, country, self.rail_size) for category, country in keys))
+        self.rails = dict(zip(keys, rows))
+        self._rendered = {}
+        self.built_at = time.time()
+        self.built_generation = generation
+        self.rebuilds += 1
+
+    def rail(self, key: RailKey, limit: int) -> List[dict]:
+        # A country with no titles has an empty rail
+        return self.rails.get(key, [])[:limit]
+
+    def rendered(self, key: RailKey, limit: int, render: Callable[[List[dict]], Tuple[str, str]]) -> Tuple[str, str]:
+        """``render(rows)`` for a rail, computed once per snapshot."""
+        memo_key = (key, limit)
+        if memo_key not in self._rendered:
+            self._rendered[memo_key] = render(self.rail(key, limit))
+        return self._rendered[memo_key]
+
+    def changed(self):
+        """Content was written; rebuild soon."""
+        self.generation += 1
+        if self._wake is not None:
+            self._wake.set()
+
+    # Scheduler
+
+    def start(self, load_rail: LoadRail, load_countries: LoadCountries):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run(load_rail, load_countries))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+
+    async def _run(self, load_rail: LoadRail, load_countries: LoadCountries):
+        while True:
+            wait = None
+            if self.rails is not None and not self.is_current():
+                try:
+                    async with self._lock:
+                        await self._rebuild(load_rail, load_countries)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # Keep serving the previous snapshot; try again next tick
+                    self.errors += 1
+                    wait = self.refresh_seconds
+                    logger.warning("Featured rails rebuild failed", exc_info=True)
+            if wait is None:
+                wait = self.refresh_seconds if self.rails is None else max(0.0, self.refresh_seconds - self.age())
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                continue
+            # Let a burst of writes settle into one rebuild
+            await asyncio.sleep(self.debounce_seconds)
+            self._wake.clear()
+
+    def stats(self) -> dict:
+        age = self.age()
+        return {
+            "rails": 0 if self.rails is None else len(self.rails),
+            "age_seconds": None if age is None else round(age, 1),
+            "current": self.is_current(),
+            "rebuilds": self.rebuilds,
+            "errors": self.errors,
+            "scheduled": self._task is not None,
+        }
@@ -0,0 +1,89 @@
+"""HTTP validators and Cache-Control policies for public catalog responses.
+
+Content detail pages and the homepage rails were sent in full on every
+navigation, ``cast``/``crew`` included, even when nothing had changed. Cached
+catalog responses now carry an ``ETag`` and a per-route ``Cache-Control``,
+and a request whose ``If-None-Match`` still matches gets an empty 304:
+
+* ``/api/content/{id}`` has a strong ETag built from the title's id and
+  ``updated_at``, which every content write sets.
+* List and facet endpoints have weak ETags: a digest of the rendered body,
+  or of the facet counts. Weak because equivalent lists may be rendered
+  differently, e.g. with a planned rather than an exact total.
+
+The body is rendered and its ETag computed once, when the response cache
+loads it, so a conditional request that hits the cache is answered without
+serializing anything or querying Supabase.
+
+Each route's policy is ``CACHE_CONTROL_<ROUTE>`` (``CONTENT``, ``SEARCH``,
+``FEATURED``, ``TRENDING``, ``SIMILAR``, ``FACETS``) if set, else the default
+below; ``FACET_CACHE_CONTROL`` is still honoured for facets.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+CACHE_CONTROL_DEFAULTS = {
+    "content": "public, max-age=60",
+    "search": "public, max-age=30",
+    "featured": "public, max-age=60",
+    "trending": "public, max-age=60",
+    "similar": "public, max-age=300",
+    "facets": os.getenv("FACET_CACHE_CONTROL", "public, max-age=60"),
+}
+CACHE_CONTROL = {
+    route: os.getenv("CACHE_CONTROL_" + route.upper(), default)
+    for route, default in CACHE_CONTROL_DEFAULTS.items()
+}
+
+
+def _digest(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest()[:16]
+
+
+def render_json(value: Any) -> str:
+    """``value`` as FastAPI's JSONResponse would send it."""
+    return json.dumps(jsonable_encoder(value), ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def weak_etag(source: str) -> str:
+    return 'W/"%s"' % _digest(source)
+
+
+def content_etag(row: dict, body: str) -> str:
+    """Strong ETag for one title, from its id and last update."""
+    if row.get("updated_at"):
+        return '"%s"' % _digest("%s:%s" % (row["id"], row["updated_at"]))
+    # Rows written before updated_at existed
+    return '"%s"' % _digest(body)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match uses, against a list of tags or ``*``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def validated_response(body: Optional[str], etag: str, route: str) -> Response:
+    """``body`` with its validator and policy; None for an empty 304."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL[route]}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def conditional_response(if_none_match: Optional[str], body: str, etag: str, route: str) -> Response:
+    """304 if the client's copy is current, else ``body``."""
+    return validated_response(None if etag_matches(if_none_match, etag) else body, etag, route)
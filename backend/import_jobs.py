@@ -0,0 +1,410 @@
+"""Background bulk-import jobs.
+
+A large upload used to hold ``/api/admin/bulk-import`` open for the whole
+import, and a dropped connection lost the work halfway. The upload is now
+spooled under ``IMPORT_JOB_DIR`` and imported by an asyncio task in the
+worker that accepted it, while the client follows its progress.
+
+Progress is committed per ``IMPORT_CHUNK_ROWS`` chunk. Inserts run
+``IMPORT_WORKERS`` batches at a time across chunk boundaries; a chunk counts
+as committed once its batches and every batch sent before them have
+finished, and only committed chunks are added to the saved report and
+``processed_rows``. Resuming reads the file again from ``processed_rows``.
+
+Before a chunk is sent, the job records it in ``dispatched_rows``. Content
+ids are derived from the job id and row number, so when a worker stops with
+batches in flight, the resumed run looks up the rows between the two marks,
+finds the ones already in the table and does not insert them twice.
+
+Jobs in ``upsert`` mode match rows to existing content by fingerprint; see
+``importer.Upserter``.
+
+A job can only be resumed by a worker that can see its spooled file. A
+completed job deletes its file; a stopped one keeps it until the job is
+discarded, or for ``IMPORT_JOB_FILE_TTL_SECONDS``, after which the next
+submission on that worker deletes it and the job can no longer be resumed.
+"""
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from collections import deque
+from contextlib import aclosing
+from datetime import datetime
+from typing import Awaitable, Callable, Collection, Deque, Dict, List, Optional, Set, Tuple
+
+import importer
+from importer import (
+    SPOOL_PREFIX, BatchInserter, ImportReport, InsertRows, LookupRows, Upserter, count_rows, import_chunk, read_chunks,
+    read_frames, spool_upload,
+)
+
+IMPORT_JOB_DIR = os.getenv("IMPORT_JOB_DIR") or None
+IMPORT_JOB_CONCURRENCY = int(os.getenv("IMPORT_JOB_CONCURRENCY", "1"))
+# A running job whose record has not been saved for this long is presumed
+# to have lost its worker
+IMPORT_JOB_STALE_SECONDS = float(os.getenv("IMPORT_JOB_STALE_SECONDS", "120"))
+# How long the upload of a stopped job is kept for a resume
+IMPORT_JOB_FILE_TTL_SECONDS = float(os.getenv("IMPORT_JOB_FILE_TTL_SECONDS", str(7 * 86400)))
+
+ACTIVE_STATUSES = ("queued", "running")
+RESUMABLE_STATUSES = ("cancelled", "interrupted", "failed")
+
+SaveJob = Callable[[dict], Awaitable[None]]
+LoadJob = Callable[[str], Awaitable[Optional[dict]]]
+ExistingIds = Callable[[List[str]], Awaitable[Set[str]]]
+
+
+class JobConflict(Exception):
+    """The job is not in a state that allows the requested action."""
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class ImportJob:
+    """One upload's import: its persisted record plus run-time progress."""
+
+    def __init__(
+        self, id: str, filename: str, path: str, chunk_rows: int, expected_rows: Optional[int] = None, mode: str = "insert"
+    ):
+        self.id = id
+        self.filename = filename
+        self.path = path
+        self.mode = mode
+        self.chunk_rows = chunk_rows
+        self.expected_rows = expected_rows
+        self.status = "queued"
+        self.processed_rows = 0
+        self.dispatched_rows = 0
+        self.runs = 0
+        self.report = ImportReport()
+        self.error: Optional[str] = None
+        self.created_at = self.updated_at = _now()
+        self.finished_at: Optional[str] = None
+        self.cancel_requested = False
+        self._run_started: Optional[float] = None
+        self._run_start_rows = 0
+
+    @classmethod
+    def from_record(cls, record: dict) -> "ImportJob":
+        job = cls(
+            record["id"], record["filename"], record["path"], record["chunk_rows"], record.get("expected_rows"),
+            record.get("mode") or "insert",
+        )
+        job.status = record["status"]
+        job.processed_rows = record.get("processed_rows") or 0
+        job.dispatched_rows = record.get("dispatched_rows") or 0
+        job.runs = record.get("runs") or 0
+        job.report = ImportReport.from_response(record)
+        job.error = record.get("error")
+        job.created_at = record.get("created_at") or job.created_at
+        job.updated_at = record.get("updated_at") or job.updated_at
+        job.finished_at = record.get("finished_at")
+        return job
+
+    def to_record(self) -> dict:
+        report = self.report.to_response()
+        del report["success"]
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "path": self.path,
+            "mode": self.mode,
+            "status": self.status,
+            "chunk_rows": self.chunk_rows,
+            "expected_rows": self.expected_rows,
+            "processed_rows": self.processed_rows,
+            "dispatched_rows": self.dispatched_rows,
+            "runs": self.runs,
+            **report,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "finished_at": self.finished_at,
+        }
+
+    def is_stale(self) -> bool:
+        try:
+            updated = datetime.fromisoformat(self.updated_at).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return True
+        return (datetime.utcnow() - updated).total_seconds() > IMPORT_JOB_STALE_SECONDS
+
+    def start_run(self):
+        self.status = "running"
+        self.runs += 1
+        self.error = None
+        self.finished_at = None
+        self._run_started = time.monotonic()
+        self._run_start_rows = self.processed_rows
+
+    def progress(self) -> dict:
+        """The job as the progress endpoints return it."""
+        rate = eta = None
+        if self.status == "running" and self._run_started is not None:
+            elapsed = time.monotonic() - self._run_started
+            done = self.processed_rows - self._run_start_rows
+            if elapsed > 0 and done > 0:
+                rate = done / elapsed
+                if self.expected_rows is not None:
+                    eta = max(self.expected_rows - self.processed_rows, 0) / rate
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "mode": self.mode,
+            "status": self.status,
+            "processed_rows": self.processed_rows,
+            "expected_rows": self.expected_rows,
+            "rows_per_second": round(rate, 1) if rate is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "finished_at": self.finished_at,
+            **self.report.to_response(),
+        }
+
+
+class ImportJobManager:
+    """Starts, tracks, cancels and resumes import jobs in this worker.
+
+    ``save(record)`` and ``load(job_id)`` persist job records;
+    ``existing_ids(ids)`` returns which of ``ids`` are already in the
+    content table. ``insert`` and ``on_inserted`` are as for
+    ``BatchInserter``; ``lookup``, ``update`` and ``on_updated`` as for
+    ``Upserter`` and only needed for upsert jobs.
+    """
+
+    def __init__(
+        self,
+        insert: InsertRows,
+        save: SaveJob,
+        load: LoadJob,
+        existing_ids: ExistingIds,
+        on_inserted: Optional[Callable[[List[dict]], None]] = None,
+        lookup: Optional[LookupRows] = None,
+        update: Optional[InsertRows] = None,
+        on_updated: Optional[Callable[[List[dict], Optional[dict]], None]] = None,
+        directory: Optional[str] = IMPORT_JOB_DIR,
+        concurrency: int = IMPORT_JOB_CONCURRENCY,
+        chunk_rows: Optional[int] = None,
+    ):
+        self.insert = insert
+        self.save = save
+        self.load = load
+        self.existing_ids = existing_ids
+        self.on_inserted = on_inserted
+        self.lookup = lookup
+        self.update = update
+        self.on_updated = on_updated
+        self.directory = directory
+        self.concurrency = max(1, concurrency)
+        self.chunk_rows = chunk_rows
+        # Jobs queued or running in this worker; finished ones are read back
+        # from their saved record
+        self.jobs: Dict[str, ImportJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _save(self, job: ImportJob):
+        job.updated_at = _now()
+        await self.save(job.to_record())
+
+    async def submit(self, upload, mode: str = "insert") -> ImportJob:
+        """Spool ``upload`` and start importing it in the background."""
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.expire_files)
+        path = await spool_upload(upload, self.directory)
+        try:
+            expected = await asyncio.get_running_loop().run_in_executor(None, count_rows, path)
+            job = ImportJob(str(uuid.uuid4()), upload.filename, path, self.chunk_rows or importer.IMPORT_CHUNK_ROWS, expected, mode)
+            await self._save(job)
+        except BaseException:
+            os.unlink(path)
+            raise
+        self._start(job)
+        return job
+
+    def _start(self, job: ImportJob):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        self.jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._finished(job.id))
+
+    def _finished(self, job_id: str):
+        self._tasks.pop(job_id, None)
+        self.jobs.pop(job_id, None)
+
+    async def wait(self, job: ImportJob) -> ImportJob:
+        task = self._tasks.get(job.id)
+        if task is not None:
+            await asyncio.shield(task)
+        return job
+
+    async def get(self, job_id: str) -> Optional[ImportJob]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        record = await self.load(job_id)
+        if record is None:
+            return None
+        job = ImportJob.from_record(record)
+        if job.status in ACTIVE_STATUSES and job.is_stale():
+            job.status = "interrupted"
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[ImportJob]:
+        """Stop a job once the chunks already sent finish; the file is kept for resume."""
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        if job_id in self._tasks:
+            job.cancel_requested = True
+            if job.status == "queued":
+                job.status = "cancelled"
+                await self._save(job)
+        elif job.status in ACTIVE_STATUSES:
+            raise JobConflict("Job is running on another worker")
+        elif job.status == "interrupted":
+            job.status = "cancelled"
+            await self._save(job)
+        elif job.status != "cancelled":
+            raise JobConflict(f"Job is already {job.status}")
+        return job
+
+    async def resume(self, job_id: str) -> Optional[ImportJob]:
+        """Continue a stopped job from its last committed chunk."""
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        if job_id in self._tasks:
+            return job
+        if job.status not in RESUMABLE_STATUSES:
+            raise JobConflict(f"Job is {job.status}")
+        if not os.path.exists(job.path):
+            raise JobConflict("The uploaded file is not available on this worker")
+        job.status = "queued"
+        job.cancel_requested = False
+        await self._save(job)
+        self._start(job)
+        return job
+
+    async def discard(self, job_id: str) -> Optional[ImportJob]:
+        """Give up on a stopped job and delete its spooled file."""
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        if job_id in self._tasks or job.status in ACTIVE_STATUSES:
+            raise JobConflict("Cancel the job before discarding it")
+        if job.status not in RESUMABLE_STATUSES:
+            raise JobConflict(f"Job is already {job.status}")
+        if os.path.exists(job.path):
+            os.unlink(job.path)
+        job.status = "discarded"
+        job.finished_at = _now()
+        await self._save(job)
+        return job
+
+    def expire_files(self, now: Optional[float] = None) -> int:
+        """Delete spooled uploads older than the TTL that no job here is using."""
+        now = time.time() if now is None else now
+        in_use = {job.path for job in self.jobs.values()}
+        expired = 0
+        with os.scandir(self.directory or tempfile.gettempdir()) as entries:
+            for entry in entries:
+                if not entry.name.startswith(SPOOL_PREFIX) or entry.path in in_use or not entry.is_file():
+                    continue
+                try:
+                    if now - entry.stat().st_mtime > IMPORT_JOB_FILE_TTL_SECONDS:
+                        os.unlink(entry.path)
+                        expired += 1
+                except FileNotFoundError:
+                    pass
+        return expired
+
+    async def shutdown(self):
+        """Stop running jobs; they are saved as interrupted for a later resume."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _already_inserted(self, ids: List[str]) -> Collection[str]:
+        return await self.existing_ids(ids) if ids else set()
+
+    @staticmethod
+    def _commit(job: ImportJob, pending: Deque[Tuple[int, ImportReport, Set[asyncio.Task]]]):
+        """Fold chunks whose batches have all finished into the job, in order."""
+        while pending and all(task.done() for task in pending[0][2]):
+            end_row, report, _ = pending.popleft()
+            job.report.merge(report)
+            job.processed_rows = end_row
+
+    async def _run(self, job: ImportJob):
+        async with self._slots:
+            if job.cancel_requested:
+                return
+            writers = []
+            try:
+                job.start_run()
+                await self._save(job)
+                # Rows an earlier run may have written without committing them
+                recheck_until = job.dispatched_rows if job.runs > 1 else 0
+                inserter = BatchInserter(self.insert, job.report, on_inserted=self.on_inserted)
+                writers.append(inserter)
+                upserter = None
+                if job.mode == "upsert":
+                    upserter = Upserter(self.lookup, self.update, job.report, on_updated=self.on_updated)
+                    writers.append(upserter.updater)
+                # (end row, the chunk's report, batches that must finish first)
+                pending: Deque[Tuple[int, ImportReport, Set[asyncio.Task]]] = deque()
+                start_row = job.processed_rows
+                frames = read_frames(job.path, job.chunk_rows, start_row=start_row)
+                async with aclosing(read_chunks(frames, uuid.UUID(job.id))) as chunks:
+                    async for chunk in chunks:
+                        if job.cancel_requested:
+                            break
+                        self._commit(job, pending)
+                        job.dispatched_rows = max(job.dispatched_rows, chunk[0])
+                        await self._save(job)
+                        if upserter is not None:
+                            # Lookups must see the titles written for earlier chunks
+                            await inserter.drain()
+                            await upserter.flush()
+                            self._commit(job, pending)
+                        report = ImportReport()
+                        inserter.report = report
+                        if upserter is not None:
+                            upserter.use_report(report)
+                        inserted = await self._already_inserted(chunk[1]["id"].tolist()) if start_row < recheck_until else ()
+                        await import_chunk(chunk, inserter, report, inserted, upserter)
+                        for writer in writers:
+                            await writer.send()
+                        pending.append((chunk[0], report, set().union(*(writer.in_flight() for writer in writers))))
+                        start_row = chunk[0]
+                await inserter.flush()
+                if upserter is not None:
+                    await upserter.flush()
+                self._commit(job, pending)
+                job.status = "cancelled" if job.cancel_requested else "completed"
+            except asyncio.CancelledError:
+                for writer in writers:
+                    writer.cancel()
+                job.status = "interrupted"
+                await self._save(job)
+                raise
+            except Exception as e:
+                for writer in writers:
+                    writer.cancel()
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = _now()
+            await self._save(job)
+            if job.status == "completed":
+                os.unlink(job.path)
@@ -0,0 +1,767 @@
+"""Bulk content import engine.
+
+``/api/admin/bulk-import`` used to insert one spreadsheet row per request, so
+a 20k-row catalog meant 20k sequential round trips. Rows are now buffered and
+sent as multi-row inserts of ``IMPORT_BATCH_SIZE`` rows.
+
+A multi-row insert is all-or-nothing in Postgres, so one bad row fails its
+whole chunk. A failed chunk is split in half and each half retried, down to
+single rows; the rows that still fail are reported with their spreadsheet
+row number, exactly as the per-row loop did. A chunk with one bad row costs
+about ``2 * log2(IMPORT_BATCH_SIZE)`` extra requests.
+
+In ``upsert`` mode each row is matched to existing content by its
+fingerprint (see ``content_fingerprint``): rows that are already present and
+identical are skipped, changed ones are updated in batches, and only new
+titles are inserted. Existing rows are looked up with one query per chunk.
+
+Uploads are streamed: the file is spooled to disk in small chunks, read back
+``IMPORT_CHUNK_ROWS`` rows at a time (``read_csv(chunksize=...)``, openpyxl's
+read-only mode for XLSX, record batches for Parquet and Arrow IPC, line chunks
+for JSONL), validated, and queued for insertion. Parsing runs up
+to ``IMPORT_PREFETCH_CHUNKS`` chunks ahead of the inserts, and up to
+``IMPORT_WORKERS`` insert batches are in flight at once, each stage waiting
+when the next one is full. Peak memory is a few chunks and batches,
+whatever the file size. Batches that fail with a transient database error
+are retried with jittered backoff before any bisecting.
+
+Parquet and Arrow files are read through pyarrow, which is optional: only
+the columns the importer uses are read, and native list columns (``genres``
+as ``list<string>``, ``cast`` as ``list<struct>``) are used as they are,
+without the comma splitting and JSON parsing that spreadsheet cells need.
+JSONL arrays are kept as parsed.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import tempfile
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Collection, Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from content_fields import ARROW_IPC_EXTENSIONS, FINGERPRINT_FIELDS, IMPORTED_FIELDS, JSONL_EXTENSIONS, REQUIRED_FIELDS
+from db import is_transient
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "2000"))
+# Insert batches in flight at once, and chunks parsed ahead of the inserts
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+IMPORT_PREFETCH_CHUNKS = int(os.getenv("IMPORT_PREFETCH_CHUNKS", "2"))
+# Retries of a batch that failed with a transient error (see db.is_transient)
+IMPORT_RETRIES = int(os.getenv("IMPORT_RETRIES", "3"))
+IMPORT_RETRY_BASE_SECONDS = float(os.getenv("IMPORT_RETRY_BASE_SECONDS", "0.2"))
+SPOOL_CHUNK_BYTES = 1024 * 1024
+# File name prefix of spooled uploads
+SPOOL_PREFIX = "import-"
+
+# Rows reported back to the admin UI
+MAX_REPORTED_ERRORS = 10
+MAX_REPORTED_TITLES = 10
+
+InsertRows = Callable[[List[dict]], Awaitable[List[dict]]]
+# fingerprints -> existing content rows with those fingerprints
+LookupRows = Callable[[List[str]], Awaitable[List[dict]]]
+# (end row, clean rows, error rows) for one chunk of the spreadsheet
+Chunk = Tuple[int, pd.DataFrame, pd.DataFrame]
+
+
+class ImportReport:
+    """Running tally of an import, in the shape the endpoint returns."""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.successful = 0
+        self.failed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors: List[str] = []
+        self.imported: List[str] = []
+
+    def fail(self, row_number: int, message: str):
+        self.failed += 1
+        # Only the first few are reported; keeping all would grow with the file
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Row {row_number}: {message}")
+
+    def succeed(self, row: dict, outcome: str = "inserted"):
+        """Count an imported row; ``outcome`` is inserted, updated or unchanged."""
+        self.successful += 1
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        if outcome != "unchanged" and len(self.imported) < MAX_REPORTED_TITLES:
+            self.imported.append(row["title"])
+
+    def merge(self, other: "ImportReport"):
+        """Add the counts of ``other``, a report for later rows."""
+        for name in ("total_rows", "successful", "failed", "inserted", "updated", "unchanged"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.errors.extend(other.errors[:max(MAX_REPORTED_ERRORS - len(self.errors), 0)])
+        self.imported.extend(other.imported[:max(MAX_REPORTED_TITLES - len(self.imported), 0)])
+
+    @classmethod
+    def from_response(cls, response: dict) -> "ImportReport":
+        report = cls()
+        report.total_rows = response.get("total_rows") or 0
+        report.successful = response.get("successful_imports") or 0
+        report.failed = response.get("failed_imports") or 0
+        report.inserted = response.get("inserted") or 0
+        report.updated = response.get("updated") or 0
+        report.unchanged = response.get("unchanged") or 0
+        report.errors = list(response.get("errors") or [])
+        report.imported = list(response.get("imported_content") or [])
+        return report
+
+    def to_response(self) -> dict:
+        return {
+            "success": self.successful > 0,
+            "total_rows": self.total_rows,
+            "successful_imports": self.successful,
+            "failed_imports": self.failed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "errors": self.errors[:MAX_REPORTED_ERRORS],
+            "imported_content": self.imported[:MAX_REPORTED_TITLES],
+        }
+
+
+class BatchInserter:
+    """Buffers rows and inserts them in chunks, bisecting failed chunks.
+
+    ``insert(rows)`` performs one multi-row insert and returns the inserted
+    rows; ``on_inserted(rows)`` is called after each successful insert.
+    Written rows are counted in the report as ``outcome``.
+
+    Up to ``workers`` batches are in flight at once; ``add`` waits for a
+    free slot, so a slow database holds back parsing instead of letting
+    batches pile up in memory. Each batch is counted in the ``report`` that
+    was current when it was sent.
+    """
+
+    def __init__(
+        self,
+        insert: InsertRows,
+        report: ImportReport,
+        batch_size: Optional[int] = None,
+        on_inserted: Optional[Callable[[List[dict]], None]] = None,
+        outcome: str = "inserted",
+        workers: Optional[int] = None,
+    ):
+        self.insert = insert
+        self.report = report
+        self.batch_size = max(1, batch_size or IMPORT_BATCH_SIZE)
+        self.on_inserted = on_inserted
+        self.outcome = outcome
+        self.workers = max(1, workers or IMPORT_WORKERS)
+        self.requests = 0
+        self.retries = 0
+        self._buffer: List[Tuple[int, dict]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def add(self, row_number: int, row: dict):
+        self._buffer.append((row_number, row))
+        if len(self._buffer) >= self.batch_size:
+            await self.send()
+
+    async def send(self):
+        """Start inserting the buffered rows without waiting for the result."""
+        chunk, self._buffer = self._buffer, []
+        if not chunk:
+            return
+        if self.workers == 1:
+            await self._insert(chunk, self.report)
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        await self._slots.acquire()
+        task = asyncio.create_task(self._insert(chunk, self.report))
+        self._in_flight.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self._slots.release()
+
+    def in_flight(self) -> Set[asyncio.Task]:
+        """The batches currently being inserted."""
+        return set(self._in_flight)
+
+    async def drain(self):
+        while self._in_flight:
+            await asyncio.gather(*self._in_flight)
+
+    async def flush(self):
+        """Insert the buffered rows and wait for every batch in flight."""
+        await self.send()
+        await self.drain()
+
+    def cancel(self):
+        for task in self._in_flight:
+            task.cancel()
+
+    async def _attempt(self, rows: List[dict]) -> List[dict]:
+        for attempt in range(IMPORT_RETRIES + 1):
+            self.requests += 1
+            try:
+                return await self.insert(rows)
+            except Exception as e:
+                if attempt == IMPORT_RETRIES or not is_transient(e):
+                    raise
+            self.retries += 1
+            # Full jitter keeps concurrent workers from retrying in lockstep
+            await asyncio.sleep(random.uniform(0, IMPORT_RETRY_BASE_SECONDS * 2 ** attempt))
+
+    async def _insert(self, chunk: List[Tuple[int, dict]], report: ImportReport):
+        try:
+            inserted = await self._attempt([row for _, row in chunk])
+        except Exception as e:
+            # Splitting only helps when some row is at fault
+            if len(chunk) == 1 or is_transient(e):
+                for row_number, _ in chunk:
+                    report.fail(row_number, str(e))
+                return
+            middle = len(chunk) // 2
+            await self._insert(chunk[:middle], report)
+            await self._insert(chunk[middle:], report)
+            return
+
+        returned = {row.get("id") for row in inserted or []}
+        for row_number, row in chunk:
+            if row["id"] in returned:
+                report.succeed(row, self.outcome)
+            else:
+                report.fail(row_number, f"Failed to insert {row['title']}")
+        if inserted and self.on_inserted is not None:
+            self.on_inserted(inserted)
+
+
+async def spool_upload(upload, directory: Optional[str] = None) -> str:
+    """Copy an ``UploadFile`` to a temporary file, one chunk at a time."""
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix=SPOOL_PREFIX, suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as spooled:
+            while True:
+                chunk = await upload.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                spooled.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _xlsx_frames(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        width = len(columns)
+        # Indexed by sheet row (after the header), so blank rows skipped
+        # here do not shift the row numbers in errors
+        index, batch = [], []
+        for position, values in enumerate(rows):
+            if all(value is None for value in values):
+                continue
+            index.append(position)
+            batch.append(tuple(values[:width]) + (None,) * (width - len(values)))
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=columns, index=index)
+                index, batch = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=index)
+    finally:
+        workbook.close()
+
+
+def _imported_columns(names: List[str]) -> List[str]:
+    return [name for name in names if name in IMPORTED_FIELDS]
+
+
+def _arrow_frame(table, start: int) -> pd.DataFrame:
+    """An Arrow table or record batch as a DataFrame indexed from ``start``.
+
+    List columns become Python lists (structs inside them become dicts),
+    which ``normalize_frame`` takes as they are.
+    """
+    import pyarrow as pa
+
+    index = pd.RangeIndex(start, start + table.num_rows)
+    columns = {}
+    for name, column in zip(table.schema.names, table.columns):
+        if pa.types.is_list(column.type) or pa.types.is_large_list(column.type) or pa.types.is_fixed_size_list(column.type):
+            columns[name] = pd.Series(column.to_pylist(), index=index, dtype=object)
+        else:
+            columns[name] = column.to_pandas().set_axis(index)
+    return pd.DataFrame(columns, index=index)
+
+
+def _arrow_frames(batches, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Regroup Arrow record batches into frames of ``chunk_rows`` rows.
+
+    Writers pick their own batch sizes, from a few rows to whole files.
+    Slicing a table is zero-copy, so only one chunk is converted at a time.
+    """
+    import pyarrow as pa
+
+    start, buffered, size = 0, [], 0
+    for batch in batches:
+        if not batch.num_rows:
+            continue
+        buffered.append(batch)
+        size += batch.num_rows
+        while size >= chunk_rows:
+            table = pa.Table.from_batches(buffered)
+            yield _arrow_frame(table.slice(0, chunk_rows), start)
+            rest = table.slice(chunk_rows)
+            start, buffered, size = start + chunk_rows, rest.to_batches(), rest.num_rows
+    if size:
+        yield _arrow_frame(pa.Table.from_batches(buffered), start)
+
+
+def _parquet_frames(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    with pq.ParquetFile(path) as parquet:
+        columns = _imported_columns(parquet.schema_arrow.names)
+        yield from _arrow_frames(parquet.iter_batches(batch_size=chunk_rows, columns=columns), chunk_rows)
+
+
+def _open_ipc(source):
+    """Arrow IPC reader for either the file (random access) or stream format."""
+    import pyarrow as pa
+
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def _ipc_batches(reader):
+    if hasattr(reader, "num_record_batches"):
+        return (reader.get_batch(i) for i in range(reader.num_record_batches))
+    return iter(reader)
+
+
+def _ipc_frames(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow as pa
+
+    # Memory-mapped, so columns that are not selected are never paged in
+    with pa.memory_map(path) as source:
+        reader = _open_ipc(source)
+        columns = _imported_columns(reader.schema.names)
+        yield from _arrow_frames((batch.select(columns) for batch in _ipc_batches(reader)), chunk_rows)
+
+
+def _all_frames(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with pd.read_csv(path, chunksize=chunk_rows) as reader:
+            yield from reader
+    elif extension == ".xlsx":
+        yield from _xlsx_frames(path, chunk_rows)
+    elif extension in JSONL_EXTENSIONS:
+        # Row numbers count records; blank lines are skipped
+        with pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False, convert_dates=False) as reader:
+            yield from reader
+    elif extension == ".parquet":
+        yield from _parquet_frames(path, chunk_rows)
+    elif extension in ARROW_IPC_EXTENSIONS:
+        yield from _ipc_frames(path, chunk_rows)
+    else:
+        # Legacy .xls has no streaming reader
+        yield pd.read_excel(path)
+
+
+def read_frames(path: str, chunk_rows: Optional[int] = None, start_row: int = 0) -> Iterator[pd.DataFrame]:
+    """Yield the spreadsheet as DataFrames of at most ``chunk_rows`` rows.
+
+    Frames keep a running index, so ``index + 1`` is the row number the
+    admin sees in their spreadsheet (after the header). Rows before
+    ``start_row`` are parsed but not yielded.
+    """
+    for frame in _all_frames(path, chunk_rows or IMPORT_CHUNK_ROWS):
+        if start_row and frame.index[0] < start_row:
+            frame = frame[frame.index >= start_row]
+        if len(frame):
+            yield frame
+
+
+def count_rows(path: str) -> Optional[int]:
+    """Cheap estimate of the data rows in a spreadsheet, for progress.
+
+    CSV and JSONL count line breaks, so quoted multi-line cells and blank
+    lines overcount. XLSX uses the sheet's recorded dimensions, which count
+    blank rows. Parquet and Arrow IPC files record exact counts in their
+    metadata. ``None`` when the format gives no cheap answer.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv" or extension in JSONL_EXTENSIONS:
+        lines, last = 0, b"\n"
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(SPOOL_CHUNK_BYTES), b""):
+                lines += block.count(b"\n")
+                last = block[-1:]
+        lines += last != b"\n"
+        return lines if extension in JSONL_EXTENSIONS else max(lines - 1, 0)
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        with pq.ParquetFile(path) as parquet:
+            return parquet.metadata.num_rows
+    if extension in ARROW_IPC_EXTENSIONS:
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            reader = _open_ipc(source)
+            if not hasattr(reader, "num_record_batches"):
+                return None
+            # Reads batch headers only; the data stays mapped
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    if extension == ".xlsx":
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+    return None
+
+
+def _column(frame: pd.DataFrame, name: str) -> pd.Series:
+    if name in frame:
+        return frame[name]
+    return pd.Series(None, index=frame.index, dtype=object)
+
+
+def _text(column: pd.Series) -> pd.Series:
+    return column.astype(str).astype(object).where(column.notna(), None)
+
+
+def _flag(errors: pd.Series, mask: pd.Series, message):
+    """Record ``message`` for rows in ``mask``; the first error per row wins."""
+    mask = mask & errors.isna()
+    if mask.any():
+        errors[mask] = message if isinstance(message, str) else message[mask]
+
+
+def _integers(column: pd.Series, field: str, errors: pd.Series) -> pd.Series:
+    numbers = pd.to_numeric(column, errors="coerce")
+    invalid = column.notna() & (numbers.isna() | (numbers % 1 != 0))
+    _flag(errors, invalid, f"Invalid {field}: " + column.astype(str))
+    return numbers.where(~invalid)
+
+
+def _native_lists(column: pd.Series) -> pd.Series:
+    """Cells that already hold a list, as read from Parquet, Arrow or JSONL."""
+    if column.dtype != object:
+        return pd.Series(False, index=column.index)
+    return column.map(lambda value: isinstance(value, list)).astype(bool)
+
+
+def _list_items(values: list) -> list:
+    items = (str(item).strip() for item in values if item is not None)
+    return [item for item in items if item]
+
+
+def _lists(column: pd.Series) -> pd.Series:
+    """Split comma-separated cells, trimming whitespace and empty items.
+
+    Cells that are already lists are only trimmed.
+    """
+    native = _native_lists(column)
+    strings = column.mask(native)
+    text = strings.astype(str).str.replace(r"^[\s,]+|[\s,]+$", "", regex=True)
+    present = strings.notna() & (text != "")
+    values = pd.Series([[] for _ in range(len(column))], index=column.index, dtype=object)
+    if present.any():
+        values[present] = text[present].str.split(r"\s*,[\s,]*", regex=True)
+    if native.any():
+        values[native] = column[native].map(_list_items)
+    return values
+
+
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _json_lists(column: pd.Series, field: str, errors: pd.Series) -> pd.Series:
+    """Parse cells that hold a JSON array; anything else becomes ``[]``.
+
+    Cells that are already lists are kept as they are.
+    """
+    native = _native_lists(column)
+    strings = column.mask(native)
+    text = strings.astype(str).str.strip()
+    listed = strings.notna() & text.str.startswith("[")
+    values = pd.Series([[] for _ in range(len(column))], index=column.index, dtype=object)
+    if listed.any():
+        parsed = text[listed].map(_loads)
+        _flag(errors, parsed.isna().reindex(column.index, fill_value=False), f"Invalid {field} JSON")
+        values[listed] = parsed
+    if native.any():
+        values[native] = column[native]
+    return values
+
+
+def content_fingerprint(row: dict) -> str:
+    """Identity of a title across imports, independent of its id.
+
+    Must match the generated ``content.fingerprint`` column: whitespace runs
+    collapsed to one space, trimmed, lowercased, missing values as "",
+    joined with chr(31) and md5-hashed.
+    """
+    parts = ["" if row.get(field) is None else " ".join(str(row[field]).split()).lower() for field in FINGERPRINT_FIELDS]
+    return hashlib.md5("\x1f".join(parts).encode()).hexdigest()
+
+
+def fingerprints(clean: pd.DataFrame) -> List[str]:
+    """``content_fingerprint`` for every row of a ``normalize_frame`` result."""
+    if not len(clean):
+        return []
+    joined = None
+    for field in FINGERPRINT_FIELDS:
+        column = clean[field]
+        text = column.astype(str).str.replace(r"\s+", " ", regex=True).str.strip().str.lower().where(column.notna(), "")
+        joined = text if joined is None else joined + "\x1f" + text
+    return [hashlib.md5(value.encode()).hexdigest() for value in joined.tolist()]
+
+
+def row_ids(row_numbers, namespace: Optional[uuid.UUID] = None) -> List[str]:
+    """Content ids for imported rows: random, or derived from ``namespace``.
+
+    Derived ids are the same every time a row is read, which is what lets a
+    resumed import recognise rows it already inserted.
+    """
+    if namespace is None:
+        return [str(uuid.uuid4()) for _ in row_numbers]
+    return [str(uuid.uuid5(namespace, str(number))) for number in row_numbers]
+
+
+def normalize_frame(frame: pd.DataFrame, namespace: Optional[uuid.UUID] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Validate a spreadsheet chunk and convert it to ``content`` rows.
+
+    Works column by column rather than row by row. Returns ``(clean,
+    errors)``: ``clean`` holds one insertable row per valid input row (same
+    index), ``errors`` has ``row`` (spreadsheet row number) and ``error``
+    columns for the rest, one message per row. Ids come from ``row_ids``.
+    """
+    errors = pd.Series(None, index=frame.index, dtype=object)
+    for field in REQUIRED_FIELDS:
+        _flag(errors, _column(frame, field).isna(), f"Missing required field: {field}")
+
+    year = _integers(_column(frame, "year"), "year", errors)
+    rating = pd.to_numeric(_column(frame, "rating"), errors="coerce")
+    _flag(errors, _column(frame, "rating").notna() & rating.isna(), "Invalid rating: " + _column(frame, "rating").astype(str))
+    episodes = _integers(_column(frame, "episodes"), "episodes", errors)
+    duration = _integers(_column(frame, "duration"), "duration", errors)
+    cast = _json_lists(_column(frame, "cast"), "cast", errors)
+    crew = _json_lists(_column(frame, "crew"), "crew", errors)
+
+    valid = errors.isna()
+    failed = errors[~valid]
+    error_frame = pd.DataFrame({"row": failed.index + 1, "error": failed.to_numpy()})
+    if not valid.any():
+        return pd.DataFrame(index=frame.index[:0]), error_frame
+
+    def optional_integers(numbers: pd.Series) -> pd.Series:
+        numbers = numbers[valid].astype("Int64").astype(object)
+        return numbers.where(numbers.notna(), None)
+
+    clean = pd.DataFrame({
+        "id": row_ids((frame.index[valid] + 1).tolist(), namespace),
+        "title": _text(frame["title"][valid]),
+        "original_title": _text(_column(frame, "original_title")[valid]),
+        "synopsis": _text(frame["synopsis"][valid]),
+        "year": year[valid].astype("int64"),
+        "country": _text(frame["country"][valid]),
+        "content_type": _text(frame["content_type"][valid]),
+        "rating": rating[valid].astype(float),
+        "poster_url": _text(_column(frame, "poster_url")[valid]),
+        "banner_url": _text(_column(frame, "banner_url")[valid]),
+        "episodes": optional_integers(episodes),
+        "duration": optional_integers(duration),
+        "genres": _lists(_column(frame, "genres")[valid]),
+        "streaming_platforms": _lists(_column(frame, "streaming_platforms")[valid]),
+        "tags": _lists(_column(frame, "tags")[valid]),
+        "cast": cast[valid],
+        "crew": crew[valid],
+    }, index=frame.index[valid])
+    return clean, error_frame
+
+
+def clean_records(clean: pd.DataFrame) -> List[dict]:
+    """``clean.to_dict("records")`` without boxing every cell one at a time."""
+    columns = list(clean.columns)
+    return [dict(zip(columns, values)) for values in zip(*(clean[name].tolist() for name in columns))]
+
+
+def _next_chunk(frames: Iterator[pd.DataFrame], namespace: Optional[uuid.UUID]) -> Optional[Chunk]:
+    frame = next(frames, None)
+    if frame is None:
+        return None
+    return (int(frame.index[-1]) + 1,) + normalize_frame(frame, namespace)
+
+
+async def read_chunks(
+    frames: Iterator[pd.DataFrame], namespace: Optional[uuid.UUID] = None, prefetch: Optional[int] = None
+) -> AsyncIterator[Chunk]:
+    """Parse and validate ``frames`` in the default executor.
+
+    Runs up to ``prefetch`` chunks ahead of the consumer, so the next chunk
+    is parsed while the current one is being inserted. Close the generator
+    (``contextlib.aclosing``) when not reading it to the end.
+    """
+    loop = asyncio.get_running_loop()
+    ready: asyncio.Queue = asyncio.Queue(maxsize=max(1, prefetch or IMPORT_PREFETCH_CHUNKS))
+
+    async def parse():
+        try:
+            while True:
+                # Parsing and validating a chunk is blocking file and CPU work
+                chunk = await loop.run_in_executor(None, _next_chunk, frames, namespace)
+                await ready.put(chunk)
+                if chunk is None:
+                    return
+        except Exception as e:
+            await ready.put(e)
+
+    parser = asyncio.create_task(parse())
+    try:
+        while True:
+            chunk = await ready.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        parser.cancel()
+
+
+class Upserter:
+    """Sorts imported rows into new, changed and unchanged content.
+
+    ``lookup(fingerprints)`` returns the existing rows with those
+    fingerprints, with ``id``, ``fingerprint`` and ``IMPORTED_FIELDS``.
+    Changed rows take the existing id and are written in batches by
+    ``update(rows)``; ``on_updated(rows, previous)`` is called per updated
+    row with the row it replaced.
+    """
+
+    def __init__(
+        self,
+        lookup: LookupRows,
+        update: InsertRows,
+        report: ImportReport,
+        batch_size: Optional[int] = None,
+        on_updated: Optional[Callable[[List[dict], Optional[dict]], None]] = None,
+        workers: Optional[int] = None,
+    ):
+        self.lookup = lookup
+        self.report = report
+        self.on_updated = on_updated
+        self.updater = BatchInserter(update, report, batch_size, self._updated, outcome="updated", workers=workers)
+        self._previous: Dict[str, dict] = {}
+
+    def use_report(self, report: ImportReport):
+        """Count rows from here on in ``report``."""
+        self.report = self.updater.report = report
+
+    def _updated(self, rows: List[dict]):
+        for row in rows:
+            previous = self._previous.pop(row["id"], None)
+            if self.on_updated is not None:
+                self.on_updated([row], previous)
+
+    async def split(self, rows: List[Tuple[int, dict]], keys: List[str]) -> List[Tuple[int, dict]]:
+        """Queue updates and count unchanged rows; returns the rows to insert."""
+        existing: Dict[str, dict] = {}
+        # A catalog that already holds duplicates updates the first match
+        for current in await self.lookup(list(dict.fromkeys(keys))) if keys else []:
+            existing.setdefault(current["fingerprint"], current)
+
+        new, seen = [], {}
+        updated_at = datetime.utcnow().isoformat()
+        for (row_number, row), key in zip(rows, keys):
+            if key in seen:
+                self.report.fail(row_number, f"Duplicate of row {seen[key]}")
+                continue
+            seen[key] = row_number
+            current = existing.get(key)
+            if current is None:
+                new.append((row_number, row))
+            elif all(current.get(field) == value for field, value in row.items() if field != "id"):
+                self.report.succeed(row, "unchanged")
+            else:
+                self._previous[current["id"]] = current
+                await self.updater.add(row_number, {**row, "id": current["id"], "updated_at": updated_at})
+        return new
+
+    async def send(self):
+        await self.updater.send()
+
+    async def flush(self):
+        await self.updater.flush()
+        self._previous.clear()
+
+
+async def import_chunk(
+    chunk: Chunk,
+    inserter: BatchInserter,
+    report: ImportReport,
+    inserted_ids: Collection[str] = (),
+    upserter: Optional[Upserter] = None,
+):
+    """Report a chunk's invalid rows and queue the rest for writing.
+
+    Rows whose id is in ``inserted_ids`` are already in the table and are
+    counted as imported without being sent again. With an ``upserter``,
+    rows matching existing content are updated or skipped instead of
+    inserted.
+    """
+    _, clean, errors = chunk
+    report.total_rows += len(clean) + len(errors)
+    for row_number, message in zip(errors["row"].tolist(), errors["error"].tolist()):
+        report.fail(row_number, message)
+    rows = list(zip((clean.index + 1).tolist(), clean_records(clean)))
+    if upserter is not None:
+        rows = await upserter.split(rows, fingerprints(clean))
+    for row_number, content_data in rows:
+        if content_data["id"] in inserted_ids:
+            report.succeed(content_data)
+        else:
+            await inserter.add(row_number, content_data)
+
+
+async def import_frames(
+    frames: Iterator[pd.DataFrame],
+    inserter: BatchInserter,
+    report: ImportReport,
+    upserter: Optional[Upserter] = None,
+):
+    """Validate and queue rows one chunk at a time, then flush the last batches."""
+    async for chunk in read_chunks(frames):
+        await import_chunk(chunk, inserter, report, upserter=upserter)
+        if upserter is not None:
+            # The next chunk's lookup must see this chunk's new titles
+            await inserter.flush()
+            await upserter.flush()
+    await inserter.flush()
@@ -0,0 +1,45 @@
+"""Management commands, run from ``backend/``:
+
+    python manage.py seed            # sample titles, only into an empty catalog
+    python manage.py seed --force    # add any sample titles that are missing
+
+Uses the same ``SUPABASE_URL``/``SUPABASE_ANON_KEY`` settings as the API.
+"""
+import asyncio
+import os
+
+import typer
+
+from db import shutdown as shutdown_db
+
+app = typer.Typer(help="Global Drama Verse Guide management commands.", no_args_is_help=True)
+
+
+def create_supabase():
+    from supabase import create_client
+
+    return create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_ANON_KEY"))
+
+
+@app.callback()
+def main():
+    pass
+
+
+@app.command()
+def seed(force: bool = typer.Option(False, "--force", help="Seed even if the catalog already has content.")):
+    """Insert the sample catalog in one request; safe to run more than once."""
+    from seed import SAMPLE_CONTENT, seed_sample_content
+
+    try:
+        inserted = asyncio.run(seed_sample_content(create_supabase(), force=force))
+    finally:
+        shutdown_db()
+    if not inserted and not force:
+        typer.echo("Catalog already has content; nothing seeded (use --force to add missing sample titles)")
+    else:
+        typer.echo(f"Seeded {len(inserted)} of {len(SAMPLE_CONTENT)} sample titles")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,132 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+``range(offset, offset + limit - 1)`` makes Postgres scan and discard
+``offset`` rows, so deep pages get slower the deeper they are. A cursor
+instead remembers the ``(sort_key, id)`` of the last row served, and the next
+page is fetched with a ``WHERE (sort_key, id) < (last_sort_key, last_id)``
+style filter that an index on ``(sort_key, id)`` answers in constant time.
+
+Cursors are opaque to clients: URL-safe base64 of a small JSON object that
+also records the sort column and direction, so a cursor cannot be replayed
+against a different ordering. Orderings that cannot be expressed as a keyset
+(relevance rank, the in-memory search index) use offset cursors instead.
+
+Rows sort with NULLs last in both directions, and ``id`` breaks ties.
+``created_at``/``updated_at`` are always set (``DEFAULT NOW()``), so list
+endpoints treat them as NOT NULL; search sorts pass ``nullable=True``.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> Dict[str, Any]:
+    """Decode a cursor, checking it was issued for the same ordering."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(payload, dict) or payload.get("k") != sort or payload.get("d") != descending:
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    if "o" not in payload and "v" not in payload:
+        raise InvalidCursor("Malformed cursor")
+    return payload
+
+
+def _quote(value: Any) -> str:
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def apply_or_groups(query, groups: Sequence[str]):
+    """AND together several ``or`` expressions in a single ``or`` parameter."""
+    groups = [group for group in groups if group]
+    if len(groups) == 1:
+        return query.or_(groups[0])
+    if groups:
+        return query.or_("and(%s)" % ",".join(f"or({group})" for group in groups))
+    return query
+
+
+def keyset_page(
+    query,
+    sort: str,
+    descending: bool,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[Dict[str, Any]] = None,
+    or_groups: Sequence[str] = (),
+):
+    """Order ``query`` by ``(sort, id)`` and select the page after ``cursor``.
+
+    One extra row is fetched so :func:`page_result` can tell whether there is
+    a next page without a count.
+    """
+    if cursor is not None and "o" in cursor:
+        offset = cursor["o"]
+    elif cursor is not None:
+        offset = 0
+        value, row_id = cursor.get("v"), cursor.get("i")
+        op = "lt" if descending else "gt"
+        if value is None:
+            # Inside the trailing NULL block; only the id moves on
+            query = query.is_(sort, "null")
+            if row_id is not None:
+                query = getattr(query, op)("id", row_id)
+        else:
+            # The plain bound is what lets an index on (sort, id) start the
+            # scan at the cursor; the or-group then skips ties already served
+            query = query.lte(sort, value) if descending else query.gte(sort, value)
+            or_groups = [*or_groups, f"{sort}.{op}.{_quote(value)},id.{op}.{_quote(row_id)}"]
+    query = apply_or_groups(query, or_groups)
+    query = query.order(sort, desc=descending, nullsfirst=False).order("id", desc=descending)
+    return query.range(offset, offset + limit)
+
+
+def page_result(
+    rows: List[dict],
+    sort: str,
+    descending: bool,
+    limit: int,
+    cursor: Optional[Dict[str, Any]] = None,
+    nullable: bool = False,
+) -> Tuple[List[dict], Optional[str]]:
+    """Trim the look-ahead row and build the cursor for the next page.
+
+    The bound applied after a non-NULL cursor excludes rows whose sort key is
+    NULL, so for ``nullable`` columns a short page there is followed by a
+    cursor into the NULL block (which may turn out empty).
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor({"k": sort, "d": descending, "v": last.get(sort), "i": last["id"]})
+    bounded = cursor is not None and cursor.get("v") is not None
+    if nullable and bounded:
+        return rows, encode_cursor({"k": sort, "d": descending, "v": None, "i": None})
+    return rows, None
+
+
+def offset_cursor(
+    sort: str, descending: bool, offset: int, limit: int, total: Optional[int], returned: int = 0
+) -> Optional[str]:
+    """Cursor for orderings served by offset, e.g. relevance rank.
+
+    Without a ``total`` a full page (``returned == limit``) is assumed to
+    have a successor.
+    """
+    more = offset + limit < total if total is not None else returned == limit
+    if not more:
+        return None
+    return encode_cursor({"k": sort, "d": descending, "o": offset + limit})
@@ -0,0 +1,152 @@
+"""Request-scoped profile loading and a process-wide username cache.
+
+``ProfileLoader`` is a DataLoader-style batcher: every ``load(user_id)`` issued
+in the same event loop tick is answered by a single ``in_("id", ...)`` query,
+and each profile row is fetched at most once per request. A fresh loader is
+installed for every request by the HTTP middleware in ``server.py``.
+
+``UsernameCache`` maps ``username <-> id`` across requests so the social
+endpoints do not resolve the same username on every call. ``update_profile``
+writes renames through it; entries also expire after ``USERNAME_CACHE_TTL``
+seconds so renames made by other workers are eventually picked up.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+USERNAME_CACHE_TTL = float(os.getenv("USERNAME_CACHE_TTL", "300"))
+USERNAME_CACHE_SIZE = int(os.getenv("USERNAME_CACHE_SIZE", "50000"))
+
+FetchProfiles = Callable[[List[str]], Awaitable[List[dict]]]
+FetchByUsername = Callable[[str], Awaitable[Optional[dict]]]
+
+
+class UsernameCache:
+    """Bounded ``username -> id`` map with a TTL and a reverse index."""
+
+    def __init__(self, max_size: int = USERNAME_CACHE_SIZE, ttl: float = USERNAME_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._ids: "OrderedDict[str, tuple]" = OrderedDict()
+        self._usernames: Dict[str, str] = {}
+
+    def get_id(self, username: str) -> Optional[str]:
+        entry = self._ids.get(username)
+        if entry is None:
+            return None
+        expires_at, user_id = entry
+        if expires_at <= time.time():
+            self._drop(username)
+            return None
+        self._ids.move_to_end(username)
+        return user_id
+
+    def set(self, username: str, user_id: str):
+        previous = self._usernames.get(user_id)
+        if previous is not None and previous != username:
+            self._drop(previous)
+        self._ids[username] = (time.time() + self.ttl, user_id)
+        self._ids.move_to_end(username)
+        self._usernames[user_id] = username
+        while len(self._ids) > self.max_size:
+            oldest, (_, oldest_id) = self._ids.popitem(last=False)
+            self._usernames.pop(oldest_id, None)
+
+    def forget(self, user_id: str):
+        username = self._usernames.get(user_id)
+        if username is not None:
+            self._drop(username)
+
+    def clear(self):
+        self._ids.clear()
+        self._usernames.clear()
+
+    def _drop(self, username: str):
+        entry = self._ids.pop(username, None)
+        if entry is not None and self._usernames.get(entry[1]) == username:
+            del self._usernames[entry[1]]
+
+
+class ProfileLoader:
+    """Batches and memoizes profile fetches for the lifetime of one request."""
+
+    def __init__(self, fetch_profiles: FetchProfiles, fetch_by_username: FetchByUsername,
+                 usernames: UsernameCache):
+        self._fetch_profiles = fetch_profiles
+        self._fetch_by_username = fetch_by_username
+        self._usernames = usernames
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+
+    async def load(self, user_id: str) -> Optional[dict]:
+        future = self._futures.get(user_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._futures[user_id] = future
+            if not self._pending:
+                asyncio.get_running_loop().call_soon(self._dispatch)
+            self._pending.append(user_id)
+        return await asyncio.shield(future)
+
+    async def load_many(self, user_ids: Iterable[str]) -> List[Optional[dict]]:
+        return await asyncio.gather(*(self.load(user_id) for user_id in user_ids))
+
+    async def load_by_username(self, username: str) -> Optional[dict]:
+        user_id = self._usernames.get_id(username)
+        if user_id is not None:
+            return await self.load(user_id)
+        profile = await self._fetch_by_username(username)
+        if profile is not None:
+            self.prime(profile)
+        return profile
+
+    def prime(self, profile: dict):
+        """Record a row fetched or written elsewhere in this request."""
+        future = self._futures.get(profile["id"])
+        if future is None or future.done():
+            future = asyncio.get_running_loop().create_future()
+            self._futures[profile["id"]] = future
+        if not future.done():
+            future.set_result(profile)
+        if profile.get("username"):
+            self._usernames.set(profile["username"], profile["id"])
+
+    def clear(self, user_id: str):
+        future = self._futures.get(user_id)
+        if future is not None and future.done():
+            del self._futures[user_id]
+
+    def _dispatch(self):
+        keys, self._pending = self._pending, []
+        asyncio.ensure_future(self._resolve(keys))
+
+    async def _resolve(self, keys: List[str]):
+        try:
+            rows = await self._fetch_profiles(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._futures.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        found = {row["id"]: row for row in rows}
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(found.get(key))
+            if key in found and found[key].get("username"):
+                self._usernames.set(found[key]["username"], key)
+
+
+_current_loader: ContextVar[Optional[ProfileLoader]] = ContextVar("profile_loader", default=None)
+
+
+def begin_request(loader: ProfileLoader):
+    _current_loader.set(loader)
+
+
+def current_loader() -> Optional[ProfileLoader]:
+    return _current_loader.get()
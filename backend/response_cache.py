@@ -0,0 +1,263 @@
+"""Read-through cache for public catalog responses.
+
+The catalog changes a few times a day, but ``/api/content/{id}``, search,
+featured, trending and similar-titles responses were rebuilt from Supabase
+on every request. They are now cached by endpoint and parameters:
+
+* Entries are fresh for ``RESPONSE_CACHE_TTL`` seconds, then served stale
+  for up to ``RESPONSE_CACHE_STALE_SECONDS`` more while one background
+  refresh replaces them, so a popular key never makes a caller wait once it
+  has been loaded.
+* Concurrent misses on the same key share a single load (single-flight):
+  500 requests arriving together for a cold key cause one upstream query.
+* Every worker keeps an in-process LRU (``RESPONSE_CACHE_SIZE`` entries).
+  With ``RESPONSE_CACHE_REDIS_URL`` set, entries are also written to a
+  Redis-compatible server so workers can serve each other's loads. That
+  needs the ``redis`` package; any client with the same ``mget``/``set``/
+  ``incr`` coroutines works.
+* A content write on any worker drops everything (``invalidate``, driven by
+  ``content_events``). A load that started before the write is not stored.
+  Shared entries carry the Redis generation read before their load, and
+  ``invalidate`` bumps it with INCR, so a load another worker started
+  before the write and stores after it is ignored rather than served.
+
+``stats()`` reports hits, stale hits, misses, coalesced waiters and the hit
+ratio. ``RESPONSE_CACHE_TTL=0`` turns the cache off.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_STALE_SECONDS = float(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "300"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "")
+
+# (value, fresh until, stale until), as time.time() so workers agree
+Entry = Tuple[Any, float, float]
+Load = Callable[[], Awaitable[Any]]
+
+
+def response_key(endpoint: str, **params: Any) -> str:
+    """Cache key for an endpoint and its parameters, ignoring unset ones."""
+    values = sorted((name, value) for name, value in params.items() if value not in (None, ""))
+    return endpoint + ":" + json.dumps(values, separators=(",", ":"), default=str)
+
+
+class LocalStore:
+    """In-process LRU of entries; expired entries are dropped on read."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: float) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: Entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class RedisStore:
+    """Entries shared through a Redis-compatible server, as JSON.
+
+    Each entry is stored with the generation current when its load began;
+    entries older than the ``generation_key`` counter are treated as missing.
+    """
+
+    def __init__(self, client, prefix: str = "response-cache:"):
+        self.client = client
+        self.prefix = prefix
+        # Response keys always contain ":", so this cannot collide with one
+        self.generation_key = prefix + "generation"
+
+    async def generation(self) -> int:
+        return int(await self.client.get(self.generation_key) or 0)
+
+    async def get(self, key: str) -> Optional[Entry]:
+        raw, current = await self.client.mget(self.prefix + key, self.generation_key)
+        if raw is None:
+            return None
+        value, fresh_until, stale_until, generation = json.loads(raw)
+        if generation < int(current or 0):
+            return None
+        return value, fresh_until, stale_until
+
+    async def set(self, key: str, entry: Entry, generation: int):
+        # Redis expires the key once it is no longer servable, even stale
+        expires_in = max(1, math.ceil(entry[2] - time.time()))
+        await self.client.set(self.prefix + key, json.dumps([*entry, generation], default=str), ex=expires_in)
+
+    async def invalidate(self):
+        # Older entries are left to expire on their own
+        await self.client.incr(self.generation_key)
+
+
+class ResponseCache:
+    """Stale-while-revalidate cache with single-flight loads."""
+
+    def __init__(
+        self,
+        shared: Optional[RedisStore] = None,
+        ttl: float = RESPONSE_CACHE_TTL,
+        stale_seconds: float = RESPONSE_CACHE_STALE_SECONDS,
+        max_size: int = RESPONSE_CACHE_SIZE,
+    ):
+        self.local = LocalStore(max_size)
+        self.shared = shared
+        self.ttl = ttl
+        self.stale_seconds = stale_seconds
+        # Bumped by invalidate(); loads from an older generation are not stored
+        self.generation = 0
+        self._inflight: Dict[Tuple[int, str], asyncio.Task] = {}
+        # The shared generation bump from the last invalidate()
+        self._invalidating: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.errors = 0
+
+    async def get_or_load(self, key: str, load: Load, ttl: Optional[float] = None) -> Any:
+        """The cached value for ``key``, calling ``load`` only when there is none.
+
+        Exceptions from ``load`` reach every caller waiting on it and are not
+        cached.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return await load()
+        now = time.time()
+        entry = self.local.get(key, now)
+        if entry is None and self.shared is not None:
+            entry = await self._shared_get(key, now)
+        if entry is not None:
+            value, fresh_until, _ = entry
+            if now < fresh_until:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._flight(key, load, ttl)
+            return value
+        self.misses += 1
+        flight_key = (self.generation, key)
+        if flight_key in self._inflight:
+            self.coalesced += 1
+        # Shielded: a caller that goes away does not cancel the others' load
+        return await asyncio.shield(self._flight(key, load, ttl))
+
+    def _flight(self, key: str, load: Load, ttl: float) -> asyncio.Task:
+        flight_key = (self.generation, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, load, ttl, self.generation))
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda done: self._landed(flight_key, done))
+        return task
+
+    def _landed(self, flight_key: Tuple[int, str], task: asyncio.Task):
+        self._inflight.pop(flight_key, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieved here so a failed background refresh is not reported
+            # as an unhandled task error; waiters still get the exception
+            self.errors += 1
+
+    async def _fill(self, key: str, load: Load, ttl: float, generation: int) -> Any:
+        self.loads += 1
+        shared_generation = await self._shared_generation()
+        value = await load()
+        if generation == self.generation:
+            now = time.time()
+            entry = (value, now + ttl, now + ttl + self.stale_seconds)
+            self.local.set(key, entry)
+            if shared_generation is not None:
+                try:
+                    await self.shared.set(key, entry, shared_generation)
+                except Exception:
+                    # The shared store is an optimisation; the value is still good
+                    pass
+        return value
+
+    async def _shared_invalidated(self):
+        """Wait for this worker's last generation bump to reach the shared store."""
+        if self._invalidating is not None and not self._invalidating.done():
+            await asyncio.shield(self._invalidating)
+
+    async def _shared_generation(self) -> Optional[int]:
+        """The shared generation before a load, or None to not share its value."""
+        if self.shared is None:
+            return None
+        try:
+            await self._shared_invalidated()
+            return await self.shared.generation()
+        except Exception:
+            return None
+
+    async def _shared_get(self, key: str, now: float) -> Optional[Entry]:
+        try:
+            await self._shared_invalidated()
+            entry = await self.shared.get(key)
+        except Exception:
+            return None
+        if entry is None or entry[2] <= now:
+            return None
+        self.local.set(key, entry)
+        return entry
+
+    def invalidate(self, shared: bool = True):
+        """Drop every entry, here and (unless ``shared`` is False) in the shared store."""
+        self.generation += 1
+        self.local.clear()
+        if shared and self.shared is not None:
+            self._invalidating = asyncio.ensure_future(self._invalidate_shared())
+
+    async def _invalidate_shared(self):
+        try:
+            await self.shared.invalidate()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses
+        return {
+            "size": len(self.local),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "errors": self.errors,
+            "hit_ratio": served / lookups if lookups else 0.0,
+            "shared": self.shared is not None,
+        }
+
+
+def create_response_cache() -> ResponseCache:
+    shared = None
+    if RESPONSE_CACHE_REDIS_URL:
+        import redis.asyncio as redis
+
+        shared = RedisStore(redis.from_url(RESPONSE_CACHE_REDIS_URL))
+    return ResponseCache(shared)
@@ -0,0 +1,397 @@
+"""In-process inverted index over the content catalog.
+
+Optional search engine for deployments whose catalog fits in memory
+(``SEARCH_ENGINE=memory``). ``/api/content/search`` is then answered without
+touching the database, which matters for the search-as-you-type requests
+from ``AdvancedSearch.js``.
+
+* Text: ``title``, ``original_title``, ``synopsis``, ``tags`` and
+  ``cast[].name`` are tokenized into an inverted index. Latin-script text is
+  split into words; Hangul, kana and CJK ideographs, which are written without
+  spaces, are indexed as character bigrams so any substring of two or more
+  characters matches. The last query word also matches as a prefix.
+* Filters: ``country``, ``content_type``, ``genres``, year and rating are
+  precomputed as bitsets (Python ints, one bit per document), so a filter is a
+  handful of integer ANDs/ORs.
+* Ordering: documents matching a query are ranked by field-weighted term
+  frequency times IDF; field sorts walk a presorted order cached per field.
+
+The index is loaded on first use, kept current by the content write
+endpoints, and fully rebuilt every ``SEARCH_INDEX_REFRESH_SECONDS`` to pick up
+writes made by other workers.
+"""
+import asyncio
+import bisect
+import heapq
+import math
+import os
+import re
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "600"))
+# Most vocabulary terms a trailing prefix may expand to
+MAX_PREFIX_EXPANSIONS = 64
+
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "original_title": 3.0,
+    "cast": 2.0,
+    "tags": 2.0,
+    "synopsis": 1.0,
+}
+
+_CJK = "ᄀ-ᇿ぀-ヿ㄰-㆏㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_RE = re.compile(f"([{_CJK}]+)|([^\\W{_CJK}]+)", re.UNICODE)
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased words, with CJK runs split into overlapping bigrams."""
+    if not text:
+        return []
+    tokens = []
+    for cjk, word in _TOKEN_RE.findall(text.lower()):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def _field_text(row: dict, field: str) -> str:
+    value = row.get(field)
+    if field == "cast":
+        return " ".join(str(member.get("name", "")) for member in value or [] if isinstance(member, dict))
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return value or ""
+
+
+def _bits_from_ordinals(ordinals: Iterable[int], size: int) -> int:
+    buffer = bytearray((size + 7) // 8)
+    for ordinal in ordinals:
+        buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class _Membership:
+    """O(1) bit tests against a bitset; shifting a large int is O(n)."""
+
+    __slots__ = ("_bytes",)
+
+    def __init__(self, bits: int, size: int):
+        self._bytes = bits.to_bytes((size + 7) // 8 or 1, "little")
+
+    def __contains__(self, ordinal: int) -> bool:
+        return bool(self._bytes[ordinal >> 3] >> (ordinal & 7) & 1)
+
+
+class ContentIndex:
+    """Inverted index plus filter bitsets over content rows."""
+
+    def __init__(self, refresh_seconds: float = SEARCH_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        # Writes made while a rebuild runs, replayed onto the new index
+        self._journal: Optional[List[Tuple[str, Any]]] = None
+        self._reset()
+
+    def _reset(self):
+        self.rows: List[Optional[dict]] = []
+        self.ordinals: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.doc_terms: Dict[int, List[str]] = {}
+        self.alive = 0
+        self.bitsets: Dict[Tuple[str, Any], int] = defaultdict(int)
+        self.doc_keys: Dict[int, List[Tuple[str, Any]]] = {}
+        self._vocabulary: Optional[List[str]] = None
+        self._orders: Dict[Tuple[str, bool], Tuple[List[int], Dict[int, int]]] = {}
+
+    # Loading
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.time() - self.loaded_at > self.refresh_seconds
+
+    async def ensure_loaded(self, load_rows: Callable[[], Awaitable[List[dict]]]):
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if not self.is_stale():
+                return
+            # Journal from before the read: a write landing while it is in
+            # flight may be missing from the rows
+            self._journal = []
+            try:
+                rows = await load_rows()
+                # Build off the event loop, then swap it in; searches keep
+                # using the current index meanwhile
+                fresh = ContentIndex(self.refresh_seconds)
+                await asyncio.get_running_loop().run_in_executor(None, fresh.rebuild, rows)
+                for op, arg in self._journal:
+                    getattr(fresh, op)(arg)
+            finally:
+                self._journal = None
+            self._adopt(fresh)
+
+    def _adopt(self, other: "ContentIndex"):
+        self.rows, self.ordinals, self.postings = other.rows, other.ordinals, other.postings
+        self.doc_terms, self.alive, self.bitsets = other.doc_terms, other.alive, other.bitsets
+        self.doc_keys, self._vocabulary, self._orders = other.doc_keys, other._vocabulary, other._orders
+        self.loaded_at = other.loaded_at
+
+    def rebuild(self, rows: Iterable[dict]):
+        self._reset()
+        members: Dict[Tuple[str, Any], List[int]] = defaultdict(list)
+        for row in rows:
+            ordinal = self._index(row)
+            for key in self.doc_keys[ordinal]:
+                members[key].append(ordinal)
+        # Bitsets are built once here; setting bits one by one is quadratic
+        size = len(self.rows)
+        self.alive = (1 << size) - 1
+        for key, ordinals in members.items():
+            self.bitsets[key] = _bits_from_ordinals(ordinals, size)
+        self.loaded_at = time.time()
+
+    # Writes
+
+    def upsert(self, rows: Iterable[dict]):
+        rows = list(rows)
+        if self._journal is not None:
+            self._journal.append(("upsert", rows))
+        for row in rows:
+            # An update keeps the title's ordinal, so rows and bitsets grow
+            # with the catalog rather than with the number of writes
+            ordinal = self.ordinals.get(row["id"])
+            if ordinal is not None:
+                self._unindex(ordinal)
+            ordinal = self._index(row, ordinal)
+            bit = 1 << ordinal
+            self.alive |= bit
+            for key in self.doc_keys[ordinal]:
+                self.bitsets[key] |= bit
+
+    def remove(self, content_ids: Iterable[str]):
+        content_ids = list(content_ids)
+        if self._journal is not None:
+            self._journal.append(("remove", content_ids))
+        for content_id in content_ids:
+            self._remove(content_id)
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def _index(self, row: dict, ordinal: Optional[int] = None) -> int:
+        """Store the row and its postings; bitsets are left to the caller."""
+        if ordinal is None:
+            ordinal = len(self.rows)
+            self.rows.append(row)
+        else:
+            self.rows[ordinal] = row
+        self.ordinals[row["id"]] = ordinal
+
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(row, field)):
+                weights[token] += weight
+        for token, weight in weights.items():
+            self.postings[token][ordinal] = weight
+        self.doc_terms[ordinal] = list(weights)
+
+        keys = [("country", row.get("country")), ("content_type", row.get("content_type"))]
+        keys += [("genre", genre) for genre in dict.fromkeys(row.get("genres") or [])]
+        if row.get("year") is not None:
+            keys.append(("year", int(row["year"])))
+        if row.get("rating") is not None:
+            # Tenths of a point, so range filters are exact to one decimal
+            keys.append(("rating", int(round(float(row["rating"]) * 10))))
+        self.doc_keys[ordinal] = [key for key in keys if key[1] is not None]
+
+        self._vocabulary = None
+        self._orders.clear()
+        return ordinal
+
+    def _remove(self, content_id: str):
+        ordinal = self.ordinals.pop(content_id, None)
+        if ordinal is None:
+            return
+        self._unindex(ordinal)
+        self.rows[ordinal] = None
+
+    def _unindex(self, ordinal: int):
+        """Drop an ordinal's postings and bits; the row slot is left to the caller."""
+        bit = 1 << ordinal
+        self.alive &= ~bit
+        for token in self.doc_terms.pop(ordinal, []):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(ordinal, None)
+                if not postings:
+                    del self.postings[token]
+        for key in self.doc_keys.pop(ordinal, []):
+            self.bitsets[key] &= ~bit
+        self._vocabulary = None
+        self._orders.clear()
+
+    # Queries
+
+    def _range_bits(self, name: str, low: Optional[int], high: Optional[int]) -> int:
+        bits = 0
+        for (key_name, value), bitset in self.bitsets.items():
+            if key_name == name and (low is None or value >= low) and (high is None or value <= high):
+                bits |= bitset
+        return bits
+
+    def filter_bits(
+        self,
+        country: Optional[str] = None,
+        content_type: Optional[str] = None,
+        genre: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        rating_min: Optional[float] = None,
+        rating_max: Optional[float] = None,
+    ) -> int:
+        bits = self.alive
+        if country:
+            bits &= self.bitsets.get(("country", country), 0)
+        if content_type:
+            bits &= self.bitsets.get(("content_type", content_type), 0)
+        if genre:
+            bits &= self.bitsets.get(("genre", genre), 0)
+        if year_from or year_to:
+            bits &= self._range_bits("year", year_from or None, year_to or None)
+        if rating_min or rating_max:
+            low = int(math.ceil(rating_min * 10 - 1e-9)) if rating_min else None
+            high = int(math.floor(rating_max * 10 + 1e-9)) if rating_max else None
+            bits &= self._range_bits("rating", low, high)
+        return bits
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _query_terms(self, text: str) -> List[List[str]]:
+        """Index terms per query token; the last word also matches as a prefix."""
+        tokens = list(dict.fromkeys(tokenize(text)))
+        groups = []
+        for position, token in enumerate(tokens):
+            terms = [token]
+            if position == len(tokens) - 1 and not _CJK_RE.match(token):
+                terms = self._expand_prefix(token) or terms
+            groups.append(terms)
+        return groups
+
+    def _match(self, groups: List[List[str]]) -> set:
+        """Ordinals containing a term from every group."""
+        matches = []
+        for terms in groups:
+            if len(terms) == 1:
+                matches.append(self.postings.get(terms[0], {}).keys())
+            else:
+                matches.append(set().union(*(self.postings.get(term, {}).keys() for term in terms)))
+        matches.sort(key=len)
+        result = set(matches[0])
+        for other in matches[1:]:
+            if not result:
+                break
+            result &= other
+        return result
+
+    def _score(self, groups: List[List[str]], ordinals: Iterable[int]) -> Dict[int, float]:
+        """Field-weighted term frequency times IDF, best term per group."""
+        total_docs = max(1, len(self.ordinals))
+        scores = dict.fromkeys(ordinals, 0.0)
+        for terms in groups:
+            weighted = [
+                (postings, math.log(1 + total_docs / (1 + len(postings))))
+                for postings in (self.postings.get(term, {}) for term in terms)
+            ]
+            if len(weighted) == 1:
+                # Every matched ordinal has a posting for a lone term
+                postings, idf = weighted[0]
+                for ordinal in scores:
+                    scores[ordinal] += postings[ordinal] * idf
+            else:
+                # Walk the postings rather than probing every term per document
+                best: Dict[int, float] = {}
+                for postings, idf in weighted:
+                    for ordinal, weight in postings.items():
+                        if ordinal in scores and weight * idf > best.get(ordinal, 0.0):
+                            best[ordinal] = weight * idf
+                for ordinal, score in best.items():
+                    scores[ordinal] += score
+        return scores
+
+    def _order(self, field: str, descending: bool = True) -> Tuple[List[int], Dict[int, int]]:
+        """Live ordinals sorted by ``field`` (NULLs last, like the database keyset order), and their positions."""
+        key = (field, descending)
+        cached = self._orders.get(key)
+        if cached is None:
+            live = [(row.get(field), ordinal) for ordinal, row in enumerate(self.rows) if row is not None]
+            present = sorted((item for item in live if item[0] is not None), key=lambda item: item[0], reverse=descending)
+            order = [ordinal for _, ordinal in present] + [ordinal for value, ordinal in live if value is None]
+            cached = self._orders[key] = (order, {ordinal: i for i, ordinal in enumerate(order)})
+        return cached
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        sort_by: str = "rating",
+        sort_order: str = "desc",
+        offset: int = 0,
+        limit: int = 20,
+        **filters,
+    ) -> Tuple[List[dict], int]:
+        """Return one page of matching rows and the total match count."""
+        candidates = self.filter_bits(**filters)
+        filtered = candidates != self.alive
+        members = _Membership(candidates, len(self.rows)) if filtered else None
+        descending = sort_order != "asc"
+        end = offset + limit
+
+        groups = self._query_terms(text) if text else []
+        if groups:
+            matched = self._match(groups)
+            if filtered:
+                matched = {ordinal for ordinal in matched if ordinal in members}
+            if sort_by == "relevance":
+                scores = self._score(groups, matched)
+                ranked = heapq.nsmallest(end, matched, key=lambda ordinal: (-scores[ordinal], ordinal))
+            else:
+                _, position = self._order(sort_by, descending)
+                ranked = heapq.nsmallest(end, matched, key=position.__getitem__)
+            return [self.rows[ordinal] for ordinal in ranked[offset:]], len(matched)
+        if text and text.strip():
+            # Only punctuation: nothing can match
+            return [], 0
+
+        total = candidates.bit_count()
+        if sort_by == "relevance":
+            # Nothing to rank against without a query
+            sort_by = "rating"
+        order, _ = self._order(sort_by, descending)
+        page = []
+        skipped = 0
+        for ordinal in order:
+            if filtered and ordinal not in members:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            page.append(self.rows[ordinal])
+            if len(page) == limit:
+                break
+        return page, total
@@ -0,0 +1,147 @@
+"""Sample catalog for new deployments.
+
+The sample titles used to be inserted by the API's startup hook, one
+request per title, on every worker boot: each worker raced the others, and
+an empty catalog could end up with the titles several times over. Seeding
+is now an explicit step (``python manage.py seed``) that writes all titles
+in one request. Ids are derived from the titles and existing ids are left
+alone, so running it twice, or from two machines at once, adds nothing.
+"""
+import uuid
+from typing import Any, Dict, List
+
+from db import execute
+
+SAMPLE_NAMESPACE = uuid.UUID("6f1d3c52-8a4e-4f0b-9c1e-2d7a5b9e0c41")
+
+
+def sample_id(title: str) -> str:
+    return str(uuid.uuid5(SAMPLE_NAMESPACE, title))
+
+
+SAMPLE_CONTENT = [
+    {
+        "id": sample_id("Squid Game"),
+        "title": "Squid Game",
+        "original_title": "오징어 게임",
+        "synopsis": "Hundreds of cash-strapped players accept a strange invitation to compete in children's games for a tempting prize.",
+        "year": 2021,
+        "country": "South Korea",
+        "content_type": "series",
+        "genres": ["thriller", "drama", "mystery"],
+        "rating": 8.0,
+        "episodes": 9,
+        "duration": 60,
+        "cast": [
+            {"name": "Lee Jung-jae", "character": "Seong Gi-hun"},
+            {"name": "Park Hae-soo", "character": "Cho Sang-woo"}
+        ],
+        "crew": [{"name": "Hwang Dong-hyuk", "role": "Director"}],
+        "streaming_platforms": ["Netflix"],
+        "tags": ["survival", "psychological", "korean"],
+        "poster_url": "https://images.unsplash.com/photo-1611162617474-5b21e879e113?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxrcmVhbiUyMGRyYW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85",
+        "banner_url": "https://images.unsplash.com/photo-1611162617474-5b21e879e113?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxrcmVhbiUyMGRyYW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "id": sample_id("Your Name"),
+        "title": "Your Name",
+        "original_title": "君の名は。",
+        "synopsis": "Two teenagers share a profound, magical connection upon discovering they are swapping bodies.",
+        "year": 2016,
+        "country": "Japan",
+        "content_type": "movie",
+        "genres": ["romance", "drama", "fantasy"],
+        "rating": 8.4,
+        "episodes": None,
+        "duration": 106,
+        "cast": [
+            {"name": "Ryunosuke Kamiki", "character": "Taki Tachibana"},
+            {"name": "Mone Kamishiraishi", "character": "Mitsuha Miyamizu"}
+        ],
+        "crew": [{"name": "Makoto Shinkai", "role": "Director"}],
+        "streaming_platforms": ["Crunchyroll", "Funimation"],
+        "tags": ["anime", "body-swap", "supernatural"],
+        "poster_url": "https://images.unsplash.com/photo-1578662996442-48f60103fc96?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwyfHxhbmltZXxlbnwwfHx8fDE3NTM1MjcyNTZ8MA&ixlib=rb-4.1.0&q=85",
+        "banner_url": "https://images.unsplash.com/photo-1578662996442-48f60103fc96?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwyfHxhbmltZXxlbnwwfHx8fDE3NTM1MjcyNTZ8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "id": sample_id("Parasite"),
+        "title": "Parasite",
+        "original_title": "기생충",
+        "synopsis": "A poor family schemes to become employed by a wealthy family and infiltrate their household.",
+        "year": 2019,
+        "country": "South Korea",
+        "content_type": "movie",
+        "genres": ["thriller", "drama", "comedy"],
+        "rating": 8.6,
+        "episodes": None,
+        "duration": 132,
+        "cast": [
+            {"name": "Song Kang-ho", "character": "Ki-taek"},
+            {"name": "Lee Sun-kyun", "character": "Park Dong-ik"}
+        ],
+        "crew": [{"name": "Bong Joon-ho", "role": "Director"}],
+        "streaming_platforms": ["Hulu", "Amazon Prime"],
+        "tags": ["oscar-winner", "social-commentary", "korean"],
+        "poster_url": "https://images.unsplash.com/photo-1611162617474-5b21e879e113?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxrcmVhbiUyMGRyYW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85",
+        "banner_url": "https://images.unsplash.com/photo-1611162617474-5b21e879e113?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxrcmVhbiUyMGRyYW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "id": sample_id("3 Idiots"),
+        "title": "3 Idiots",
+        "original_title": "3 Idiots",
+        "synopsis": "Two friends are searching for their long lost companion. They revisit their college days.",
+        "year": 2009,
+        "country": "India",
+        "content_type": "movie",
+        "genres": ["comedy", "drama"],
+        "rating": 8.4,
+        "episodes": None,
+        "duration": 170,
+        "cast": [
+            {"name": "Aamir Khan", "character": "Rancho"},
+            {"name": "R. Madhavan", "character": "Farhan"}
+        ],
+        "crew": [{"name": "Rajkumar Hirani", "role": "Director"}],
+        "streaming_platforms": ["Netflix", "Amazon Prime"],
+        "tags": ["bollywood", "friendship", "comedy"],
+        "poster_url": "https://images.unsplash.com/photo-1626814026160-2237a95fc5a0?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxib2xseXdvb2R8ZW58MHx8fHwxNzUzNTI3MjU2fDA&ixlib=rb-4.1.0&q=85",
+        "banner_url": "https://images.unsplash.com/photo-1626814026160-2237a95fc5a0?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxib2xseXdvb2R8ZW58MHx8fHwxNzUzNTI3MjU2fDA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "id": sample_id("Money Heist"),
+        "title": "Money Heist",
+        "original_title": "La Casa de Papel",
+        "synopsis": "An unusual group of robbers attempt to carry out the most perfect robbery in Spanish history.",
+        "year": 2017,
+        "country": "Spain",
+        "content_type": "series",
+        "genres": ["crime", "thriller", "drama"],
+        "rating": 8.2,
+        "episodes": 41,
+        "duration": 70,
+        "cast": [
+            {"name": "Úrsula Corberó", "character": "Tokyo"},
+            {"name": "Álvaro Morte", "character": "The Professor"}
+        ],
+        "crew": [{"name": "Álex Pina", "role": "Creator"}],
+        "streaming_platforms": ["Netflix"],
+        "tags": ["heist", "spanish", "crime"],
+        "poster_url": "https://images.unsplash.com/photo-1489599856641-b1d4c2b53f1b?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxzcGFuaXNoJTIwY2luZW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85",
+        "banner_url": "https://images.unsplash.com/photo-1489599856641-b1d4c2b53f1b?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxzcGFuaXNoJTIwY2luZW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85"
+    }
+]
+
+
+async def seed_sample_content(supabase, force: bool = False) -> List[Dict[str, Any]]:
+    """Insert the sample titles; returns the rows that were new.
+
+    A catalog that already has content is left alone unless ``force``.
+    """
+    if not force:
+        existing = await execute(supabase.table("content").select("id").limit(1))
+        if existing.data:
+            return []
+    # ON CONFLICT (id) DO NOTHING
+    result = await execute(supabase.table("content").upsert(SAMPLE_CONTENT, on_conflict="id", ignore_duplicates=True))
+    return result.data
@@ -1,19 +1,57 @@
+import asyncio
+import json
+import logging
 import os
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Query
+from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, Field
 from supabase import create_client, Client
 from gotrue.errors import AuthApiError
-import pandas as pd
-import json
-from io import BytesIO
+from db import begin_query_stats, execute, fetch_all, run_sync, shutdown as shutdown_db
+from auth_cache import AuthUser, TokenCache, TokenVerifier, create_shared_revocations, hash_token, unverified_expiry
+import profiles
+from facets import FacetCatalog
+from search_index import ContentIndex
+from pagination import InvalidCursor, decode_cursor, keyset_page, offset_cursor, page_result
+from totals import COUNT_MODE_PATTERN, TotalsCache, totals_key
+from response_cache import create_response_cache, response_key
+from content_events import ContentChange, create_content_events
+from featured import FeaturedRails, rail_key
+from trending import TRENDING_PERIOD_PATTERN, TrendingEngine
+from http_cache import conditional_response, content_etag, etag_matches, render_json, validated_response, weak_etag
+from content_fields import IMPORTED_FIELDS, IMPORT_EXTENSIONS, IMPORT_MODE_PATTERN
+from exporter import EXPORTED_FIELDS, EXPORT_FORMAT_PATTERN, EXPORT_PAGE_ROWS, MEDIA_TYPES, encode_stream, export_filename, export_pages
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The client is built here rather than at import, so importing the app
+    # (tests, tooling, each worker before it binds) stays cheap
+    global supabase
+    if supabase is None:
+        supabase = create_client(supabase_url, supabase_key)
+    content_events.start()
+    if shared_revocations is not None:
+        shared_revocations.start()
+    featured_rails.start(load_featured_rail, load_featured_countries)
+    trending_engine.start(save_trending_scores, load_trending_scores)
+    yield
+    if import_jobs is not None:
+        await import_jobs.shutdown()
+    await featured_rails.stop()
+    await trending_engine.stop(save_trending_scores)
+    await content_events.stop()
+    if shared_revocations is not None:
+        await shared_revocations.stop()
+    shutdown_db()
 
 # Initialize FastAPI app
-app = FastAPI(title="Global Drama Verse Guide API", version="1.0.0")
+app = FastAPI(title="Global Drama Verse Guide API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -24,13 +62,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Supabase client
+@app.middleware("http")
+async def request_scope(request, call_next):
+    # Per-request query counter and profile loader
+    stats = begin_query_stats()
+    profiles.begin_request(profiles.ProfileLoader(fetch_profiles, fetch_profile_by_username, username_cache))
+    response = await call_next(request)
+    response.headers["X-Query-Count"] = str(stats.count)
+    return response
+
+logger = logging.getLogger(__name__)
+
+# Supabase client, created by the lifespan hook
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_ANON_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+supabase: Optional[Client] = None
 
 # Security
 security = HTTPBearer()
+token_cache = TokenCache()
+# Logouts reach every worker's cache (None without Redis)
+shared_revocations = create_shared_revocations(token_cache)
+token_verifier = TokenVerifier(supabase_url, os.getenv("SUPABASE_JWT_SECRET"))
+username_cache = profiles.UsernameCache()
+facet_catalog = FacetCatalog()
+totals_cache = TotalsCache()
+response_cache = create_response_cache()
+content_events = create_content_events()
+featured_rails = FeaturedRails()
+trending_engine = TrendingEngine()
+# Content rows of titles that have trended, so serving a ranking needs no query
+trending_rows: Dict[str, Dict[str, Any]] = {}
+TRENDING_ROWS_SIZE = int(os.getenv("TRENDING_ROWS_SIZE", "5000"))
+# "postgres" (default) or "memory" to serve catalog search from an in-process index
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "postgres")
+content_index = ContentIndex() if SEARCH_ENGINE == "memory" else None
 
 # Pydantic Models
 class UserRegister(BaseModel):
@@ -100,21 +166,89 @@ class CommentCreate(BaseModel):
 
 # Authentication helpers
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
     try:
-        token = credentials.credentials
-        user = supabase.auth.get_user(token)
-        if not user.user:
+        if token_cache.is_revoked(token):
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if shared_revocations is not None and await shared_revocations.is_revoked(hash_token(token)):
+            # Logged out on another worker
             raise HTTPException(status_code=401, detail="Invalid token")
-        return user.user
+        if token_verifier.can_verify(token):
+            # Signature and expiry checked locally, no GoTrue round trip
+            claims = await run_sync(token_verifier.verify, token)
+            user = AuthUser.from_claims(claims)
+            token_cache.put(token, user, claims["exp"])
+        else:
+            response = await run_sync(supabase.auth.get_user, token)
+            if not response.user:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            user = AuthUser.from_gotrue(response.user)
+            token_cache.put(token, user, unverified_expiry(token))
+        return user
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def fetch_profiles(user_ids: List[str]) -> List[Dict[str, Any]]:
+    result = await execute(supabase.table("profiles").select("*").in_("id", user_ids))
+    return result.data
+
+async def fetch_profile_by_username(username: str) -> Optional[Dict[str, Any]]:
+    result = await execute(supabase.table("profiles").select("*").eq("username", username))
+    return result.data[0] if result.data else None
+
+def get_profile_loader() -> profiles.ProfileLoader:
+    loader = profiles.current_loader()
+    if loader is None:
+        # Outside an HTTP request, e.g. from a script
+        loader = profiles.ProfileLoader(fetch_profiles, fetch_profile_by_username, username_cache)
+        profiles.begin_request(loader)
+    return loader
+
+def parse_cursor(cursor: Optional[str], sort: str, descending: bool) -> Optional[Dict[str, Any]]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, sort, descending)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def page_with_total(table, key, build_page, build_count, include_total, count_mode, after=None):
+    """Run a page query and resolve its total, reusing a cached count.
+
+    ``build_page(count)`` and ``build_count(count)`` return the page and count
+    queries selecting with the given PostgREST count method. Unless a keyset
+    cursor narrows the page query, the total rides on the page request.
+    """
+    total = totals_cache.get(table, key, count_mode) if include_total else None
+    if not include_total or total is not None:
+        return await execute(build_page(None)), total
+    if after is None or "o" in after:
+        result = await execute(build_page(count_mode))
+        total = result.count
+    else:
+        result, count_result = await asyncio.gather(execute(build_page(None)), execute(build_count(count_mode)))
+        total = count_result.count
+    totals_cache.put(table, key, count_mode, total)
+    return result, total
+
+async def resolve_user_id(username: str) -> Optional[str]:
+    user_id = username_cache.get_id(username)
+    if user_id is not None:
+        return user_id
+    profile = await get_profile_loader().load_by_username(username)
+    return profile["id"] if profile else None
+
 async def get_current_user_profile(current_user = Depends(get_current_user)):
     try:
-        result = supabase.table("profiles").select("*").eq("id", current_user.id).execute()
-        if not result.data:
+        profile = await get_profile_loader().load(current_user.id)
+        if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
-        return result.data[0]
+        return profile
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -128,7 +262,7 @@ async def root():
 async def register(user_data: UserRegister):
     try:
         # Register user with Supabase Auth
-        auth_response = supabase.auth.sign_up({
+        auth_response = await run_sync(supabase.auth.sign_up, {
             "email": user_data.email,
             "password": user_data.password,
             "options": {
@@ -148,7 +282,8 @@ async def register(user_data: UserRegister):
                 "first_name": user_data.first_name,
                 "last_name": user_data.last_name
             }
-            supabase.table("profiles").insert(profile_data).execute()
+            await execute(supabase.table("profiles").insert(profile_data))
+            username_cache.set(user_data.username, auth_response.user.id)
             
             return {
                 "message": "User registered successfully",
@@ -166,7 +301,7 @@ async def register(user_data: UserRegister):
 @app.post("/api/auth/login")
 async def login(credentials: UserLogin):
     try:
-        auth_response = supabase.auth.sign_in_with_password({
+        auth_response = await run_sync(supabase.auth.sign_in_with_password, {
             "email": credentials.email,
             "password": credentials.password
         })
@@ -185,12 +320,29 @@ async def login(credentials: UserLogin):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security), current_user = Depends(get_current_user)):
+    token = credentials.credentials
+    expires_at = token_cache.revoke(token, unverified_expiry(token))
+    if shared_revocations is not None:
+        try:
+            await shared_revocations.revoke(hash_token(token), expires_at)
+        except Exception:
+            logger.warning("Could not share the revocation of a token", exc_info=True)
+    try:
+        # End the session in GoTrue too, so its refresh token stops working
+        await run_sync(supabase.auth.admin.sign_out, token, "local")
+    except Exception:
+        logger.warning("GoTrue sign-out failed", exc_info=True)
+    return {"message": "Logged out successfully"}
+
 @app.get("/api/auth/me")
 async def get_current_user_info(current_user = Depends(get_current_user)):
     try:
-        result = supabase.table("profiles").select("*").eq("id", current_user.id).execute()
-        if result.data:
-            return result.data[0]
+        loader = get_profile_loader()
+        profile = await loader.load(current_user.id)
+        if profile:
+            return profile
         else:
             # Create profile if it doesn't exist
             profile_data = {
@@ -199,7 +351,9 @@ async def get_current_user_info(current_user = Depends(get_current_user)):
                 "first_name": current_user.user_metadata.get("first_name", ""),
                 "last_name": current_user.user_metadata.get("last_name", "")
             }
-            result = supabase.table("profiles").insert(profile_data).execute()
+            result = await execute(supabase.table("profiles").insert(profile_data))
+            loader.clear(current_user.id)
+            loader.prime(result.data[0])
             return result.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -208,65 +362,136 @@ async def get_current_user_info(current_user = Depends(get_current_user)):
 async def update_profile(profile_data: ProfileUpdate, current_user = Depends(get_current_user)):
     try:
         update_data = {k: v for k, v in profile_data.dict().items() if v is not None}
-        result = supabase.table("profiles").update(update_data).eq("id", current_user.id).execute()
+        result = await execute(supabase.table("profiles").update(update_data).eq("id", current_user.id))
+        # Write the new row (and any rename) through to the loader and username cache
+        loader = get_profile_loader()
+        loader.clear(current_user.id)
+        if result.data:
+            loader.prime(result.data[0])
+        elif "username" in update_data:
+            username_cache.forget(current_user.id)
         return result.data[0] if result.data else {}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Content endpoints
+async def cached_json(request: Request, route: str, key: str, load, strong_etag=None) -> Response:
+    """A catalog response through the response cache, with its ETag.
+
+    The body is rendered and its validator computed once per load, so a
+    matching ``If-None-Match`` on a cache hit costs neither a query nor a
+    serialization.
+    """
+    async def render():
+        value = await load()
+        body = render_json(value)
+        return {"body": body, "etag": strong_etag(value, body) if strong_etag else weak_etag(body)}
+    
+    entry = await response_cache.get_or_load(key, render)
+    return conditional_response(request.headers.get("if-none-match"), entry["body"], entry["etag"], route)
+
+def content_search_filter(text: str) -> str:
+    """PostgREST ``or`` filter for a free-text catalog search.
+
+    Matches the GIN-indexed ``search_vector`` (title, original title, tags,
+    synopsis) or a title substring served by the trigram indexes, which is
+    what catches unsegmented Korean/Japanese original titles.
+    """
+    value = postgrest_quote(text)
+    if not text.strip("*"):
+        # Nothing literal to look for in titles; see like_escape
+        return f'search_vector.wfts(simple).{value}'
+    pattern = postgrest_quote("%" + like_escape(text) + "%")
+    return f'search_vector.wfts(simple).{value},title.ilike.{pattern},original_title.ilike.{pattern}'
+
+def like_escape(text: str) -> str:
+    """``text`` as a literal inside an ILIKE pattern.
+
+    PostgREST turns ``*`` into ``%`` and has no escape for it, so ``*``
+    becomes ``_`` (any one character) instead.
+    """
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "_")
+
+def postgrest_quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def apply_content_filters(
+    db_query,
+    country: Optional[str] = None,
+    content_type: Optional[str] = None,
+    genre: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    rating_min: Optional[float] = None,
+    rating_max: Optional[float] = None
+):
+    if country:
+        db_query = db_query.eq("country", country)
+    if content_type:
+        db_query = db_query.eq("content_type", content_type)
+    if genre:
+        db_query = db_query.contains("genres", [genre])
+    if year_from:
+        db_query = db_query.gte("year", year_from)
+    if year_to:
+        db_query = db_query.lte("year", year_to)
+    if rating_min:
+        db_query = db_query.gte("rating", rating_min)
+    if rating_max:
+        db_query = db_query.lte("rating", rating_max)
+    return db_query
+
 @app.get("/api/content")
 async def get_contents(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    count_mode: str = Query("exact", pattern=COUNT_MODE_PATTERN)
 ):
+    after = parse_cursor(cursor, "created_at", True)
     try:
         offset = (page - 1) * limit
-        query = supabase.table("content").select("*")
-        
-        if search:
-            query = query.or_(f"title.ilike.%{search}%,synopsis.ilike.%{search}%")
+        search_groups = [content_search_filter(search)] if search else []
         
-        # Get total count
-        count_result = supabase.table("content").select("id", count="exact").execute()
-        total = count_result.count
+        def build_count(count):
+            count_query = supabase.table("content").select("id", count=count, head=True)
+            return count_query.or_(search_groups[0]) if search_groups else count_query
         
-        # Get paginated results
-        result = query.range(offset, offset + limit - 1).order("created_at", desc=True).execute()
+        # Get the page after the cursor, or by offset without one, and the
+        # total for the same search
+        result, total = await page_with_total(
+            "content", totals_key(query=search),
+            lambda count: keyset_page(supabase.table("content").select("*", count=count), "created_at", True, limit, offset, after, search_groups),
+            build_count, include_total, count_mode, after
+        )
+        contents, next_cursor = page_result(result.data, "created_at", True, limit, after)
         
         return {
-            "contents": result.data,
+            "contents": contents,
             "total": total,
             "page": page,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/content/{content_id}")
-async def get_content(content_id: str):
-    try:
-        result = supabase.table("content").select("*").eq("id", content_id).execute()
-        if not result.data:
-            raise HTTPException(status_code=404, detail="Content not found")
-        return result.data[0]
-    except Exception as e:
-        if "not found" in str(e).lower():
-            raise HTTPException(status_code=404, detail="Content not found")
-        raise HTTPException(status_code=500, detail=str(e))
-
 @app.post("/api/content")
 async def create_content(content_data: ContentCreate, current_user = Depends(get_current_user)):
     try:
         content_dict = content_data.dict()
         content_dict["id"] = str(uuid.uuid4())
-        result = supabase.table("content").insert(content_dict).execute()
+        result = await execute(supabase.table("content").insert(content_dict))
+        content_saved(result.data)
         return result.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/content/search")
 async def search_content(
+    request: Request,
     query: Optional[str] = None,
     country: Optional[str] = None,
     content_type: Optional[str] = None,
@@ -278,163 +503,312 @@ async def search_content(
     sort_by: str = "rating",
     sort_order: str = "desc",
     page: int = Query(1, ge=1),
-    limit: int = Query(20, ge=1, le=100)
+    limit: int = Query(20, ge=1, le=100),
+    include_facets: bool = False,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    count_mode: str = Query("exact", pattern=COUNT_MODE_PATTERN)
 ):
-    try:
+    if sort_by == "relevance" and not query:
+        # Nothing to rank against without a query
+        sort_by = "rating"
+    descending = sort_order != "asc"
+    after = parse_cursor(cursor, sort_by, descending)
+    
+    async def load():
         offset = (page - 1) * limit
-        db_query = supabase.table("content").select("*")
-        
-        # Apply filters
-        if query:
-            db_query = db_query.or_(f"title.ilike.%{query}%,synopsis.ilike.%{query}%")
-        if country:
-            db_query = db_query.eq("country", country)
-        if content_type:
-            db_query = db_query.eq("content_type", content_type)
-        if genre:
-            db_query = db_query.contains("genres", [genre])
-        if year_from:
-            db_query = db_query.gte("year", year_from)
-        if year_to:
-            db_query = db_query.lte("year", year_to)
-        if rating_min:
-            db_query = db_query.gte("rating", rating_min)
-        if rating_max:
-            db_query = db_query.lte("rating", rating_max)
-        
-        # Apply sorting
-        ascending = sort_order == "asc"
-        db_query = db_query.order(sort_by, desc=not ascending)
-        
-        # Get results with pagination
-        result = db_query.range(offset, offset + limit - 1).execute()
-        
-        # Get total count for the filtered query
-        count_query = supabase.table("content").select("id", count="exact")
-        if query:
-            count_query = count_query.or_(f"title.ilike.%{query}%,synopsis.ilike.%{query}%")
-        if country:
-            count_query = count_query.eq("country", country)
-        if content_type:
-            count_query = count_query.eq("content_type", content_type)
-        if genre:
-            count_query = count_query.contains("genres", [genre])
-        if year_from:
-            count_query = count_query.gte("year", year_from)
-        if year_to:
-            count_query = count_query.lte("year", year_to)
-        if rating_min:
-            count_query = count_query.gte("rating", rating_min)
-        if rating_max:
-            count_query = count_query.lte("rating", rating_max)
+        filters = dict(
+            country=country, content_type=content_type, genre=genre, year_from=year_from,
+            year_to=year_to, rating_min=rating_min, rating_max=rating_max
+        )
+        # Relevance and field sorts match the same rows, so they share totals
+        key = totals_key(query=query, **filters)
+        
+        if content_index is not None:
+            # Served from memory; the database is only read on (re)load
+            index = await get_content_index()
+            offset = after.get("o", 0) if after else offset
+            contents, total = index.search(query, sort_by, sort_order, offset, limit, **filters)
+            next_cursor = offset_cursor(sort_by, descending, offset, limit, total)
+        elif sort_by == "relevance" and query:
+            # Ranked matches with the filtered total in a single call; rank
+            # is computed per query, so its cursor carries an offset
+            offset = after.get("o", 0) if after else offset
+            result, total = await page_with_total(
+                "content", key,
+                lambda count: apply_content_filters(
+                    supabase.rpc("search_content_ranked", {"q": query}, count=count), **filters
+                ).range(offset, offset + limit - 1),
+                None, include_total, count_mode
+            )
+            contents = result.data
+            next_cursor = offset_cursor(sort_by, descending, offset, limit, total, len(contents))
+        else:
+            search_groups = [content_search_filter(query)] if query else []
             
-        count_result = count_query.execute()
-        total = count_result.count
+            def build_count(count):
+                count_query = supabase.table("content").select("id", count=count, head=True)
+                if search_groups:
+                    count_query = count_query.or_(search_groups[0])
+                return apply_content_filters(count_query, **filters)
+            
+            # Get the page after the cursor, or by offset without one, and the
+            # total for the filtered query
+            result, total = await page_with_total(
+                "content", key,
+                lambda count: keyset_page(
+                    apply_content_filters(supabase.table("content").select("*", count=count), **filters),
+                    sort_by, descending, limit, offset, after, search_groups
+                ),
+                build_count, include_total, count_mode, after
+            )
+            contents, next_cursor = page_result(result.data, sort_by, descending, limit, after, nullable=True)
         
-        return {
-            "contents": result.data,
+        response = {
+            "contents": contents,
             "total": total,
             "page": page,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
+        if include_facets:
+            # Catalog-wide counts for faceted navigation
+            response["facets"] = (await get_facet_catalog()).snapshot()
+        return response
+    
+    try:
+        key = response_key(
+            "search", query=query, country=country, content_type=content_type, genre=genre, year_from=year_from,
+            year_to=year_to, rating_min=rating_min, rating_max=rating_max, sort_by=sort_by, sort_order=sort_order,
+            page=page, limit=limit, include_facets=include_facets, cursor=cursor, include_total=include_total,
+            count_mode=count_mode
+        )
+        return await cached_json(request, "search", key, load)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def featured_query(category: str, country: Optional[str], limit: int):
+    query = supabase.table("content").select("*")
+    
+    if category == "trending":
+        query = query.order("rating", desc=True).order("created_at", desc=True)
+    elif category == "new_releases":
+        query = query.order("created_at", desc=True)
+    elif category == "top_rated":
+        query = query.order("rating", desc=True)
+    elif category == "by_country" and country:
+        query = query.eq("country", country).order("rating", desc=True)
+    
+    return query.limit(limit)
+
+async def load_featured_rail(category: str, country: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    result = await execute(featured_query(category, country, limit))
+    return result.data
+
+async def load_featured_countries() -> List[str]:
+    return (await get_facet_catalog()).values("country")
+
+def render_rail(rows: List[Dict[str, Any]]):
+    body = render_json(rows)
+    return body, weak_etag(body)
+
 @app.get("/api/content/featured")
 async def get_featured_content(
+    request: Request,
     category: str = "trending",
     country: Optional[str] = None,
     limit: int = Query(10, ge=1, le=50)
 ):
+    """A homepage rail, served from the precomputed snapshot when it is one."""
+    key = rail_key(category, country)
     try:
-        query = supabase.table("content").select("*")
-        
-        if category == "trending":
-            query = query.order("rating", desc=True).order("created_at", desc=True)
-        elif category == "new_releases":
-            query = query.order("created_at", desc=True)
-        elif category == "top_rated":
-            query = query.order("rating", desc=True)
-        elif category == "by_country" and country:
-            query = query.eq("country", country).order("rating", desc=True)
-        
-        result = query.limit(limit).execute()
-        return result.data
+        if key is not None and limit <= featured_rails.rail_size:
+            await featured_rails.ensure_loaded(load_featured_rail, load_featured_countries)
+            body, etag = featured_rails.rendered(key, limit, render_rail)
+            response = conditional_response(request.headers.get("if-none-match"), body, etag, "featured")
+            response.headers["X-Snapshot-Age"] = str(int(featured_rails.age()))
+            return response
+        
+        async def load():
+            return await load_featured_rail(category, country, limit)
+        
+        return await cached_json(request, "featured", response_key("featured", category=category, country=country, limit=limit), load)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Registered after the static /api/content/* routes so it does not shadow them
+@app.get("/api/content/{content_id}")
+async def get_content(request: Request, content_id: str):
+    async def load():
+        result = await execute(supabase.table("content").select("*").eq("id", content_id))
+        if not result.data:
+            raise HTTPException(status_code=404, detail="Content not found")
+        return result.data[0]
+    
+    try:
+        return await cached_json(request, "content", response_key("content", id=content_id), load, content_etag)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def load_facet_rows() -> List[Dict[str, Any]]:
+    try:
+        return await fetch_all(lambda: supabase.table("content_facets").select("facet, value, count").order("facet").order("value"))
+    except Exception:
+        # Backing table not migrated yet; fall back to scanning content
+        return []
+
+async def load_facet_content_rows() -> List[Dict[str, Any]]:
+    return await fetch_all(lambda: supabase.table("content").select("id, country, genres, content_type").order("id"))
+
+async def get_facet_catalog() -> FacetCatalog:
+    await facet_catalog.ensure_loaded(load_facet_rows, load_facet_content_rows)
+    return facet_catalog
+
+async def get_content_index() -> ContentIndex:
+    await content_index.ensure_loaded(lambda: fetch_all(lambda: supabase.table("content").select("*").order("id")))
+    return content_index
+
+def content_saved(rows: List[Dict[str, Any]], previous: Optional[Dict[str, Any]] = None):
+    content_events.publish("saved", rows, previous)
+
+def content_deleted(rows: List[Dict[str, Any]]):
+    content_events.publish("deleted", rows)
+
+# Catalog views kept in step with content writes, this worker's and others'
+
+@content_events.subscribe
+def update_facet_catalog(change: ContentChange):
+    if not change.local or change.kind == "resync":
+        # Counts from another worker's write would be applied twice if this
+        # catalog reloaded after it; reload instead of patching
+        facet_catalog.invalidate()
+        return
+    if change.previous is not None:
+        facet_catalog.remove([change.previous])
+    if change.kind == "saved":
+        facet_catalog.add(change.rows)
+    else:
+        facet_catalog.remove(change.rows)
+
+@content_events.subscribe
+def invalidate_content_totals(change: ContentChange):
+    totals_cache.invalidate("content")
+
+@content_events.subscribe
+def invalidate_responses(change: ContentChange):
+    # The writing worker has already cleared the shared store
+    response_cache.invalidate(shared=change.local)
+
+@content_events.subscribe
+def refresh_featured_rails(change: ContentChange):
+    featured_rails.changed()
+
+@content_events.subscribe
+def update_trending(change: ContentChange):
+    if change.kind == "resync":
+        trending_rows.clear()
+        return
+    for content_id in change.ids:
+        trending_rows.pop(content_id, None)
+    if change.kind == "deleted":
+        trending_engine.forget(change.ids)
+
+@content_events.subscribe
+def update_content_index(change: ContentChange):
+    if content_index is None:
+        return
+    if change.kind == "deleted":
+        content_index.remove(change.ids)
+    elif change.rows is not None:
+        content_index.upsert(change.rows)
+    else:
+        content_index.invalidate()
+
+async def facet_response(request: Request, facet: str, key: str):
+    catalog = await get_facet_catalog()
+    etag = catalog.etag(facet)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return validated_response(None, etag, "facets")
+    body = render_json({key: catalog.values(facet), "counts": dict(sorted(catalog.counts[facet].items()))})
+    return validated_response(body, etag, "facets")
+
 @app.get("/api/countries")
-async def get_countries():
+async def get_countries(request: Request):
     try:
-        result = supabase.table("content").select("country").execute()
-        countries = list(set([item["country"] for item in result.data if item["country"]]))
-        return {"countries": sorted(countries)}
+        return await facet_response(request, "country", "countries")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/genres")
-async def get_genres():
+async def get_genres(request: Request):
     try:
-        result = supabase.table("content").select("genres").execute()
-        all_genres = set()
-        for item in result.data:
-            if item["genres"]:
-                all_genres.update(item["genres"])
-        return {"genres": sorted(list(all_genres))}
+        return await facet_response(request, "genres", "genres")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/content-types")
-async def get_content_types():
+async def get_content_types(request: Request):
     try:
-        result = supabase.table("content").select("content_type").execute()
-        content_types = list(set([item["content_type"] for item in result.data if item["content_type"]]))
-        return {"content_types": sorted(content_types)}
+        return await facet_response(request, "content_type", "content_types")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Watchlist endpoints
+WATCHLIST_STATUSES = ["want_to_watch", "watching", "completed", "dropped"]
+
+async def fetch_watchlist_status_counts(user_id: str):
+    """Per-status counts and the overall total from one grouped query."""
+    result = await execute(supabase.rpc("watchlist_status_counts", {"p_user_id": user_id}))
+    grouped = {row["status"]: row["count"] for row in result.data}
+    status_counts = {status_type: grouped.get(status_type, 0) for status_type in WATCHLIST_STATUSES}
+    return status_counts, sum(grouped.values())
+
 @app.get("/api/watchlist")
 async def get_watchlist(
     status: Optional[str] = None,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    count_mode: str = Query("exact", pattern=COUNT_MODE_PATTERN),
     current_user = Depends(get_current_user)
 ):
+    after = parse_cursor(cursor, "created_at", True)
     try:
         offset = (page - 1) * limit
-        query = supabase.table("watchlist").select("""
-            *,
-            content:content_id (
-                id, title, poster_url, banner_url, year, country, 
-                content_type, genres, rating, episodes, synopsis
-            )
-        """).eq("user_id", current_user.id)
-        
-        if status:
-            query = query.eq("status", status)
-        
-        # Get total count
-        count_query = supabase.table("watchlist").select("id", count="exact").eq("user_id", current_user.id)
-        if status:
-            count_query = count_query.eq("status", status)
-        count_result = count_query.execute()
-        total = count_result.count
-        
-        # Get paginated results
-        result = query.range(offset, offset + limit - 1).order("created_at", desc=True).execute()
         
-        # Get status counts
-        status_counts = {}
-        for status_type in ["want_to_watch", "watching", "completed", "dropped"]:
-            count_result = supabase.table("watchlist").select("id", count="exact").eq("user_id", current_user.id).eq("status", status_type).execute()
-            status_counts[status_type] = count_result.count
+        def build_page(count):
+            query = supabase.table("watchlist").select("""
+                *,
+                content:content_id (
+                    id, title, poster_url, banner_url, year, country, 
+                    content_type, genres, rating, episodes, synopsis
+                )
+            """, count=count).eq("user_id", current_user.id)
+            if status:
+                query = query.eq("status", status)
+            return keyset_page(query, "created_at", True, limit, offset, after)
+        
+        def build_count(count):
+            query = supabase.table("watchlist").select("id", count=count, head=True).eq("user_id", current_user.id)
+            return query.eq("status", status) if status else query
+        
+        # Page and filtered total in one request, all status counts in another
+        result, total = await page_with_total(
+            "watchlist", totals_key(user_id=current_user.id, status=status),
+            build_page, build_count, include_total, count_mode, after
+        )
+        items, next_cursor = page_result(result.data, "created_at", True, limit, after)
+        status_counts, _ = await fetch_watchlist_status_counts(current_user.id)
         
         return {
-            "items": result.data,
+            "items": items,
             "total": total,
             "page": page,
             "limit": limit,
+            "next_cursor": next_cursor,
             "status_counts": status_counts
         }
     except Exception as e:
@@ -444,12 +818,12 @@ async def get_watchlist(
 async def add_to_watchlist(watchlist_data: WatchlistAdd, current_user = Depends(get_current_user)):
     try:
         # Check if content exists
-        content_result = supabase.table("content").select("id").eq("id", watchlist_data.content_id).execute()
+        content_result = await execute(supabase.table("content").select("id").eq("id", watchlist_data.content_id))
         if not content_result.data:
             raise HTTPException(status_code=404, detail="Content not found")
         
         # Check if already in watchlist
-        existing = supabase.table("watchlist").select("id").eq("user_id", current_user.id).eq("content_id", watchlist_data.content_id).execute()
+        existing = await execute(supabase.table("watchlist").select("id").eq("user_id", current_user.id).eq("content_id", watchlist_data.content_id))
         if existing.data:
             raise HTTPException(status_code=400, detail="Content already in watchlist")
         
@@ -462,7 +836,9 @@ async def add_to_watchlist(watchlist_data: WatchlistAdd, current_user = Depends(
             "started_date": datetime.utcnow().isoformat() if watchlist_data.status == "watching" else None
         }
         
-        result = supabase.table("watchlist").insert(watchlist_item).execute()
+        result = await execute(supabase.table("watchlist").insert(watchlist_item))
+        totals_cache.invalidate("watchlist")
+        trending_engine.record(watchlist_data.content_id, "watchlist")
         return result.data[0]
     except HTTPException:
         raise
@@ -473,7 +849,7 @@ async def add_to_watchlist(watchlist_data: WatchlistAdd, current_user = Depends(
 async def update_watchlist_item(item_id: int, update_data: WatchlistUpdate, current_user = Depends(get_current_user)):
     try:
         # Verify ownership
-        existing = supabase.table("watchlist").select("*").eq("id", item_id).eq("user_id", current_user.id).execute()
+        existing = await execute(supabase.table("watchlist").select("*").eq("id", item_id).eq("user_id", current_user.id))
         if not existing.data:
             raise HTTPException(status_code=404, detail="Watchlist item not found")
         
@@ -488,7 +864,8 @@ async def update_watchlist_item(item_id: int, update_data: WatchlistUpdate, curr
             elif update_data.status == "completed":
                 update_dict["completed_date"] = datetime.utcnow().isoformat()
         
-        result = supabase.table("watchlist").update(update_dict).eq("id", item_id).execute()
+        result = await execute(supabase.table("watchlist").update(update_dict).eq("id", item_id))
+        totals_cache.invalidate("watchlist")
         return result.data[0]
     except HTTPException:
         raise
@@ -499,11 +876,12 @@ async def update_watchlist_item(item_id: int, update_data: WatchlistUpdate, curr
 async def remove_from_watchlist(item_id: int, current_user = Depends(get_current_user)):
     try:
         # Verify ownership
-        existing = supabase.table("watchlist").select("id").eq("id", item_id).eq("user_id", current_user.id).execute()
+        existing = await execute(supabase.table("watchlist").select("id").eq("id", item_id).eq("user_id", current_user.id))
         if not existing.data:
             raise HTTPException(status_code=404, detail="Watchlist item not found")
         
-        supabase.table("watchlist").delete().eq("id", item_id).execute()
+        await execute(supabase.table("watchlist").delete().eq("id", item_id))
+        totals_cache.invalidate("watchlist")
         return {"message": "Item removed from watchlist"}
     except HTTPException:
         raise
@@ -513,21 +891,13 @@ async def remove_from_watchlist(item_id: int, current_user = Depends(get_current
 @app.get("/api/watchlist/stats")
 async def get_watchlist_stats(current_user = Depends(get_current_user)):
     try:
-        # Get status counts
-        status_counts = {}
-        for status_type in ["want_to_watch", "watching", "completed", "dropped"]:
-            count_result = supabase.table("watchlist").select("id", count="exact").eq("user_id", current_user.id).eq("status", status_type).execute()
-            status_counts[status_type] = count_result.count
-        
-        # Get total content
-        total_result = supabase.table("watchlist").select("id", count="exact").eq("user_id", current_user.id).execute()
-        total_content = total_result.count
+        status_counts, total_content = await fetch_watchlist_status_counts(current_user.id)
         
         # Get recent activity
-        recent_activity = supabase.table("watchlist").select("""
+        recent_activity = await execute(supabase.table("watchlist").select("""
             *,
             content:content_id (title, poster_url, year, content_type)
-        """).eq("user_id", current_user.id).order("updated_at", desc=True).limit(5).execute()
+        """).eq("user_id", current_user.id).order("updated_at", desc=True).limit(5))
         
         return {
             "status_counts": status_counts,
@@ -543,38 +913,44 @@ async def get_reviews(
     content_id: Optional[str] = None,
     user_id: Optional[str] = None,
     page: int = Query(1, ge=1),
-    limit: int = Query(10, ge=1, le=50)
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    count_mode: str = Query("exact", pattern=COUNT_MODE_PATTERN)
 ):
+    after = parse_cursor(cursor, "created_at", True)
     try:
         offset = (page - 1) * limit
-        query = supabase.table("reviews").select("""
-            *,
-            user:user_id (username, avatar_url, is_verified),
-            content:content_id (title, poster_url)
-        """)
-        
-        if content_id:
-            query = query.eq("content_id", content_id)
-        if user_id and user_id != "me":
-            query = query.eq("user_id", user_id)
-        
-        # Get total count
-        count_query = supabase.table("reviews").select("id", count="exact")
-        if content_id:
-            count_query = count_query.eq("content_id", content_id)
-        if user_id and user_id != "me":
-            count_query = count_query.eq("user_id", user_id)
-        count_result = count_query.execute()
-        total = count_result.count
-        
-        # Get paginated results
-        result = query.range(offset, offset + limit - 1).order("created_at", desc=True).execute()
+        author_id = user_id if user_id and user_id != "me" else None
+        
+        def filtered(query):
+            if content_id:
+                query = query.eq("content_id", content_id)
+            if author_id:
+                query = query.eq("user_id", author_id)
+            return query
+        
+        def build_page(count):
+            return keyset_page(filtered(supabase.table("reviews").select("""
+                *,
+                user:user_id (username, avatar_url, is_verified),
+                content:content_id (title, poster_url)
+            """, count=count)), "created_at", True, limit, offset, after)
+        
+        # Paginated results with the total for the same filters
+        result, total = await page_with_total(
+            "reviews", totals_key(content_id=content_id, user_id=author_id),
+            build_page, lambda count: filtered(supabase.table("reviews").select("id", count=count, head=True)),
+            include_total, count_mode, after
+        )
+        reviews, next_cursor = page_result(result.data, "created_at", True, limit, after)
         
         return {
-            "reviews": result.data,
+            "reviews": reviews,
             "total": total,
             "page": page,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -583,12 +959,12 @@ async def get_reviews(
 async def create_review(review_data: ReviewCreate, current_user = Depends(get_current_user)):
     try:
         # Check if content exists
-        content_result = supabase.table("content").select("id").eq("id", review_data.content_id).execute()
+        content_result = await execute(supabase.table("content").select("id").eq("id", review_data.content_id))
         if not content_result.data:
             raise HTTPException(status_code=404, detail="Content not found")
         
         # Check if user already reviewed this content
-        existing = supabase.table("reviews").select("id").eq("user_id", current_user.id).eq("content_id", review_data.content_id).execute()
+        existing = await execute(supabase.table("reviews").select("id").eq("user_id", current_user.id).eq("content_id", review_data.content_id))
         if existing.data:
             raise HTTPException(status_code=400, detail="You have already reviewed this content")
         
@@ -596,7 +972,9 @@ async def create_review(review_data: ReviewCreate, current_user = Depends(get_cu
         review_dict = review_data.dict()
         review_dict["user_id"] = current_user.id
         
-        result = supabase.table("reviews").insert(review_dict).execute()
+        result = await execute(supabase.table("reviews").insert(review_dict))
+        totals_cache.invalidate("reviews")
+        trending_engine.record(review_data.content_id, "review")
         return result.data[0]
     except HTTPException:
         raise
@@ -607,14 +985,14 @@ async def create_review(review_data: ReviewCreate, current_user = Depends(get_cu
 async def update_review(review_id: int, review_data: ReviewUpdate, current_user = Depends(get_current_user)):
     try:
         # Verify ownership
-        existing = supabase.table("reviews").select("*").eq("id", review_id).eq("user_id", current_user.id).execute()
+        existing = await execute(supabase.table("reviews").select("*").eq("id", review_id).eq("user_id", current_user.id))
         if not existing.data:
             raise HTTPException(status_code=404, detail="Review not found")
         
         update_dict = {k: v for k, v in review_data.dict().items() if v is not None}
         update_dict["updated_at"] = datetime.utcnow().isoformat()
         
-        result = supabase.table("reviews").update(update_dict).eq("id", review_id).execute()
+        result = await execute(supabase.table("reviews").update(update_dict).eq("id", review_id))
         return result.data[0]
     except HTTPException:
         raise
@@ -625,11 +1003,12 @@ async def update_review(review_id: int, review_data: ReviewUpdate, current_user
 async def delete_review(review_id: int, current_user = Depends(get_current_user)):
     try:
         # Verify ownership
-        existing = supabase.table("reviews").select("id").eq("id", review_id).eq("user_id", current_user.id).execute()
+        existing = await execute(supabase.table("reviews").select("id").eq("id", review_id).eq("user_id", current_user.id))
         if not existing.data:
             raise HTTPException(status_code=404, detail="Review not found")
         
-        supabase.table("reviews").delete().eq("id", review_id).execute()
+        await execute(supabase.table("reviews").delete().eq("id", review_id))
+        totals_cache.invalidate("reviews")
         return {"message": "Review deleted successfully"}
     except HTTPException:
         raise
@@ -647,47 +1026,61 @@ async def track_viewing_activity(
 ):
     try:
         # Check if content exists
-        content_result = supabase.table("content").select("id").eq("id", content_id).execute()
+        content_result = await execute(supabase.table("content").select("id").eq("id", content_id))
         if not content_result.data:
             raise HTTPException(status_code=404, detail="Content not found")
         
-        # For now, we'll just return success since we don't have a viewing_history table
-        # In a full implementation, you'd create this table and track the activity
+        # Views are not stored individually; they only feed trending
+        trending_engine.record(content_id, "view")
         return {"message": "Viewing activity tracked successfully"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def summarize_watchlist(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Watch counts and genre ranking over watchlist rows with embedded genres."""
+    if not items:
+        return {"total_content_watched": 0, "completion_rate": 0, "favorite_genres": []}
+    # Loaded on first use so workers do not pay for pandas at startup
+    import pandas as pd
+    
+    frame = pd.json_normalize(items)
+    statuses = frame["status"]
+    total_content_watched = int(statuses.isin(["completed", "watching"]).sum())
+    completion_rate = float((statuses == "completed").mean() * 100)
+    
+    genres = frame["content.genres"].explode().dropna() if "content.genres" in frame else pd.Series(dtype=object)
+    # Stable sort keeps first-seen order among genres with equal counts
+    genre_counts = genres.groupby(genres, sort=False).size().sort_values(ascending=False, kind="stable")
+    favorite_genres = [{"genre": genre, "count": int(count)} for genre, count in genre_counts.items()]
+    return {
+        "total_content_watched": total_content_watched,
+        "completion_rate": completion_rate,
+        "favorite_genres": favorite_genres,
+    }
+
 @app.get("/api/analytics/dashboard")
 async def get_analytics_dashboard(current_user = Depends(get_current_user)):
     try:
-        # Get watchlist stats for analytics
-        watchlist_result = supabase.table("watchlist").select("*").eq("user_id", current_user.id).execute()
-        watchlist_items = watchlist_result.data
-        
-        # Calculate basic analytics from watchlist
-        total_content_watched = len([item for item in watchlist_items if item["status"] in ["completed", "watching"]])
-        completion_rate = len([item for item in watchlist_items if item["status"] == "completed"]) / len(watchlist_items) * 100 if watchlist_items else 0
+        # Watchlist with each item's genres embedded
+        watchlist_items = await fetch_all(
+            lambda: supabase.table("watchlist")
+            .select("status, content:content_id (genres)")
+            .eq("user_id", current_user.id)
+            .order("id")
+        )
         
-        # Get favorite genres from watchlist
-        genre_counts = {}
-        for item in watchlist_items:
-            # Get content details to access genres
-            content_result = supabase.table("content").select("genres").eq("id", item["content_id"]).execute()
-            if content_result.data and content_result.data[0]["genres"]:
-                for genre in content_result.data[0]["genres"]:
-                    genre_counts[genre] = genre_counts.get(genre, 0) + 1
-        
-        favorite_genres = [{"genre": genre, "count": count} for genre, count in sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)]
+        summary = summarize_watchlist(watchlist_items)
+        total_content_watched = summary["total_content_watched"]
         
         # Mock some additional analytics data
         return {
             "total_content_watched": total_content_watched,
             "total_viewing_time": total_content_watched * 45,  # Mock: 45 min average
-            "completion_rate": round(completion_rate, 1),
+            "completion_rate": round(summary["completion_rate"], 1),
             "viewing_streak": 1,  # Mock data
-            "favorite_genres": favorite_genres[:5],
+            "favorite_genres": summary["favorite_genres"][:5],
             "favorite_countries": [{"country": "South Korea", "count": 1}],  # Mock data
             "achievements": ["🎬 First Watch", "📈 Getting Started"],
             "monthly_stats": {},  # Mock empty for now
@@ -700,19 +1093,22 @@ async def get_analytics_dashboard(current_user = Depends(get_current_user)):
 async def get_viewing_history(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user)
 ):
+    after = parse_cursor(cursor, "updated_at", True)
     try:
         # For now, return watchlist as viewing history
         offset = (page - 1) * limit
-        result = supabase.table("watchlist").select("""
+        result = await execute(keyset_page(supabase.table("watchlist").select("""
             *,
             content:content_id (title, poster_url, year, content_type)
-        """).eq("user_id", current_user.id).range(offset, offset + limit - 1).order("updated_at", desc=True).execute()
+        """).eq("user_id", current_user.id), "updated_at", True, limit, offset, after))
+        items, next_cursor = page_result(result.data, "updated_at", True, limit, after)
         
         # Transform to viewing history format
         history = []
-        for item in result.data:
+        for item in items:
             history.append({
                 "content": item["content"],
                 "viewed_at": item["updated_at"],
@@ -721,9 +1117,10 @@ async def get_viewing_history(
         
         return {
             "history": history,
-            "total": len(result.data),
+            "total": len(history),
             "page": page,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -733,12 +1130,10 @@ async def get_viewing_history(
 async def follow_user(username: str, current_user = Depends(get_current_user)):
     try:
         # Get target user
-        target_user = supabase.table("profiles").select("id").eq("username", username).execute()
-        if not target_user.data:
+        target_user_id = await resolve_user_id(username)
+        if not target_user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
-        target_user_id = target_user.data[0]["id"]
-        
         # Prevent self-follow
         if target_user_id == current_user.id:
             raise HTTPException(status_code=400, detail="Cannot follow yourself")
@@ -755,8 +1150,7 @@ async def follow_user(username: str, current_user = Depends(get_current_user)):
 async def unfollow_user(username: str, current_user = Depends(get_current_user)):
     try:
         # Get target user
-        target_user = supabase.table("profiles").select("id").eq("username", username).execute()
-        if not target_user.data:
+        if not await resolve_user_id(username):
             raise HTTPException(status_code=404, detail="User not found")
         
         # For now, just return success
@@ -774,8 +1168,7 @@ async def get_followers(
 ):
     try:
         # Get user
-        user_result = supabase.table("profiles").select("id").eq("username", username).execute()
-        if not user_result.data:
+        if not await resolve_user_id(username):
             raise HTTPException(status_code=404, detail="User not found")
         
         # For now, return empty list since we don't have follows table
@@ -798,8 +1191,7 @@ async def get_following(
 ):
     try:
         # Get user
-        user_result = supabase.table("profiles").select("id").eq("username", username).execute()
-        if not user_result.data:
+        if not await resolve_user_id(username):
             raise HTTPException(status_code=404, detail="User not found")
         
         # For now, return empty list
@@ -835,14 +1227,12 @@ async def get_activity_feed(
 async def get_social_stats(username: str):
     try:
         # Get user
-        user_result = supabase.table("profiles").select("id").eq("username", username).execute()
-        if not user_result.data:
+        user_id = await resolve_user_id(username)
+        if not user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
-        user_id = user_result.data[0]["id"]
-        
         # Get review count
-        reviews_result = supabase.table("reviews").select("id", count="exact").eq("user_id", user_id).execute()
+        reviews_result = await execute(supabase.table("reviews").select("id", count="exact").eq("user_id", user_id))
         
         return {
             "followers_count": 0,  # Mock data
@@ -876,7 +1266,7 @@ async def get_notifications(
 async def get_trending_users(limit: int = Query(10, ge=1, le=50)):
     try:
         # Get users with most reviews as trending
-        result = supabase.table("profiles").select("username, avatar_url, is_verified").limit(limit).execute()
+        result = await execute(supabase.table("profiles").select("username, avatar_url, is_verified").limit(limit))
         
         return {
             "users": result.data,
@@ -892,7 +1282,7 @@ async def get_trending_users(limit: int = Query(10, ge=1, le=50)):
 async def toggle_review_like(review_id: int, current_user = Depends(get_current_user)):
     try:
         # Check if review exists
-        review_result = supabase.table("reviews").select("id").eq("id", review_id).execute()
+        review_result = await execute(supabase.table("reviews").select("id").eq("id", review_id))
         if not review_result.data:
             raise HTTPException(status_code=404, detail="Review not found")
         
@@ -907,7 +1297,7 @@ async def toggle_review_like(review_id: int, current_user = Depends(get_current_
 async def add_review_comment(review_id: int, comment_data: CommentCreate, current_user = Depends(get_current_user)):
     try:
         # Check if review exists
-        review_result = supabase.table("reviews").select("id").eq("id", review_id).execute()
+        review_result = await execute(supabase.table("reviews").select("id").eq("id", review_id))
         if not review_result.data:
             raise HTTPException(status_code=404, detail="Review not found")
         
@@ -926,7 +1316,7 @@ async def get_review_comments(
 ):
     try:
         # Check if review exists
-        review_result = supabase.table("reviews").select("id").eq("id", review_id).execute()
+        review_result = await execute(supabase.table("reviews").select("id").eq("id", review_id))
         if not review_result.data:
             raise HTTPException(status_code=404, detail="Review not found")
         
@@ -950,7 +1340,7 @@ async def get_personalized_recommendations(
 ):
     try:
         # Get user's watchlist to understand preferences
-        watchlist_result = supabase.table("watchlist").select("content_id").eq("user_id", current_user.id).execute()
+        watchlist_result = await execute(supabase.table("watchlist").select("content_id").eq("user_id", current_user.id))
         watched_content_ids = [item["content_id"] for item in watchlist_result.data]
         
         # Get content not in watchlist
@@ -958,7 +1348,7 @@ async def get_personalized_recommendations(
         if watched_content_ids:
             query = query.not_.in_("id", watched_content_ids)
         
-        result = query.limit(limit).execute()
+        result = await execute(query.limit(limit))
         
         # Add recommendation metadata
         recommendations = []
@@ -978,44 +1368,75 @@ async def get_personalized_recommendations(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/recommendations/similar/{content_id}")
-async def get_similar_content(content_id: str, limit: int = Query(10, ge=1, le=50)):
-    try:
+async def get_similar_content(request: Request, content_id: str, limit: int = Query(10, ge=1, le=50)):
+    async def load():
         # Get original content
-        original_result = supabase.table("content").select("*").eq("id", content_id).execute()
+        original_result = await execute(supabase.table("content").select("*").eq("id", content_id))
         if not original_result.data:
             raise HTTPException(status_code=404, detail="Content not found")
         
         original_content = original_result.data[0]
         
         # Find similar content by genre and country
-        similar_result = supabase.table("content").select("*").neq("id", content_id).order("rating", desc=True).limit(limit).execute()
+        similar_result = await execute(supabase.table("content").select("*").neq("id", content_id).order("rating", desc=True).limit(limit))
         
         return {
             "original_content": original_content,
             "similar_content": similar_result.data
         }
+    
+    try:
+        return await cached_json(request, "similar", response_key("similar", id=content_id, limit=limit), load)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Discovery endpoints
+async def save_trending_scores(rows: List[Dict[str, Any]]):
+    await execute(supabase.rpc("add_trending_scores", {"p_scores": rows}))
+
+async def load_trending_scores() -> List[Dict[str, Any]]:
+    return await fetch_all(lambda: supabase.table("trending_scores").select("content_id, period, score, as_of").order("content_id").order("period"))
+
+async def fetch_trending_rows(content_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    # Taken before the query, so clearing the cache cannot drop cached rows
+    rows = {content_id: trending_rows[content_id] for content_id in content_ids if content_id in trending_rows}
+    missing = [content_id for content_id in content_ids if content_id not in rows]
+    if missing:
+        result = await execute(supabase.table("content").select("*").in_("id", missing))
+        fetched = {row["id"]: row for row in result.data}
+        if len(trending_rows) + len(fetched) > TRENDING_ROWS_SIZE:
+            trending_rows.clear()
+        trending_rows.update(fetched)
+        rows.update(fetched)
+    return rows
+
 @app.get("/api/discovery/trending")
 async def get_trending_content(
-    time_period: str = "week",
+    request: Request,
+    time_period: str = Query("week", pattern=TRENDING_PERIOD_PATTERN),
     limit: int = Query(20, ge=1, le=50)
 ):
+    """Titles with the most time-decayed activity (views, watchlist adds, reviews) in ``time_period``.
+
+    If too few titles have any, the rest of the list is the top-rated rail,
+    with a null ``trending_score``.
+    """
     try:
-        # Get trending content based on rating and recent creation
-        result = supabase.table("content").select("*").order("rating", desc=True).order("created_at", desc=True).limit(limit).execute()
-        
-        # Add trending metadata
-        trending_content = []
-        for content in result.data:
-            content["trending_score"] = content["rating"] * 10  # Mock trending score
-            trending_content.append(content)
-        
-        return {"trending_content": trending_content}
+        await trending_engine.ensure_loaded(load_trending_scores)
+        ranked = trending_engine.top(time_period, limit)
+        rows = await fetch_trending_rows([content_id for content_id, _ in ranked])
+        trending_content = [{**rows[content_id], "trending_score": round(score, 4)} for content_id, score in ranked if content_id in rows]
+        
+        if len(trending_content) < limit:
+            await featured_rails.ensure_loaded(load_featured_rail, load_featured_countries)
+            seen = {content["id"] for content in trending_content}
+            filler = [row for row in featured_rails.rail(("trending", None), limit) if row["id"] not in seen]
+            trending_content += [{**row, "trending_score": None} for row in filler[:limit - len(trending_content)]]
+        
+        body = render_json({"trending_content": trending_content})
+        return conditional_response(request.headers.get("if-none-match"), body, weak_etag(body), "trending")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1121,7 +1542,7 @@ async def admin_login(credentials: UserLogin):
 async def get_admin_stats():
     try:
         # Get content stats
-        content_result = supabase.table("content").select("id, content_type, country", count="exact").execute()
+        content_result = await execute(supabase.table("content").select("id, content_type, country", count="exact"))
         
         # Count by type
         type_counts = {}
@@ -1143,41 +1564,100 @@ async def get_admin_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/admin/cache/stats")
+async def get_cache_stats():
+    """Hit ratios of this worker's caches and its content event counts."""
+    return {"responses": response_cache.stats(), "totals": totals_cache.stats(), "content_events": content_events.stats(), "featured": featured_rails.stats(), "trending": trending_engine.stats()}
+
 @app.get("/api/admin/content")
 async def get_admin_content(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    count_mode: str = Query("exact", pattern=COUNT_MODE_PATTERN)
 ):
+    after = parse_cursor(cursor, "created_at", True)
     try:
         offset = (page - 1) * limit
-        query = supabase.table("content").select("*")
+        search_groups = [content_search_filter(search)] if search else []
         
-        if search:
-            query = query.or_(f"title.ilike.%{search}%,synopsis.ilike.%{search}%")
+        def build_count(count):
+            count_query = supabase.table("content").select("id", count=count, head=True)
+            return count_query.or_(search_groups[0]) if search_groups else count_query
         
-        # Get total count
-        count_result = supabase.table("content").select("id", count="exact").execute()
-        total = count_result.count
-        
-        # Get paginated results
-        result = query.range(offset, offset + limit - 1).order("created_at", desc=True).execute()
+        # Get the page after the cursor, or by offset without one, and the
+        # total for the same search
+        result, total = await page_with_total(
+            "content", totals_key(query=search),
+            lambda count: keyset_page(supabase.table("content").select("*", count=count), "created_at", True, limit, offset, after, search_groups),
+            build_count, include_total, count_mode, after
+        )
+        contents, next_cursor = page_result(result.data, "created_at", True, limit, after)
         
         return {
-            "contents": result.data,
+            "contents": contents,
             "total": total,
             "page": page,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/admin/content/export")
+async def export_content(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    compress: bool = False,
+    query: Optional[str] = None,
+    country: Optional[str] = None,
+    content_type: Optional[str] = None,
+    genre: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    rating_min: Optional[float] = None,
+    rating_max: Optional[float] = None
+):
+    """Stream the catalog, filtered like ``/api/content/search``, as a file download.
+
+    Rows come out in ``id`` order; ``compress=true`` gzips the stream.
+    """
+    filters = dict(
+        country=country, content_type=content_type, genre=genre, year_from=year_from,
+        year_to=year_to, rating_min=rating_min, rating_max=rating_max
+    )
+    
+    async def fetch(after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        db_query = apply_content_filters(supabase.table("content").select(",".join(EXPORTED_FIELDS)), **filters)
+        if query:
+            db_query = db_query.or_(content_search_filter(query))
+        if after is not None:
+            db_query = db_query.gt("id", after)
+        result = await execute(db_query.order("id").limit(limit))
+        return result.data
+    
+    try:
+        # Read the first page up front so a failing query is still a 500
+        # rather than a truncated download
+        first = await fetch(None, EXPORT_PAGE_ROWS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    filename = export_filename(format, compress, datetime.utcnow().strftime("%Y%m%d-%H%M%S"))
+    return StreamingResponse(
+        encode_stream(export_pages(fetch, EXPORT_PAGE_ROWS, first), format, compress),
+        media_type="application/gzip" if compress else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
 @app.post("/api/admin/content")
 async def create_admin_content(content_data: ContentCreate):
     try:
         content_dict = content_data.dict()
         content_dict["id"] = str(uuid.uuid4())
-        result = supabase.table("content").insert(content_dict).execute()
+        result = await execute(supabase.table("content").insert(content_dict))
+        content_saved(result.data)
         return result.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1187,9 +1667,11 @@ async def update_admin_content(content_id: str, content_data: ContentCreate):
     try:
         content_dict = content_data.dict()
         content_dict["updated_at"] = datetime.utcnow().isoformat()
-        result = supabase.table("content").update(content_dict).eq("id", content_id).execute()
+        previous = await execute(supabase.table("content").select("country, genres, content_type").eq("id", content_id))
+        result = await execute(supabase.table("content").update(content_dict).eq("id", content_id))
         if not result.data:
             raise HTTPException(status_code=404, detail="Content not found")
+        content_saved(result.data, previous.data[0] if previous.data else None)
         return result.data[0]
     except HTTPException:
         raise
@@ -1199,224 +1681,169 @@ async def update_admin_content(content_id: str, content_data: ContentCreate):
 @app.delete("/api/admin/content/{content_id}")
 async def delete_admin_content(content_id: str):
     try:
-        result = supabase.table("content").delete().eq("id", content_id).execute()
+        result = await execute(supabase.table("content").delete().eq("id", content_id))
         if not result.data:
             raise HTTPException(status_code=404, detail="Content not found")
+        content_deleted(result.data)
         return {"message": "Content deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def insert_content_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    result = await execute(supabase.table("content").insert(rows))
+    return result.data
+
+async def existing_content_ids(ids: List[str]) -> set:
+    found = set()
+    # Keep each id list well inside PostgREST's URL length limit
+    for start in range(0, len(ids), 200):
+        result = await execute(supabase.table("content").select("id").in_("id", ids[start:start + 200]))
+        found.update(row["id"] for row in result.data)
+    return found
+
+async def lookup_content_fingerprints(fingerprints: List[str]) -> List[Dict[str, Any]]:
+    columns = ", ".join(["id", "fingerprint", *IMPORTED_FIELDS])
+    rows = []
+    for start in range(0, len(fingerprints), 200):
+        batch = fingerprints[start:start + 200]
+        result = await execute(supabase.table("content").select(columns).in_("fingerprint", batch).order("created_at"))
+        rows.extend(result.data)
+    return rows
+
+async def update_content_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Every row carries an existing id, so this updates in one request
+    result = await execute(supabase.table("content").upsert(rows, on_conflict="id"))
+    return result.data
+
+async def save_import_job(record: Dict[str, Any]):
+    await execute(supabase.table("import_jobs").upsert(record))
+
+async def load_import_job(job_id: str) -> Optional[Dict[str, Any]]:
+    result = await execute(supabase.table("import_jobs").select("*").eq("id", job_id))
+    return result.data[0] if result.data else None
+
+def create_import_jobs():
+    # pandas and the import engine load with the first import, not at startup
+    from import_jobs import ImportJobManager
+    
+    return ImportJobManager(
+        insert_content_rows, save_import_job, load_import_job, existing_content_ids, on_inserted=content_saved,
+        lookup=lookup_content_fingerprints, update=update_content_rows, on_updated=content_saved,
+    )
+
+import_jobs = None  # see get_import_jobs
+
+def get_import_jobs():
+    global import_jobs
+    if import_jobs is None:
+        import_jobs = create_import_jobs()
+    return import_jobs
+
+IMPORT_PROGRESS_INTERVAL = float(os.getenv("IMPORT_PROGRESS_INTERVAL", "1"))
+
 @app.post("/api/admin/bulk-import")
-async def bulk_import_content(file: UploadFile = File(...)):
+async def bulk_import_content(
+    file: UploadFile = File(...),
+    wait: bool = False,
+    mode: str = Query("insert", pattern=IMPORT_MODE_PATTERN),
+):
+    """Start a background import job; ``wait=true`` returns the final report instead.
+
+    ``mode=upsert`` updates titles that already exist (matched by
+    fingerprint) instead of inserting duplicates.
+    """
     try:
-        if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
+        if not file.filename.lower().endswith(IMPORT_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Invalid file format")
         
-        # Read file
-        contents = await file.read()
-        
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(BytesIO(contents))
-        else:
-            df = pd.read_excel(BytesIO(contents))
-        
-        imported_content = []
-        errors = []
-        successful_imports = 0
-        failed_imports = 0
-        
-        for index, row in df.iterrows():
-            try:
-                # Validate required fields
-                required_fields = ['title', 'year', 'country', 'content_type', 'synopsis', 'rating']
-                for field in required_fields:
-                    if pd.isna(row.get(field)):
-                        raise ValueError(f"Missing required field: {field}")
-                
-                # Prepare content data
-                content_data = {
-                    "id": str(uuid.uuid4()),
-                    "title": str(row['title']),
-                    "original_title": str(row.get('original_title', '')) if pd.notna(row.get('original_title')) else None,
-                    "synopsis": str(row['synopsis']),
-                    "year": int(row['year']),
-                    "country": str(row['country']),
-                    "content_type": str(row['content_type']),
-                    "rating": float(row['rating']),
-                    "poster_url": str(row.get('poster_url', '')) if pd.notna(row.get('poster_url')) else None,
-                    "banner_url": str(row.get('banner_url', '')) if pd.notna(row.get('banner_url')) else None,
-                    "episodes": int(row['episodes']) if pd.notna(row.get('episodes')) else None,
-                    "duration": int(row['duration']) if pd.notna(row.get('duration')) else None,
-                    "genres": str(row.get('genres', '')).split(',') if pd.notna(row.get('genres')) else [],
-                    "streaming_platforms": str(row.get('streaming_platforms', '')).split(',') if pd.notna(row.get('streaming_platforms')) else [],
-                    "tags": str(row.get('tags', '')).split(',') if pd.notna(row.get('tags')) else [],
-                    "cast": json.loads(row['cast']) if pd.notna(row.get('cast')) and str(row['cast']).startswith('[') else [],
-                    "crew": json.loads(row['crew']) if pd.notna(row.get('crew')) and str(row['crew']).startswith('[') else []
-                }
-                
-                # Insert into Supabase
-                result = supabase.table("content").insert(content_data).execute()
-                if result.data:
-                    imported_content.append(content_data["title"])
-                    successful_imports += 1
-                else:
-                    failed_imports += 1
-                    errors.append(f"Row {index + 1}: Failed to insert {content_data['title']}")
-                    
-            except Exception as e:
-                failed_imports += 1
-                errors.append(f"Row {index + 1}: {str(e)}")
-        
-        return {
-            "success": successful_imports > 0,
-            "total_rows": len(df),
-            "successful_imports": successful_imports,
-            "failed_imports": failed_imports,
-            "errors": errors[:10],  # Limit errors shown
-            "imported_content": imported_content[:10]  # Limit content shown
-        }
+        # The upload is spooled to disk and read back in chunks by the job
+        job = await get_import_jobs().submit(file, mode)
+        if wait:
+            await get_import_jobs().wait(job)
+            return job.progress()
+        return JSONResponse(job.progress(), status_code=202)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Startup event to populate sample data
-@app.on_event("startup")
-async def startup_event():
+async def get_import_job_or_404(job_id: str):
     try:
-        # Check if content already exists
-        existing_content = supabase.table("content").select("id").limit(1).execute()
-        if existing_content.data:
-            print("Sample content already exists, skipping population")
-            return
-        
-        # Sample global content data
-        sample_content = [
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Squid Game",
-                "original_title": "오징어 게임",
-                "synopsis": "Hundreds of cash-strapped players accept a strange invitation to compete in children's games for a tempting prize.",
-                "year": 2021,
-                "country": "South Korea",
-                "content_type": "series",
-                "genres": ["thriller", "drama", "mystery"],
-                "rating": 8.0,
-                "episodes": 9,
-                "duration": 60,
-                "cast": [
-                    {"name": "Lee Jung-jae", "character": "Seong Gi-hun"},
-                    {"name": "Park Hae-soo", "character": "Cho Sang-woo"}
-                ],
-                "crew": [{"name": "Hwang Dong-hyuk", "role": "Director"}],
-                "streaming_platforms": ["Netflix"],
-                "tags": ["survival", "psychological", "korean"],
-                "poster_url": "https://images.unsplash.com/photo-1611162617474-5b21e879e113?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxrcmVhbiUyMGRyYW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85",
-                "banner_url": "https://images.unsplash.com/photo-1611162617474-5b21e879e113?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxrcmVhbiUyMGRyYW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85"
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Your Name",
-                "original_title": "君の名は。",
-                "synopsis": "Two teenagers share a profound, magical connection upon discovering they are swapping bodies.",
-                "year": 2016,
-                "country": "Japan",
-                "content_type": "movie",
-                "genres": ["romance", "drama", "fantasy"],
-                "rating": 8.4,
-                "episodes": None,
-                "duration": 106,
-                "cast": [
-                    {"name": "Ryunosuke Kamiki", "character": "Taki Tachibana"},
-                    {"name": "Mone Kamishiraishi", "character": "Mitsuha Miyamizu"}
-                ],
-                "crew": [{"name": "Makoto Shinkai", "role": "Director"}],
-                "streaming_platforms": ["Crunchyroll", "Funimation"],
-                "tags": ["anime", "body-swap", "supernatural"],
-                "poster_url": "https://images.unsplash.com/photo-1578662996442-48f60103fc96?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwyfHxhbmltZXxlbnwwfHx8fDE3NTM1MjcyNTZ8MA&ixlib=rb-4.1.0&q=85",
-                "banner_url": "https://images.unsplash.com/photo-1578662996442-48f60103fc96?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwyfHxhbmltZXxlbnwwfHx8fDE3NTM1MjcyNTZ8MA&ixlib=rb-4.1.0&q=85"
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Parasite",
-                "original_title": "기생충",
-                "synopsis": "A poor family schemes to become employed by a wealthy family and infiltrate their household.",
-                "year": 2019,
-                "country": "South Korea",
-                "content_type": "movie",
-                "genres": ["thriller", "drama", "comedy"],
-                "rating": 8.6,
-                "episodes": None,
-                "duration": 132,
-                "cast": [
-                    {"name": "Song Kang-ho", "character": "Ki-taek"},
-                    {"name": "Lee Sun-kyun", "character": "Park Dong-ik"}
-                ],
-                "crew": [{"name": "Bong Joon-ho", "role": "Director"}],
-                "streaming_platforms": ["Hulu", "Amazon Prime"],
-                "tags": ["oscar-winner", "social-commentary", "korean"],
-                "poster_url": "https://images.unsplash.com/photo-1611162617474-5b21e879e113?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxrcmVhbiUyMGRyYW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85",
-                "banner_url": "https://images.unsplash.com/photo-1611162617474-5b21e879e113?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxrcmVhbiUyMGRyYW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85"
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "3 Idiots",
-                "original_title": "3 Idiots",
-                "synopsis": "Two friends are searching for their long lost companion. They revisit their college days.",
-                "year": 2009,
-                "country": "India",
-                "content_type": "movie",
-                "genres": ["comedy", "drama"],
-                "rating": 8.4,
-                "episodes": None,
-                "duration": 170,
-                "cast": [
-                    {"name": "Aamir Khan", "character": "Rancho"},
-                    {"name": "R. Madhavan", "character": "Farhan"}
-                ],
-                "crew": [{"name": "Rajkumar Hirani", "role": "Director"}],
-                "streaming_platforms": ["Netflix", "Amazon Prime"],
-                "tags": ["bollywood", "friendship", "comedy"],
-                "poster_url": "https://images.unsplash.com/photo-1626814026160-2237a95fc5a0?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxib2xseXdvb2R8ZW58MHx8fHwxNzUzNTI3MjU2fDA&ixlib=rb-4.1.0&q=85",
-                "banner_url": "https://images.unsplash.com/photo-1626814026160-2237a95fc5a0?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxib2xseXdvb2R8ZW58MHx8fHwxNzUzNTI3MjU2fDA&ixlib=rb-4.1.0&q=85"
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Money Heist",
-                "original_title": "La Casa de Papel",
-                "synopsis": "An unusual group of robbers attempt to carry out the most perfect robbery in Spanish history.",
-                "year": 2017,
-                "country": "Spain",
-                "content_type": "series",
-                "genres": ["crime", "thriller", "drama"],
-                "rating": 8.2,
-                "episodes": 41,
-                "duration": 70,
-                "cast": [
-                    {"name": "Úrsula Corberó", "character": "Tokyo"},
-                    {"name": "Álvaro Morte", "character": "The Professor"}
-                ],
-                "crew": [{"name": "Álex Pina", "role": "Creator"}],
-                "streaming_platforms": ["Netflix"],
-                "tags": ["heist", "spanish", "crime"],
-                "poster_url": "https://images.unsplash.com/photo-1489599856641-b1d4c2b53f1b?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxzcGFuaXNoJTIwY2luZW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85",
-                "banner_url": "https://images.unsplash.com/photo-1489599856641-b1d4c2b53f1b?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxzcGFuaXNoJTIwY2luZW1hfGVufDB8fHx8MTc1MzUyNzI1Nnww&ixlib=rb-4.1.0&q=85"
-            }
-        ]
-        
-        # Insert sample content
-        for content in sample_content:
-            try:
-                supabase.table("content").insert(content).execute()
-                print(f"Inserted: {content['title']}")
-            except Exception as e:
-                print(f"Error inserting {content['title']}: {e}")
-        
-        print("Sample content population completed")
-        
+        job = await get_import_jobs().get(job_id)
     except Exception as e:
-        print(f"Error during startup: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@app.get("/api/admin/bulk-import/jobs/{job_id}")
+async def get_import_job(job_id: str):
+    job = await get_import_job_or_404(job_id)
+    return job.progress()
+
+@app.get("/api/admin/bulk-import/jobs/{job_id}/events")
+async def stream_import_job(job_id: str):
+    """Server-sent progress events until the job stops running."""
+    from import_jobs import ACTIVE_STATUSES
+    
+    job = await get_import_job_or_404(job_id)
+
+    async def events():
+        current = job
+        while True:
+            yield f"data: {json.dumps(current.progress())}\n\n"
+            if current.status not in ACTIVE_STATUSES:
+                return
+            await asyncio.sleep(IMPORT_PROGRESS_INTERVAL)
+            current = await get_import_jobs().get(job_id) or current
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/admin/bulk-import/jobs/{job_id}/cancel")
+async def cancel_import_job(job_id: str):
+    from import_jobs import JobConflict
+    
+    try:
+        job = await get_import_jobs().cancel(job_id)
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.progress()
+
+@app.post("/api/admin/bulk-import/jobs/{job_id}/resume")
+async def resume_import_job(job_id: str):
+    from import_jobs import JobConflict
+    
+    try:
+        job = await get_import_jobs().resume(job_id)
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.progress()
+
+@app.post("/api/admin/bulk-import/jobs/{job_id}/discard")
+async def discard_import_job(job_id: str):
+    """Give up on a stopped job; its uploaded file is deleted and it can no longer be resumed."""
+    from import_jobs import JobConflict
+    
+    try:
+        job = await get_import_jobs().discard(job_id)
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.progress()
 
 if __name__ == "__main__":
     import uvicorn
@@ -71,11 +71,181 @@ CREATE TABLE reviews (
   UNIQUE(user_id, content_id)
 );
 
+-- Full-text search over content
+-- The 'simple' configuration does no stemming or stop words, which suits a
+-- catalog mixing English, Korean, Japanese and Spanish titles. CJK titles
+-- are not word-segmented by the parser, so substring matches on titles go
+-- through trigram indexes instead.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- array_to_string() is only STABLE, which a generated column rejects. Joining
+-- TEXT elements with a space does not depend on any setting, so this wrapper
+-- can be declared IMMUTABLE.
+CREATE OR REPLACE FUNCTION content_tags_text(p_tags TEXT[])
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+  SELECT COALESCE(array_to_string(p_tags, ' '), '');
+$$;
+
+ALTER TABLE content ADD COLUMN search_vector TSVECTOR GENERATED ALWAYS AS (
+  setweight(to_tsvector('simple', COALESCE(title, '')), 'A') ||
+  setweight(to_tsvector('simple', COALESCE(original_title, '')), 'A') ||
+  setweight(to_tsvector('simple', content_tags_text(tags)), 'B') ||
+  setweight(to_tsvector('simple', COALESCE(synopsis, '')), 'C')
+) STORED;
+
+CREATE INDEX content_search_vector_idx ON content USING GIN (search_vector);
+CREATE INDEX content_title_trgm_idx ON content USING GIN (title gin_trgm_ops);
+CREATE INDEX content_original_title_trgm_idx ON content USING GIN (original_title gin_trgm_ops);
+
+-- Matches ordered by relevance. PostgREST applies the endpoint's filters and
+-- range() on top of the function result, which keeps this order.
+CREATE OR REPLACE FUNCTION search_content_ranked(q TEXT)
+RETURNS SETOF content
+LANGUAGE plpgsql STABLE
+AS $$
+DECLARE
+  query TSQUERY := websearch_to_tsquery('simple', q);
+  -- q as a literal substring: escape LIKE's own metacharacters first
+  pattern TEXT := '%' || replace(replace(replace(q, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+BEGIN
+  RETURN QUERY
+  SELECT c.*
+  FROM content c
+  WHERE c.search_vector @@ query
+     OR c.title ILIKE pattern
+     OR c.original_title ILIKE pattern
+  ORDER BY
+    ts_rank_cd(c.search_vector, query) DESC,
+    GREATEST(similarity(c.title, q), similarity(COALESCE(c.original_title, ''), q)) DESC,
+    c.rating DESC NULLS LAST,
+    c.id;
+END;
+$$;
+
+-- Per-status watchlist counts for one user in a single round trip
+CREATE INDEX IF NOT EXISTS watchlist_user_status_idx ON watchlist (user_id, status);
+
+CREATE OR REPLACE FUNCTION watchlist_status_counts(p_user_id UUID)
+RETURNS TABLE (status TEXT, count BIGINT)
+LANGUAGE sql STABLE
+AS $$
+  SELECT w.status, COUNT(*) AS count
+  FROM watchlist w
+  WHERE w.user_id = p_user_id
+  GROUP BY w.status;
+$$;
+
+-- Facet catalog: distinct countries, genres and content types with counts,
+-- kept in sync with content by a trigger
+CREATE TABLE content_facets (
+  facet TEXT NOT NULL, -- 'country', 'genres' or 'content_type'
+  value TEXT NOT NULL,
+  count INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (facet, value)
+);
+
+CREATE OR REPLACE FUNCTION content_facet_values(c content)
+RETURNS TABLE (facet TEXT, value TEXT)
+LANGUAGE sql IMMUTABLE
+AS $$
+  SELECT 'country'::TEXT, c.country WHERE COALESCE(c.country, '') <> ''
+  UNION ALL
+  SELECT 'content_type'::TEXT, c.content_type WHERE COALESCE(c.content_type, '') <> ''
+  UNION ALL
+  SELECT DISTINCT 'genres'::TEXT, g FROM unnest(c.genres) AS g WHERE COALESCE(g, '') <> '';
+$$;
+
+CREATE OR REPLACE FUNCTION content_facets_sync()
+RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    UPDATE content_facets f SET count = f.count - 1
+    FROM content_facet_values(OLD) v
+    WHERE f.facet = v.facet AND f.value = v.value;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO content_facets (facet, value, count)
+    SELECT v.facet, v.value, 1 FROM content_facet_values(NEW) v
+    ON CONFLICT (facet, value) DO UPDATE SET count = content_facets.count + 1;
+  END IF;
+  DELETE FROM content_facets WHERE count <= 0;
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER content_facets_sync
+  AFTER INSERT OR UPDATE OF country, genres, content_type OR DELETE ON content
+  FOR EACH ROW EXECUTE FUNCTION content_facets_sync();
+
+-- Backfill for existing catalogs
+INSERT INTO content_facets (facet, value, count)
+SELECT v.facet, v.value, COUNT(*)
+FROM content c, LATERAL content_facet_values(c) v
+GROUP BY v.facet, v.value
+ON CONFLICT (facet, value) DO NOTHING;
+
+-- Keyset pagination: each list endpoint orders by (sort_key, id), so these
+-- indexes let a cursor page start its scan at the cursor instead of skipping
+-- OFFSET rows. Search sorts on other columns fall back to the filters above.
+CREATE INDEX IF NOT EXISTS content_created_at_id_idx ON content (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS content_rating_id_idx ON content (rating DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS content_year_id_idx ON content (year DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS watchlist_user_created_at_idx ON watchlist (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS watchlist_user_updated_at_idx ON watchlist (user_id, updated_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS reviews_created_at_id_idx ON reviews (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS reviews_content_created_at_idx ON reviews (content_id, created_at DESC, id DESC);
+
+-- Identity of a title across catalog re-imports (importer.content_fingerprint
+-- computes the same value). Not unique: catalogs imported before this
+-- column existed may already hold duplicates.
+ALTER TABLE content ADD COLUMN IF NOT EXISTS fingerprint TEXT GENERATED ALWAYS AS (md5(
+  lower(btrim(regexp_replace(title, '\s+', ' ', 'g'))) || chr(31) ||
+  lower(btrim(regexp_replace(COALESCE(original_title, ''), '\s+', ' ', 'g'))) || chr(31) ||
+  COALESCE(year::TEXT, '') || chr(31) ||
+  lower(btrim(regexp_replace(COALESCE(country, ''), '\s+', ' ', 'g'))) || chr(31) ||
+  lower(btrim(regexp_replace(COALESCE(content_type, ''), '\s+', ' ', 'g')))
+)) STORED;
+CREATE INDEX IF NOT EXISTS content_fingerprint_idx ON content (fingerprint);
+
+-- Background bulk imports (backend/import_jobs.py). Saved after every
+-- committed chunk so an interrupted import resumes where it stopped.
+CREATE TABLE IF NOT EXISTS import_jobs (
+  id UUID PRIMARY KEY,
+  filename TEXT NOT NULL,
+  path TEXT NOT NULL, -- spooled upload on the worker that accepted it
+  mode TEXT NOT NULL DEFAULT 'insert' CHECK (mode IN ('insert', 'upsert')),
+  status TEXT NOT NULL CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled', 'interrupted', 'discarded')),
+  chunk_rows INT NOT NULL,
+  expected_rows INT,
+  processed_rows INT NOT NULL DEFAULT 0,
+  dispatched_rows INT NOT NULL DEFAULT 0, -- rows sent, committed or not
+  runs INT NOT NULL DEFAULT 0,
+  total_rows INT NOT NULL DEFAULT 0,
+  successful_imports INT NOT NULL DEFAULT 0,
+  failed_imports INT NOT NULL DEFAULT 0,
+  inserted INT NOT NULL DEFAULT 0,
+  updated INT NOT NULL DEFAULT 0,
+  unchanged INT NOT NULL DEFAULT 0,
+  errors JSONB NOT NULL DEFAULT '[]',
+  imported_content JSONB NOT NULL DEFAULT '[]',
+  error TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  finished_at TIMESTAMPTZ
+);
+
 -- Enable Row Level Security (RLS) for all tables
 ALTER TABLE profiles ENABLE ROW LEVEL SECURITY;
 ALTER TABLE content ENABLE ROW LEVEL SECURITY;
 ALTER TABLE watchlist ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reviews ENABLE ROW LEVEL SECURITY;
+ALTER TABLE content_facets ENABLE ROW LEVEL SECURITY;
+-- No policies: only the backend's service role reads and writes import jobs
+ALTER TABLE import_jobs ENABLE ROW LEVEL SECURITY;
 
 -- RLS Policies for Profiles
 CREATE POLICY "Public profiles are viewable by everyone."
@@ -95,6 +265,10 @@ CREATE POLICY "Content is viewable by everyone."
   ON content FOR SELECT
   USING ( TRUE );
 
+CREATE POLICY "Content facets are viewable by everyone."
+  ON content_facets FOR SELECT
+  USING ( TRUE );
+
 -- RLS Policies for Watchlist
 CREATE POLICY "Users can view their own watchlist."
   ON watchlist FOR SELECT
@@ -128,3 +302,43 @@ CREATE POLICY "Users can update their own reviews."
 CREATE POLICY "Users can delete their own reviews."
   ON reviews FOR DELETE
   USING ( auth.uid() = user_id );
+
+-- Trending scores (backend/trending.py): exponentially time-decayed activity
+-- per title and period, as of as_of. Each API worker merges the scores it
+-- added since its last checkpoint, decaying the stored score to the newer
+-- as_of first, so the table sums every worker's events.
+CREATE TABLE IF NOT EXISTS trending_scores (
+  content_id UUID NOT NULL REFERENCES content(id) ON DELETE CASCADE,
+  period TEXT NOT NULL CHECK (period IN ('day', 'week', 'month')),
+  score DOUBLE PRECISION NOT NULL,
+  as_of TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (content_id, period)
+);
+
+-- Decay time constant of a period in seconds (trending.TRENDING_WINDOWS)
+CREATE OR REPLACE FUNCTION trending_period_seconds(p_period TEXT)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE
+AS $$
+  SELECT CASE p_period WHEN 'day' THEN 86400 WHEN 'week' THEN 604800 ELSE 2592000 END::DOUBLE PRECISION;
+$$;
+
+CREATE OR REPLACE FUNCTION add_trending_scores(p_scores JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  INSERT INTO trending_scores AS t (content_id, period, score, as_of)
+  SELECT c.id, s->>'period', (s->>'score')::DOUBLE PRECISION, (s->>'as_of')::TIMESTAMPTZ
+  FROM jsonb_array_elements(p_scores) AS s
+  -- Skip titles deleted since the worker scored them, instead of failing
+  -- the whole batch on the foreign key
+  JOIN content c ON c.id = (s->>'content_id')::UUID
+  ON CONFLICT (content_id, period) DO UPDATE SET
+    score = t.score * exp(-GREATEST(extract(epoch FROM EXCLUDED.as_of - t.as_of), 0) / trending_period_seconds(t.period))
+          + EXCLUDED.score * exp(-GREATEST(extract(epoch FROM t.as_of - EXCLUDED.as_of), 0) / trending_period_seconds(t.period)),
+    as_of = GREATEST(t.as_of, EXCLUDED.as_of);
+
+  -- Titles whose activity has decayed to nothing
+  DELETE FROM trending_scores
+  WHERE score * exp(-extract(epoch FROM now() - as_of) / trending_period_seconds(period)) < 0.001;
+$$;
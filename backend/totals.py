@@ -0,0 +1,85 @@
+"""Cached totals for paginated endpoints.
+
+Every list response carries a ``total``, and ``count="exact"`` makes Postgres
+visit every matching row to produce it, on every page request. Totals are
+instead cached per ``(table, filters, count mode)`` for ``TOTALS_CACHE_TTL``
+seconds, and this worker's own writes drop a table's entries so a write is
+reflected in the next total it serves.
+
+Callers pick the PostgREST count method:
+
+* ``exact`` - ``COUNT(*)`` over the filtered rows (default)
+* ``planned`` - the query planner's row estimate, constant time
+* ``estimated`` - exact up to PostgREST's ``db-max-rows``, planned above it
+
+A cached exact total also answers ``planned``/``estimated`` lookups.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+TOTALS_CACHE_TTL = float(os.getenv("TOTALS_CACHE_TTL", "30"))
+TOTALS_CACHE_SIZE = int(os.getenv("TOTALS_CACHE_SIZE", "4096"))
+
+COUNT_MODES = ("exact", "planned", "estimated")
+COUNT_MODE_PATTERN = "^(%s)$" % "|".join(COUNT_MODES)
+
+
+def totals_key(**filters: Any) -> Tuple:
+    """Hashable key for a set of filters, ignoring unset ones."""
+    return tuple(sorted((name, value) for name, value in filters.items() if value not in (None, "")))
+
+
+class TotalsCache:
+    """LRU of totals with a TTL, invalidated per table."""
+
+    def __init__(self, ttl: float = TOTALS_CACHE_TTL, max_size: int = TOTALS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, Tuple[int, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, table: str, key: Tuple, mode: str) -> Optional[int]:
+        now = time.monotonic()
+        modes = (mode,) if mode == "exact" else (mode, "exact")
+        for candidate in modes:
+            entry_key = (table, key, candidate)
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                continue
+            total, expires_at = entry
+            if expires_at <= now:
+                del self._entries[entry_key]
+                continue
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return total
+        self.misses += 1
+        return None
+
+    def put(self, table: str, key: Tuple, mode: str, total: Optional[int]):
+        if total is None:
+            return
+        entry_key = (table, key, mode)
+        self._entries[entry_key] = (total, time.monotonic() + self.ttl)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, table: Optional[str] = None):
+        if table is None:
+            self._entries.clear()
+            return
+        for entry_key in [k for k in self._entries if k[0] == table]:
+            del self._entries[entry_key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,326 @@
+"""Time-decayed trending scores for ``/api/discovery/trending``.
+
+Trending used to be the catalog sorted by rating, whatever ``time_period``
+asked for. It is now driven by what people do: every watchlist add, review
+and view adds its ``TRENDING_WEIGHTS`` weight to the title's score in each
+``TRENDING_WINDOWS`` period, and scores decay exponentially with that
+period as the time constant, so a view a week ago counts 1/e as much as
+one now in the "week" ranking.
+
+The engine keeps everything in memory, per worker:
+
+* Scores use forward decay. An event at time ``t`` adds
+  ``weight * exp((t - landmark) / tau)``, and the decayed score at ``now``
+  is the stored value times ``exp(-(now - landmark) / tau)``. Since that
+  factor is the same for every title, ranking never needs a pass over all
+  scores, and stored values only grow. The landmark moves forward (one pass)
+  before the exponent could overflow.
+* Scores live in ``array('d')`` columns indexed by a title's ordinal, 8
+  bytes per title per period, plus the same again for the not yet
+  checkpointed part.
+* Each period keeps its ``TRENDING_TOP_K`` leaders in a dict backed by a
+  min-heap. Because scores only grow, a title can only enter the top by
+  being scored, when it is compared against the heap's minimum, so the top
+  stays exact at O(log k) per event. ``top()`` sorts at most k entries.
+
+Every ``TRENDING_CHECKPOINT_SECONDS`` the scores this worker added since the
+last checkpoint are merged into the ``trending_scores`` table
+(``add_trending_scores`` decays the stored score before adding, see
+``supabase_schema.sql``). The table is then read back, so each worker ranks
+on every worker's events, and a restarted worker resumes from it.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import os
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+TRENDING_WINDOWS = {"day": 86400.0, "week": 7 * 86400.0, "month": 30 * 86400.0}
+TRENDING_PERIOD_PATTERN = "^(%s)$" % "|".join(TRENDING_WINDOWS)
+TRENDING_WEIGHTS = {"view": 1.0, "watchlist": 3.0, "review": 5.0}
+# The endpoint's largest limit
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", "50"))
+TRENDING_CHECKPOINT_SECONDS = float(os.getenv("TRENDING_CHECKPOINT_SECONDS", "60"))
+# Rows per add_trending_scores call
+TRENDING_CHECKPOINT_ROWS = int(os.getenv("TRENDING_CHECKPOINT_ROWS", "1000"))
+# Move the landmark once exp() of this many time constants would be needed;
+# far below float overflow
+RENORMALIZE_AFTER = 50.0
+# SQLSTATE of a trending_scores row whose title no longer exists
+FOREIGN_KEY_VIOLATION = "23503"
+
+SaveScores = Callable[[List[dict]], Awaitable[None]]
+LoadScores = Callable[[], Awaitable[List[dict]]]
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value: str) -> float:
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class _Period:
+    """Scores and top-k leaders for one decay period."""
+
+    def __init__(self, tau: float, top_k: int):
+        self.tau = tau
+        self.top_k = top_k
+        # Set by the first timestamp seen
+        self.landmark: Optional[float] = None
+        self.scores = array("d")
+        # Added since the last checkpoint, in the same units as scores
+        self.pending = array("d")
+        # ordinal -> stored score of the current leaders
+        self.top: Dict[int, float] = {}
+        # (stored score, ordinal); entries whose score is no longer the
+        # leader's are skipped when popped
+        self.heap: List[Tuple[float, int]] = []
+        self._ranked: Optional[List[int]] = None
+
+    def grow(self):
+        self.scores.append(0.0)
+        self.pending.append(0.0)
+
+    def scale(self, at: float) -> float:
+        """Stored units per unit of score at ``at``."""
+        return math.exp((at - self.landmark) / self.tau)
+
+    def advance(self, at: float):
+        if self.landmark is None:
+            self.landmark = at
+        elif (at - self.landmark) / self.tau > RENORMALIZE_AFTER:
+            self._renormalize(at)
+
+    def add(self, ordinal: int, amount: float, at: float):
+        self.advance(at)
+        stored = amount * self.scale(at)
+        self.scores[ordinal] += stored
+        self.pending[ordinal] += stored
+        self._offer(ordinal, self.scores[ordinal])
+
+    def _offer(self, ordinal: int, score: float):
+        if ordinal not in self.top and len(self.top) >= self.top_k:
+            floor_score, floor_ordinal = self._floor()
+            if score <= floor_score:
+                return
+            heapq.heappop(self.heap)
+            del self.top[floor_ordinal]
+        self.top[ordinal] = score
+        heapq.heappush(self.heap, (score, ordinal))
+        self._ranked = None
+        if len(self.heap) > 4 * self.top_k:
+            self._rebuild_heap()
+
+    def _floor(self) -> Tuple[float, int]:
+        while self.top.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0]
+
+    def _rebuild_heap(self):
+        self.heap = [(score, ordinal) for ordinal, score in self.top.items()]
+        heapq.heapify(self.heap)
+
+    def rebuild_top(self):
+        """Recompute the leaders from every score, O(n log k)."""
+        leaders = heapq.nlargest(self.top_k, (i for i in range(len(self.scores)) if self.scores[i] > 0), key=self.scores.__getitem__)
+        self.top = {ordinal: self.scores[ordinal] for ordinal in leaders}
+        self._rebuild_heap()
+        self._ranked = None
+
+    def _renormalize(self, at: float):
+        factor = 1 / self.scale(at)
+        for column in (self.scores, self.pending):
+            for i in range(len(column)):
+                column[i] *= factor
+        self.top = {ordinal: score * factor for ordinal, score in self.top.items()}
+        self._rebuild_heap()
+        self.landmark = at
+
+    def ranked(self) -> List[int]:
+        if self._ranked is None:
+            self._ranked = sorted(self.top, key=self.top.__getitem__, reverse=True)
+        return self._ranked
+
+
+class TrendingEngine:
+    """Per-title trending scores for every period, with top-k leaders."""
+
+    def __init__(
+        self,
+        windows: Dict[str, float] = TRENDING_WINDOWS,
+        weights: Dict[str, float] = TRENDING_WEIGHTS,
+        top_k: int = TRENDING_TOP_K,
+        checkpoint_seconds: float = TRENDING_CHECKPOINT_SECONDS,
+    ):
+        self.weights = weights
+        self.top_k = top_k
+        self.checkpoint_seconds = checkpoint_seconds
+        self.periods = {name: _Period(tau, top_k) for name, tau in windows.items()}
+        self.ids: List[str] = []
+        self.ordinals: Dict[str, int] = {}
+        self.loaded = False
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.events = 0
+        self.checkpoints = 0
+        self.errors = 0
+
+    def _ordinal(self, content_id: str) -> int:
+        ordinal = self.ordinals.get(content_id)
+        if ordinal is None:
+            ordinal = self.ordinals[content_id] = len(self.ids)
+            self.ids.append(content_id)
+            for period in self.periods.values():
+                period.grow()
+        return ordinal
+
+    def record(self, content_id: str, kind: str, at: Optional[float] = None):
+        """Count one ``kind`` event ("view", "watchlist", "review") for a title."""
+        at = time.time() if at is None else at
+        ordinal = self._ordinal(content_id)
+        weight = self.weights[kind]
+        for period in self.periods.values():
+            period.add(ordinal, weight, at)
+        self.events += 1
+
+    def top(self, period_name: str, limit: int, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """The ``limit`` highest ``(content_id, score)`` pairs, score decayed to ``now``."""
+        now = time.time() if now is None else now
+        period = self.periods[period_name]
+        period.advance(now)
+        decay = 1 / period.scale(now)
+        return [(self.ids[ordinal], period.top[ordinal] * decay) for ordinal in period.ranked()[:limit]]
+
+    def forget(self, content_ids: Iterable[str]):
+        """Drop deleted titles from every ranking."""
+        ordinals = [self.ordinals[content_id] for content_id in content_ids if content_id in self.ordinals]
+        if not ordinals:
+            return
+        for period in self.periods.values():
+            for ordinal in ordinals:
+                period.scores[ordinal] = period.pending[ordinal] = 0.0
+            if any(ordinal in period.top for ordinal in ordinals):
+                period.rebuild_top()
+
+    # Checkpoints
+
+    def take_pending(self, now: Optional[float] = None) -> List[dict]:
+        """Scores added since the last checkpoint, as ``trending_scores`` rows, and reset them."""
+        now = time.time() if now is None else now
+        as_of = datetime.fromtimestamp(now, timezone.utc).isoformat()
+        rows = []
+        for name, period in self.periods.items():
+            period.advance(now)
+            decay = 1 / period.scale(now)
+            pending, period.pending = period.pending, array("d", bytes(8 * len(period.pending)))
+            for ordinal, stored in enumerate(pending):
+                if stored > 0:
+                    rows.append({"content_id": self.ids[ordinal], "period": name, "score": stored * decay, "as_of": as_of})
+        return rows
+
+    def restore_pending(self, rows: List[dict]):
+        """Put back rows from ``take_pending`` that could not be saved."""
+        for row in rows:
+            period = self.periods[row["period"]]
+            at = _timestamp(row["as_of"])
+            period.advance(at)
+            period.pending[self._ordinal(row["content_id"])] += row["score"] * period.scale(at)
+
+    def load(self, rows: List[dict]):
+        """Replace the scores with checkpointed ones, keeping anything not yet saved."""
+        now = time.time()
+        for period in self.periods.values():
+            period.advance(now)
+            period.scores = array("d", period.pending)
+        for row in rows:
+            period = self.periods.get(row["period"])
+            if period is None or row["score"] <= 0:
+                continue
+            ordinal = self._ordinal(row["content_id"])
+            period.scores[ordinal] += row["score"] * period.scale(_timestamp(row["as_of"]))
+        for period in self.periods.values():
+            period.rebuild_top()
+        self.loaded = True
+
+    async def ensure_loaded(self, load: LoadScores):
+        """Load the last checkpoint once; an unreadable one starts from nothing."""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            try:
+                rows = await load()
+            except Exception:
+                # Backing table not migrated yet
+                logger.warning("Could not load trending scores", exc_info=True)
+                rows = []
+            self.load(rows)
+
+    async def checkpoint(self, save: SaveScores, load: Optional[LoadScores] = None):
+        """Save this worker's new scores, then (with ``load``) adopt everyone's."""
+        async with self._lock:
+            rows = self.take_pending()
+            for start in range(0, len(rows), TRENDING_CHECKPOINT_ROWS):
+                try:
+                    await save(rows[start:start + TRENDING_CHECKPOINT_ROWS])
+                except BaseException as e:
+                    if str(getattr(e, "code", "")) != FOREIGN_KEY_VIOLATION:
+                        # Batches already saved stay saved; the rest go out next time
+                        self.restore_pending(rows[start:])
+                        raise
+                    # A title was deleted while the batch was being saved;
+                    # retrying would fail the same way every time
+                    self.errors += 1
+                    logger.warning("Dropped trending scores of deleted content", exc_info=True)
+            if load is not None:
+                self.load(await load())
+            self.checkpoints += 1
+
+    def start(self, save: SaveScores, load: LoadScores):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(save, load))
+
+    async def stop(self, save: Optional[SaveScores] = None):
+        """Stop checkpointing; with ``save``, save what is pending first."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if save is not None:
+            try:
+                await self.checkpoint(save)
+            except Exception:
+                self.errors += 1
+                logger.warning("Could not save trending scores on shutdown", exc_info=True)
+
+    async def _run(self, save: SaveScores, load: LoadScores):
+        # Startup does no database work; the first request loads the scores
+        while True:
+            await asyncio.sleep(self.checkpoint_seconds)
+            try:
+                await self.checkpoint(save, load)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.warning("Trending checkpoint failed", exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            "titles": len(self.ids),
+            "events": self.events,
+            "checkpoints": self.checkpoints,
+            "errors": self.errors,
+            "pending": sum(1 for period in self.periods.values() for stored in period.pending if stored > 0),
+        }
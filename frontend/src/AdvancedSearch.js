@@ -397,6 +397,7 @@ const AdvancedSearch = ({ darkTheme, onContentClick }) => {
                       : 'bg-white border-gray-300 text-gray-900'
                   }`}
                 >
+                  <option value="relevance">Relevance</option>
                   <option value="rating">Rating</option>
                   <option value="year">Year</option>
                   <option value="title">Title</option>
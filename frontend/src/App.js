@@ -63,6 +63,12 @@ function App() {
   };
 
   const handleLogout = async () => {
+    try {
+      // Drop the token from the API's verification cache
+      await axios.post(`${API}/auth/logout`);
+    } catch (error) {
+      // The session is ending either way
+    }
     await supabase.auth.signOut();
     setCurrentUser(null);
     setSession(null);
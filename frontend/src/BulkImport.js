@@ -1,8 +1,18 @@
-import React, { useState } from 'react';
+import React, { useCallback, useEffect, useRef, useState } from 'react';
 import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const JOB_STORAGE_KEY = 'bulk_import_job';
+const ACTIVE_STATUSES = ['queued', 'running'];
+const RESUMABLE_STATUSES = ['cancelled', 'interrupted', 'failed'];
+
+const formatDuration = (seconds) => {
+  if (seconds == null) return '—';
+  if (seconds < 60) return `${Math.round(seconds)}s`;
+  const minutes = Math.floor(seconds / 60);
+  return minutes < 60 ? `${minutes}m ${Math.round(seconds % 60)}s` : `${Math.floor(minutes / 60)}h ${minutes % 60}m`;
+};
 
 const BulkImport = ({ darkTheme, onImportComplete }) => {
   const [selectedFile, setSelectedFile] = useState(null);
@@ -10,6 +20,78 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
   const [importResult, setImportResult] = useState(null);
   const [showTemplate, setShowTemplate] = useState(false);
   const [dragOver, setDragOver] = useState(false);
+  const [job, setJob] = useState(null);
+  const [updateExisting, setUpdateExisting] = useState(false);
+  const followRef = useRef(null);
+
+  const authHeaders = () => ({ 'Authorization': `Bearer ${localStorage.getItem('admin_token')}` });
+
+  const stopFollowing = () => {
+    if (followRef.current) {
+      followRef.current();
+      followRef.current = null;
+    }
+  };
+
+  const handleProgress = useCallback((progress) => {
+    setJob(progress);
+    if (ACTIVE_STATUSES.includes(progress.status)) return;
+
+    stopFollowing();
+    setUploading(false);
+    setImportResult(progress);
+    if (progress.status === 'completed') {
+      localStorage.removeItem(JOB_STORAGE_KEY);
+      if (progress.success && onImportComplete) {
+        onImportComplete();
+      }
+    }
+  }, [onImportComplete]);
+
+  // Server-sent events where available, polling otherwise (or if the stream drops)
+  const followJob = useCallback((jobId) => {
+    stopFollowing();
+    const poll = () => {
+      const timer = setInterval(async () => {
+        try {
+          const response = await axios.get(`${API}/admin/bulk-import/jobs/${jobId}`, { headers: authHeaders() });
+          handleProgress(response.data);
+        } catch (error) {
+          console.error('Progress error:', error);
+        }
+      }, 1000);
+      followRef.current = () => clearInterval(timer);
+    };
+
+    if (!window.EventSource) {
+      poll();
+      return;
+    }
+    const source = new EventSource(`${API}/admin/bulk-import/jobs/${jobId}/events`);
+    source.onmessage = (event) => handleProgress(JSON.parse(event.data));
+    source.onerror = () => {
+      source.close();
+      if (followRef.current) poll();
+    };
+    followRef.current = () => source.close();
+  }, [handleProgress]);
+
+  // Pick up a job started before the page was reloaded
+  useEffect(() => {
+    const jobId = localStorage.getItem(JOB_STORAGE_KEY);
+    if (jobId) {
+      axios.get(`${API}/admin/bulk-import/jobs/${jobId}`, { headers: authHeaders() })
+        .then((response) => {
+          setJob(response.data);
+          if (ACTIVE_STATUSES.includes(response.data.status)) {
+            setUploading(true);
+            followJob(jobId);
+          }
+        })
+        .catch(() => localStorage.removeItem(JOB_STORAGE_KEY));
+    }
+    return stopFollowing;
+  }, [followJob]);
 
   // Sample data for quick template generation
   const sampleData = [
@@ -80,11 +162,14 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
     const validTypes = ['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 
                        'application/vnd.ms-excel', 'text/csv'];
     
-    if (validTypes.includes(file.type) || file.name.endsWith('.csv') || file.name.endsWith('.xlsx') || file.name.endsWith('.xls')) {
+    const extensions = ['.csv', '.xlsx', '.xls', '.jsonl', '.ndjson', '.parquet', '.arrow', '.arrows', '.feather'];
+    const name = file.name.toLowerCase();
+
+    if (validTypes.includes(file.type) || extensions.some((extension) => name.endsWith(extension))) {
       setSelectedFile(file);
       setImportResult(null);
     } else {
-      alert('Please select a valid Excel (.xlsx, .xls) or CSV (.csv) file');
+      alert('Please select a valid Excel (.xlsx, .xls), CSV (.csv), JSON Lines (.jsonl), Parquet (.parquet) or Arrow (.arrow) file');
     }
   };
 
@@ -120,18 +205,18 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
       const formData = new FormData();
       formData.append('file', selectedFile);
 
-      const token = localStorage.getItem('admin_token');
       const response = await axios.post(`${API}/admin/bulk-import`, formData, {
+        params: { mode: updateExisting ? 'upsert' : 'insert' },
         headers: {
-          'Authorization': `Bearer ${token}`,
+          ...authHeaders(),
           'Content-Type': 'multipart/form-data'
         }
       });
 
-      setImportResult(response.data);
-      if (response.data.success && onImportComplete) {
-        onImportComplete();
-      }
+      // The import carries on in the background; follow its progress
+      localStorage.setItem(JOB_STORAGE_KEY, response.data.job_id);
+      setJob(response.data);
+      followJob(response.data.job_id);
     } catch (error) {
       console.error('Upload error:', error);
       setImportResult({
@@ -142,11 +227,40 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
         errors: [error.response?.data?.detail || 'Upload failed'],
         imported_content: []
       });
-    } finally {
       setUploading(false);
     }
   };
 
+  const cancelJob = async () => {
+    try {
+      const response = await axios.post(`${API}/admin/bulk-import/jobs/${job.job_id}/cancel`, null, { headers: authHeaders() });
+      setJob(response.data);
+    } catch (error) {
+      alert(error.response?.data?.detail || 'Could not cancel the import');
+    }
+  };
+
+  const resumeJob = async () => {
+    try {
+      const response = await axios.post(`${API}/admin/bulk-import/jobs/${job.job_id}/resume`, null, { headers: authHeaders() });
+      setImportResult(null);
+      setUploading(true);
+      setJob(response.data);
+      followJob(response.data.job_id);
+    } catch (error) {
+      alert(error.response?.data?.detail || 'Could not resume the import');
+    }
+  };
+
+  const discardJob = async () => {
+    try {
+      const response = await axios.post(`${API}/admin/bulk-import/jobs/${job.job_id}/discard`, null, { headers: authHeaders() });
+      setJob(response.data);
+    } catch (error) {
+      alert(error.response?.data?.detail || 'Could not discard the import');
+    }
+  };
+
   const downloadTemplate = (withSamples = false) => {
     const headers = [
       'title', 'original_title', 'synopsis', 'year', 'country', 'content_type',
@@ -184,6 +298,8 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
   const resetUpload = () => {
     setSelectedFile(null);
     setImportResult(null);
+    setJob(null);
+    localStorage.removeItem(JOB_STORAGE_KEY);
     document.getElementById('file-input').value = '';
   };
 
@@ -232,6 +348,8 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
               }`}>
                 <li>Excel files (.xlsx, .xls)</li>
                 <li>CSV files (.csv)</li>
+                <li>JSON Lines (.jsonl, .ndjson)</li>
+                <li>Parquet (.parquet) and Arrow IPC (.arrow, .feather); list columns are imported as-is</li>
               </ul>
             </div>
 
@@ -321,7 +439,7 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
           <input
             id="file-input"
             type="file"
-            accept=".xlsx,.xls,.csv"
+            accept=".xlsx,.xls,.csv,.jsonl,.ndjson,.parquet,.arrow,.arrows,.feather"
             onChange={handleFileSelect}
             className="hidden"
           />
@@ -351,6 +469,17 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
       </div>
 
       {/* Upload Button */}
+      {selectedFile && (
+        <label className={`flex items-center gap-2 text-sm ${darkTheme ? 'text-gray-300' : 'text-gray-700'}`}>
+          <input
+            type="checkbox"
+            checked={updateExisting}
+            onChange={(e) => setUpdateExisting(e.target.checked)}
+            disabled={uploading}
+          />
+          Update titles that already exist (matched by title, original title, year, country and type) instead of adding duplicates
+        </label>
+      )}
       {selectedFile && (
         <div className="flex gap-4">
           <button
@@ -385,6 +514,61 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
         </div>
       )}
 
+      {/* Import Progress */}
+      {job && (ACTIVE_STATUSES.includes(job.status) || RESUMABLE_STATUSES.includes(job.status)) && (
+        <div className={`p-6 rounded-xl border ${
+          darkTheme ? 'bg-gray-900 border-gray-700' : 'bg-white border-gray-200'
+        }`}>
+          <div className="flex items-center justify-between mb-3">
+            <h4 className={`font-semibold ${darkTheme ? 'text-white' : 'text-gray-900'}`}>
+              {job.filename} — {job.status}
+            </h4>
+            {ACTIVE_STATUSES.includes(job.status) ? (
+              <button
+                onClick={cancelJob}
+                className={`px-4 py-2 rounded-lg transition-colors ${
+                  darkTheme ? 'bg-gray-800 text-white hover:bg-gray-700' : 'bg-gray-200 text-gray-700 hover:bg-gray-300'
+                }`}
+              >
+                Cancel
+              </button>
+            ) : (
+              <div className="flex gap-2">
+                <button
+                  onClick={discardJob}
+                  className={`px-4 py-2 rounded-lg transition-colors ${
+                    darkTheme ? 'bg-gray-800 text-white hover:bg-gray-700' : 'bg-gray-200 text-gray-700 hover:bg-gray-300'
+                  }`}
+                >
+                  Discard
+                </button>
+                <button
+                  onClick={resumeJob}
+                  className="px-4 py-2 bg-gradient-to-r from-red-600 to-red-700 text-white rounded-lg hover:from-red-700 hover:to-red-800 transition-all duration-200"
+                >
+                  Resume
+                </button>
+              </div>
+            )}
+          </div>
+          <div className={`w-full h-3 rounded-full overflow-hidden ${darkTheme ? 'bg-gray-800' : 'bg-gray-200'}`}>
+            <div
+              className="h-3 bg-gradient-to-r from-red-600 to-red-700 transition-all duration-500"
+              style={{ width: `${job.expected_rows ? Math.min(100, (job.processed_rows / job.expected_rows) * 100) : 0}%` }}
+            />
+          </div>
+          <div className={`mt-3 grid grid-cols-2 md:grid-cols-4 gap-2 text-sm ${darkTheme ? 'text-gray-400' : 'text-gray-600'}`}>
+            <div>Rows: {job.processed_rows}{job.expected_rows != null ? ` / ~${job.expected_rows}` : ''}</div>
+            <div>Rate: {job.rows_per_second != null ? `${Math.round(job.rows_per_second)} rows/s` : '—'}</div>
+            <div>ETA: {formatDuration(job.eta_seconds)}</div>
+            <div>Errors: {job.failed_imports}</div>
+          </div>
+          {job.error && (
+            <p className="mt-2 text-sm text-red-600">{job.error}</p>
+          )}
+        </div>
+      )}
+
       {/* Import Results */}
       {importResult && (
         <div className={`p-6 rounded-xl border ${
@@ -469,6 +653,12 @@ const BulkImport = ({ darkTheme, onImportComplete }) => {
             </div>
           </div>
 
+          {(importResult.updated > 0 || importResult.unchanged > 0) && (
+            <p className={`text-sm mb-4 ${darkTheme ? 'text-gray-400' : 'text-gray-600'}`}>
+              {importResult.inserted} new, {importResult.updated} updated, {importResult.unchanged} unchanged
+            </p>
+          )}
+
           {/* Successfully Imported Content */}
           {importResult.imported_content.length > 0 && (
             <div className="mb-4">
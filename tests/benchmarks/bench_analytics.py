@@ -0,0 +1,73 @@
+"""/api/analytics/dashboard on synthetic watchlists of 10, 1k and 10k items.
+
+``n+1`` replays the previous implementation (one ``content`` query per
+watchlist item, Python dict counting); ``joined`` is the current endpoint
+(embedded join paged by ANALYTICS_PAGE_SIZE, pandas aggregation). The stub
+backend adds ``--rtt`` of blocking latency to every query.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from tests.benchmarks.common import load_server
+from tests.fake_supabase import FakeSupabase
+
+GENRES = ["drama", "thriller", "romance", "comedy", "crime", "fantasy", "mystery", "action"]
+STATUSES = ["want_to_watch", "watching", "completed", "dropped"]
+
+
+def build_fake(items, rtt):
+    rng = random.Random(items)
+    fake = FakeSupabase(latency=rtt)
+    fake.tables["content"] = [
+        {"id": f"c{i}", "genres": rng.sample(GENRES, rng.randint(1, 3))} for i in range(items)
+    ]
+    fake.tables["watchlist"] = [
+        {"id": i, "user_id": "bench-user", "content_id": f"c{i}", "status": rng.choice(STATUSES)}
+        for i in range(items)
+    ]
+    return fake
+
+
+async def legacy_dashboard(server, execute, user_id):
+    watchlist_items = (await execute(server.supabase.table("watchlist").select("*").eq("user_id", user_id))).data
+    genre_counts = {}
+    for item in watchlist_items:
+        content_result = await execute(server.supabase.table("content").select("genres").eq("id", item["content_id"]))
+        if content_result.data and content_result.data[0]["genres"]:
+            for genre in content_result.data[0]["genres"]:
+                genre_counts[genre] = genre_counts.get(genre, 0) + 1
+    return sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rtt", type=float, default=0.0005, help="simulated query round trip (s)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    args = parser.parse_args()
+
+    from auth_cache import AuthUser
+    from db import execute
+
+    for items in args.sizes:
+        fake = build_fake(items, args.rtt)
+        server = load_server(fake)
+        user = AuthUser(id="bench-user")
+
+        fake.reset_queries()
+        start = time.perf_counter()
+        asyncio.run(legacy_dashboard(server, execute, user.id))
+        legacy_time, legacy_queries = time.perf_counter() - start, len(fake.queries)
+
+        fake.reset_queries()
+        start = time.perf_counter()
+        asyncio.run(server.get_analytics_dashboard(user))
+        joined_time, joined_queries = time.perf_counter() - start, len(fake.queries)
+
+        print(f"{items:>6} items  n+1: {legacy_time * 1000:9.1f} ms / {legacy_queries:>5} queries"
+              f"   joined: {joined_time * 1000:7.1f} ms / {joined_queries:>2} queries")
+
+
+if __name__ == "__main__":
+    main()
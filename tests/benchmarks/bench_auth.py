@@ -0,0 +1,65 @@
+"""Per-request cost of get_current_user before and after local verification.
+
+* gotrue: every request calls ``supabase.auth.get_user`` (the old path); the
+  stub backend adds ``--rtt`` of blocking latency per call.
+* local-cold: HS256 signature + expiry check, every token seen once.
+* local-warm: the same token again, served from the TTL+LRU cache.
+"""
+import argparse
+import asyncio
+import time
+
+import jwt
+from fastapi.security import HTTPAuthorizationCredentials
+
+from tests.benchmarks.common import load_server, summarize
+from tests.fake_supabase import FakeSupabase
+
+SECRET = "bench-jwt-secret-with-enough-bytes-for-hs256"
+
+
+def make_token(i):
+    return jwt.encode(
+        {"sub": f"user-{i}", "aud": "authenticated", "exp": int(time.time()) + 3600},
+        SECRET,
+        algorithm="HS256",
+    )
+
+
+async def measure(server, tokens):
+    samples = []
+    for token in tokens:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        start = time.perf_counter()
+        await server.get_current_user(credentials)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rtt", type=float, default=0.02, help="simulated GoTrue round trip (s)")
+    args = parser.parse_args()
+
+    from auth_cache import TokenCache, TokenVerifier
+
+    fake = FakeSupabase(latency=args.rtt)
+    server = load_server(fake)
+    tokens = [make_token(i) for i in range(args.requests)]
+    for token in tokens[:200]:
+        fake.auth.add_user(token)
+
+    server.token_verifier = TokenVerifier(None, None)
+    server.token_cache = TokenCache(ttl=0)
+    print("gotrue:    ", asyncio.run(measure(server, tokens[:200])))
+
+    server.token_verifier = TokenVerifier(None, SECRET)
+    server.token_cache = TokenCache()
+    print("local-cold:", asyncio.run(measure(server, tokens)))
+    print("local-warm:", asyncio.run(measure(server, tokens)))
+    print("cache:     ", server.token_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
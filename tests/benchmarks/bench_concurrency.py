@@ -0,0 +1,85 @@
+"""Latency of /api/content while /api/admin/stats runs concurrently.
+
+The stub backend sleeps (blocking) for every query to mimic PostgREST round
+trips: the admin stats scan is slow, content pages are fast. With the thread
+pool offload the slow scan no longer holds the event loop, so the content p99
+stays close to its own query latency. ``--inline`` runs queries directly on
+the loop, which is how the handlers behaved before ``db.py``.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from tests.benchmarks.common import load_server, summarize
+from tests.fake_supabase import FakeSupabase
+
+STATS_LATENCY = 0.1
+CONTENT_LATENCY = 0.005
+# Open-loop arrival rate for /api/content
+ARRIVAL_INTERVAL = 0.01
+
+
+def latency(query):
+    if query.table_name == "content" and "content_type" in getattr(query, "columns", ""):
+        return STATS_LATENCY
+    return CONTENT_LATENCY
+
+
+async def run(requests, inline):
+    fake = FakeSupabase(latency=latency)
+    fake.tables["content"] = [
+        {"id": str(i), "title": f"Title {i}", "synopsis": "", "content_type": "movie",
+         "country": "Japan", "created_at": f"2024-01-{i % 28 + 1:02d}"}
+        for i in range(200)
+    ]
+    server = load_server(fake)
+    if inline:
+        async def run_inline(fn, *args, timeout=None, **kwargs):
+            return fn(*args, **kwargs)
+        import db
+        db.run_sync = run_inline
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+
+        async def admin_load():
+            while not stop.is_set():
+                await client.get("/api/admin/stats")
+                await asyncio.sleep(0)
+
+        background = [asyncio.create_task(admin_load()) for _ in range(2)]
+        samples = []
+
+        async def timed_request(scheduled):
+            response = await client.get("/api/content", params={"limit": 20})
+            # Measured from the scheduled arrival, so time spent waiting for a
+            # blocked event loop counts against the request
+            samples.append(time.perf_counter() - scheduled)
+            assert response.status_code == 200
+
+        loop_start = time.perf_counter()
+        pending = []
+        for i in range(requests):
+            scheduled = loop_start + i * ARRIVAL_INTERVAL
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            pending.append(asyncio.create_task(timed_request(scheduled)))
+        await asyncio.gather(*pending)
+        stop.set()
+        await asyncio.gather(*background)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--inline", action="store_true", help="execute queries on the event loop")
+    args = parser.parse_args()
+    mode = "inline" if args.inline else "thread pool"
+    print(f"/api/content under concurrent /api/admin/stats ({mode}):", asyncio.run(run(args.requests, args.inline)))
+
+
+if __name__ == "__main__":
+    main()
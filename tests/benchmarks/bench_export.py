@@ -0,0 +1,111 @@
+"""Catalog export: throughput and peak memory per format.
+
+Streams generated rows through ``export_pages`` and ``encode_stream`` (no
+database; each page fetch sleeps ``--rtt`` to stand in for PostgREST):
+
+    python -m tests.benchmarks.bench_export --rows 10000 100000
+
+Peak memory should stay flat as ``--rows`` grows. ``buffered`` is the old
+way out of the catalog, every row loaded into one list before encoding,
+shown for comparison.
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from tests.benchmarks.common import BACKEND_DIR  # noqa: F401  (puts backend/ on sys.path)
+
+
+def make_row(i):
+    return {
+        "id": f"00000000-0000-0000-0000-{i:012d}",
+        "title": f"Title {i}",
+        "original_title": None,
+        "synopsis": "A synopsis " * 30,
+        "year": 2000 + i % 20,
+        "country": "Japan",
+        "content_type": "movie",
+        "rating": 7.5,
+        "poster_url": f"https://example.com/{i}.jpg",
+        "banner_url": None,
+        "episodes": 16,
+        "duration": None,
+        "genres": ["Drama", "Comedy"],
+        "streaming_platforms": ["Netflix"],
+        "tags": ["romance"],
+        "cast": [{"name": "Lead", "character": "Hero"}],
+        "crew": [{"name": "Director", "role": "director"}],
+        "created_at": "2024-01-01T00:00:00+00:00",
+        "updated_at": "2024-01-01T00:00:00+00:00",
+    }
+
+
+def stub_fetch(total, rtt):
+    async def fetch(after, limit):
+        await asyncio.sleep(rtt)
+        start = int(after.rsplit("-", 1)[1]) + 1 if after else 0
+        return [make_row(i) for i in range(start, min(start + limit, total))]
+
+    return fetch
+
+
+async def drain(chunks):
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+    return size
+
+
+def measure(run):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        size = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    from exporter import encode_stream, export_pages
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--page-rows", type=int, default=1000)
+    parser.add_argument("--rtt", type=float, default=0.005, help="seconds per page fetch")
+    parser.add_argument("--formats", nargs="+", default=["csv", "jsonl", "parquet"])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        fetch = stub_fetch(rows, args.rtt)
+
+        async def buffered():
+            everything, after = [], None
+            while True:
+                page = await fetch(after, args.page_rows)
+                if not page:
+                    break
+                everything.extend(page)
+                after = page[-1]["id"]
+            return len("".join(json.dumps(row) + "\n" for row in everything))
+
+        elapsed, peak, size = measure(buffered)
+        print({"rows": rows, "format": "buffered jsonl", "rows_per_s": round(rows / elapsed), "peak_mb": round(peak / 2**20, 1), "mb": round(size / 2**20, 1)})
+        for export_format in args.formats:
+            for compress in (False, True):
+                elapsed, peak, size = measure(lambda: drain(encode_stream(export_pages(fetch, args.page_rows), export_format, compress)))
+                print({
+                    "rows": rows,
+                    "format": export_format + (".gz" if compress else ""),
+                    "rows_per_s": round(rows / elapsed),
+                    "peak_mb": round(peak / 2**20, 1),
+                    "mb": round(size / 2**20, 1),
+                })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Bulk import throughput (rows/second).
+
+First uploads generated catalog CSVs through ``/api/admin/bulk-import``
+against the in-memory Supabase stand-in, with each insert request costing a
+fixed round trip plus a small per-row cost, and compares per-row inserts
+(``IMPORT_BATCH_SIZE=1``, the old behaviour) with chunked inserts.
+
+Then sweeps the number of concurrent insert workers (``IMPORT_WORKERS``)
+through the import job pipeline against a stub backend. The stub blocks a
+database pool thread for ``--stub-rtt`` plus ``--stub-per-row`` per row,
+like a remote Postgres maintaining the search indexes, without the
+in-memory stand-in's CPU cost, which would otherwise dominate:
+
+    python -m tests.benchmarks.bench_import --rows 1000 10000 100000 --workers 1 2 4 8
+
+Per-row mode is only run up to ``--per-row-max`` rows; its rate is flat in
+the row count, so larger runs only take longer.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import time
+
+from tests.benchmarks.common import load_server
+from tests.fake_supabase import FakeSupabase
+
+HEADER = ["title", "original_title", "year", "country", "content_type", "synopsis", "rating",
+          "episodes", "duration", "genres", "streaming_platforms", "tags", "cast"]
+
+
+def catalog_csv(rows, bad_every=0):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for i in range(rows):
+        rating = 11 if bad_every and i % bad_every == bad_every - 1 else round(5 + i % 50 / 10, 1)
+        writer.writerow([
+            f"Imported Title {i}", f"원제 {i}", 1990 + i % 35, ["South Korea", "Japan", "Spain"][i % 3],
+            ["drama", "movie", "series"][i % 3], "A synopsis long enough to look like real data.", rating,
+            16 if i % 3 else "", 60, "Drama, Romance", "Netflix,Viki", "imported,bench",
+            '[{"name": "Actor %d", "character": "Lead"}]' % i,
+        ])
+    return buffer.getvalue().encode()
+
+
+def run(rows, batch_size, args):
+    import importer
+
+    fake = FakeSupabase(latency=lambda query: args.rtt + args.per_row * len(query.payload or []) if query.operation == "insert" else 0)
+    fake.tables["content"] = []
+    fake.checks["content"] = [("rating_range", lambda row: 0 <= row["rating"] <= 10)]
+    server = load_server(fake)
+    importer.IMPORT_BATCH_SIZE = batch_size
+    importer.IMPORT_WORKERS = 1
+
+    from fastapi.testclient import TestClient
+
+    client = TestClient(server.app)
+    data = catalog_csv(rows, args.bad_every)
+    start = time.perf_counter()
+    body = client.post("/api/admin/bulk-import", params={"wait": "true"}, files={"file": ("catalog.csv", data, "text/csv")}).json()
+    elapsed = time.perf_counter() - start
+    inserts = sum(1 for table, op in fake.queries if op == "insert")
+    return {
+        "rows": rows,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(rows / elapsed),
+        "insert_requests": inserts,
+        "failed": body["failed_imports"],
+    }
+
+
+def run_workers(path, rows, workers, args):
+    import importer
+    from db import run_sync
+    from import_jobs import ImportJobManager
+
+    importer.IMPORT_BATCH_SIZE = args.batch_size
+    importer.IMPORT_WORKERS = workers
+    requests = [0]
+
+    async def insert(batch):
+        requests[0] += 1
+        await run_sync(time.sleep, args.stub_rtt + args.stub_per_row * len(batch))
+        if any(row["rating"] > 10 for row in batch):
+            raise Exception('new row for relation "content" violates check constraint "rating_range"')
+        return batch
+
+    async def save(record):
+        pass
+
+    async def load(job_id):
+        return None
+
+    async def existing_ids(ids):
+        return set()
+
+    class Upload:
+        filename = "catalog.csv"
+
+        def __init__(self):
+            self.handle = open(path, "rb")
+
+        async def read(self, size=-1):
+            return self.handle.read(size)
+
+    async def scenario():
+        manager = ImportJobManager(insert, save, load, existing_ids)
+        upload = Upload()
+        start = time.perf_counter()
+        job = await manager.submit(upload)
+        await manager.wait(job)
+        upload.handle.close()
+        return job, time.perf_counter() - start
+
+    job, elapsed = asyncio.run(scenario())
+    return {
+        "rows": rows,
+        "workers": workers,
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(rows / elapsed),
+        "insert_requests": requests[0],
+        "failed": job.report.failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--stub-rtt", type=float, default=0.02, help="seconds per stub insert request")
+    parser.add_argument("--stub-per-row", type=float, default=0.0001, help="extra stub seconds per row")
+    parser.add_argument("--per-row-max", type=int, default=1000)
+    parser.add_argument("--rtt", type=float, default=0.005, help="seconds per insert request")
+    parser.add_argument("--per-row", type=float, default=0.00002, help="extra seconds per inserted row")
+    parser.add_argument("--bad-every", type=int, default=1000, help="make every Nth row fail in the database")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        if rows <= args.per_row_max:
+            print("per-row:", run(rows, 1, args))
+        print("batched:", run(rows, args.batch_size, args))
+
+    for rows in args.rows:
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(catalog_csv(rows, args.bad_every))
+        try:
+            for workers in args.workers:
+                print("workers:", run_workers(path, rows, workers, args))
+        finally:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
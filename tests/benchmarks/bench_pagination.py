@@ -0,0 +1,97 @@
+"""Offset vs keyset page fetches on a large synthetic table in a real project.
+
+Times ``/api/content``-style page queries at page 1 and at a deep page, once
+with ``range(offset, ...)`` and once with the cursor filter built by
+``pagination.keyset_page``. Needs a project with ``backend/supabase_schema.sql``
+applied (for the ``(created_at, id)`` index):
+
+    SUPABASE_URL=... SUPABASE_SERVICE_ROLE_KEY=... \\
+        python -m tests.benchmarks.bench_pagination --rows 110000 --deep-page 5000
+
+Synthetic rows carry the tag ``bench-pagination``. ``--cleanup`` deletes them.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from tests.benchmarks.common import summarize
+
+BENCH_TAG = "bench-pagination"
+
+
+def seed(client, rows, batch_size=1000):
+    existing = client.table("content").select("id", count="exact").contains("tags", [BENCH_TAG]).limit(1).execute().count
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(existing, rows):
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "title": f"Pagination {i}",
+            "synopsis": "",
+            "year": 2000 + i % 25,
+            "country": "South Korea",
+            "content_type": "drama",
+            "genres": ["drama"],
+            "rating": (i % 100) / 10,
+            "tags": [BENCH_TAG],
+            # Seconds apart, with every tenth timestamp repeated to exercise ties
+            "created_at": (start + timedelta(seconds=i - i % 10 // 9)).isoformat(),
+        })
+        if len(batch) == batch_size:
+            client.table("content").insert(batch).execute()
+            batch = []
+    if batch:
+        client.table("content").insert(batch).execute()
+
+
+def timed(build, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        build().execute()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=110_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--deep-page", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        sys.exit("Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY to a project with the schema applied")
+
+    from supabase import create_client
+
+    from pagination import encode_cursor, keyset_page
+
+    client = create_client(url, key)
+    if args.cleanup:
+        client.table("content").delete().contains("tags", [BENCH_TAG]).execute()
+        return
+    seed(client, args.rows)
+
+    def base():
+        return client.table("content").select("*").contains("tags", [BENCH_TAG])
+
+    limit, deep_offset = args.limit, (args.deep_page - 1) * args.limit
+    # Cursor for the deep page, built from the row just before it (untimed)
+    anchor = keyset_page(base(), "created_at", True, 0, deep_offset - 1).execute().data[0]
+    deep_cursor = {"k": "created_at", "d": True, "v": anchor["created_at"], "i": anchor["id"]}
+    print(f"{args.rows} rows, {limit} per page, deep page {args.deep_page} (cursor {encode_cursor(deep_cursor)[:24]}...)")
+
+    print("offset page 1:   ", timed(lambda: keyset_page(base(), "created_at", True, limit), args.repeats))
+    print("offset deep page:", timed(lambda: keyset_page(base(), "created_at", True, limit, deep_offset), args.repeats))
+    print("cursor deep page:", timed(lambda: keyset_page(base(), "created_at", True, limit, cursor=deep_cursor), args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Public catalog endpoints with and without the response cache.
+
+Sends bursts of ``--concurrency`` simultaneous anonymous requests, spread
+over a small set of hot keys (featured rails, a few titles and
+searches), against a stub backend that sleeps ``--rtt`` per query:
+
+    python -m tests.benchmarks.bench_response_cache --bursts 20 --concurrency 500
+
+Reports latency, upstream queries and the cache's hit ratio. ``--ttl 0``
+disables the cache, which is how every request behaved before.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from tests.benchmarks.common import load_server, summarize
+from tests.fake_supabase import FakeSupabase
+
+
+def build_fake(titles, rtt):
+    fake = FakeSupabase(latency=rtt)
+    fake.tables["content"] = [
+        {"id": f"c{i}", "title": f"Title {i}", "synopsis": "A synopsis", "country": ["Japan", "South Korea", "Spain"][i % 3],
+         "content_type": "movie", "genres": ["drama"], "rating": 5 + i % 50 / 10, "created_at": f"2024-01-{i % 28 + 1:02d}"}
+        for i in range(titles)
+    ]
+    return fake
+
+
+def hot_paths(titles):
+    paths = [
+        ("/api/content/featured", {"category": "trending"}),
+        ("/api/content/featured", {"category": "new_releases"}),
+        ("/api/content/featured", {"category": "by_country", "country": "Japan"}),
+        ("/api/content/search", {"content_type": "movie", "sort_by": "created_at"}),
+        ("/api/content/search", {"genre": "drama"}),
+        ("/api/content/search", {"country": "Spain", "sort_by": "year"}),
+    ]
+    paths += [(f"/api/content/c{i}", {}) for i in range(0, titles, max(1, titles // 10))]
+    paths += [(f"/api/recommendations/similar/c{i}", {}) for i in range(0, titles, max(1, titles // 5))]
+    return paths
+
+
+async def run(args):
+    from response_cache import ResponseCache
+
+    fake = build_fake(args.titles, args.rtt)
+    server = load_server(fake)
+    server.response_cache = ResponseCache(ttl=args.ttl)
+    paths = hot_paths(args.titles)
+    rng = random.Random(7)
+    samples = []
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def timed(path, params):
+            start = time.perf_counter()
+            response = await client.get(path, params=params)
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        for _ in range(args.bursts):
+            await asyncio.gather(*(timed(*rng.choice(paths)) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "ttl": args.ttl,
+        "requests": len(samples),
+        "requests_per_s": round(len(samples) / elapsed),
+        "upstream_queries": len(fake.queries),
+        "hit_ratio": round(server.response_cache.stats()["hit_ratio"], 4),
+        **summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--titles", type=int, default=200)
+    parser.add_argument("--rtt", type=float, default=0.01, help="seconds per stub query")
+    parser.add_argument("--ttl", type=float, nargs="+", default=[0, 60])
+    args = parser.parse_args()
+    for ttl in args.ttl:
+        print(asyncio.run(run(argparse.Namespace(**{**vars(args), "ttl": ttl}))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Catalog search on a 100k-row synthetic catalog in a real Supabase project.
+
+Compares the old double-wildcard ``ilike`` filter with the indexed
+full-text filter and the ``search_content_ranked`` RPC. Needs a project
+with ``backend/supabase_schema.sql`` applied:
+
+    SUPABASE_URL=... SUPABASE_SERVICE_ROLE_KEY=... \\
+        python -m tests.benchmarks.bench_search --rows 100000
+
+Synthetic rows carry the tag ``bench-search``. ``--cleanup`` deletes them.
+
+``--memory`` instead times the in-process index (``SEARCH_ENGINE=memory``)
+on rows with a Zipf-distributed vocabulary and needs no database.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+from tests.benchmarks.common import summarize
+
+BENCH_TAG = "bench-search"
+WORDS = ["love", "revenge", "family", "secret", "heist", "school", "war", "ghost", "island",
+         "doctor", "king", "city", "night", "summer", "detective", "dream", "river", "empire"]
+ORIGINAL_TITLES = ["사랑의 불시착", "기생충", "君の名は。", "千と千尋の神隠し", "La Casa de Papel", "Élite"]
+QUERIES = ["heist", "ghost island", "secret family", "detective night", "기생", "君の名", "Papel"]
+
+
+def synthetic_rows(count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        title = " ".join(rng.sample(WORDS, 3)).title()
+        yield {
+            "id": str(uuid.uuid4()),
+            "title": f"{title} {i}",
+            "original_title": f"{rng.choice(ORIGINAL_TITLES)} {i}",
+            "synopsis": " ".join(rng.choices(WORDS, k=30)),
+            "year": rng.randint(1990, 2024),
+            "country": rng.choice(["South Korea", "Japan", "Spain", "India"]),
+            "content_type": rng.choice(["movie", "series", "drama"]),
+            "genres": rng.sample(["drama", "thriller", "romance", "comedy"], 2),
+            "rating": round(rng.uniform(5, 9.5), 1),
+            "tags": [BENCH_TAG],
+        }
+
+
+def seed(client, rows, batch_size=1000):
+    existing = client.table("content").select("id", count="exact").contains("tags", [BENCH_TAG]).limit(1).execute().count
+    if existing >= rows:
+        return
+    batch = []
+    for row in synthetic_rows(rows - existing, seed=existing):
+        batch.append(row)
+        if len(batch) == batch_size:
+            client.table("content").insert(batch).execute()
+            batch = []
+    if batch:
+        client.table("content").insert(batch).execute()
+
+
+def time_queries(build, repeats):
+    samples = []
+    for _ in range(repeats):
+        for text in QUERIES:
+            start = time.perf_counter()
+            build(text).execute()
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def zipf_rows(count, vocabulary=20_000, seed=7):
+    """Rows whose words follow a Zipf distribution, like real titles and synopses."""
+    rng = random.Random(seed)
+    syllables = ["ka", "ra", "mo", "shi", "ne", "to", "lu", "vi", "an", "de", "jo", "sa", "ri", "hu"]
+    words = list(dict.fromkeys("".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(vocabulary * 2)))
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    for row in synthetic_rows(count, seed):
+        row["title"] = " ".join(rng.choices(words, weights, k=rng.randint(1, 4))).title()
+        row["synopsis"] = " ".join(rng.choices(words, weights, k=30))
+        yield row
+
+
+def bench_memory(rows, repeats):
+    from search_index import ContentIndex
+
+    catalog = list(zipf_rows(rows))
+    index = ContentIndex()
+    start = time.perf_counter()
+    index.rebuild(catalog)
+    print(f"{rows} synthetic rows indexed in {time.perf_counter() - start:.2f}s")
+
+    def timed(**params):
+        samples = []
+        for _ in range(repeats):
+            for text in QUERIES:
+                start = time.perf_counter()
+                index.search(text, **params)
+                samples.append(time.perf_counter() - start)
+        return summarize(samples)
+
+    samples = []
+    for n in range(repeats * len(QUERIES)):
+        # Typing a specific title, one keystroke at a time
+        title = catalog[n * 7919 % rows]["title"]
+        for end in range(3, len(title) + 1, 3):
+            start = time.perf_counter()
+            index.search(title[:end], sort_by="relevance")
+            samples.append(time.perf_counter() - start)
+    print("title as-you-type:    ", summarize(samples))
+    print("text, relevance:      ", timed(sort_by="relevance"))
+    print("text + filters:       ", timed(country="Spain", year_from=2010, rating_min=7))
+    samples = []
+    for _ in range(repeats * len(QUERIES)):
+        start = time.perf_counter()
+        index.search(None, country="Japan", genre="drama")
+        samples.append(time.perf_counter() - start)
+    print("filters only (browse):", summarize(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--cleanup", action="store_true")
+    parser.add_argument("--memory", action="store_true", help="time the in-process index instead")
+    args = parser.parse_args()
+
+    if args.memory:
+        bench_memory(args.rows, args.repeats)
+        return
+
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        sys.exit("Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY to a project with the schema applied")
+
+    from supabase import create_client
+
+    import server
+
+    client = create_client(url, key)
+    if args.cleanup:
+        client.table("content").delete().contains("tags", [BENCH_TAG]).execute()
+        return
+    seed(client, args.rows)
+
+    def legacy(text):
+        return client.table("content").select("*").or_(f"title.ilike.%{text}%,synopsis.ilike.%{text}%").order("rating", desc=True).range(0, 19)
+
+    def full_text(text):
+        return client.table("content").select("*").or_(server.content_search_filter(text)).order("rating", desc=True).range(0, 19)
+
+    def relevance(text):
+        return client.rpc("search_content_ranked", {"q": text}).range(0, 19)
+
+    print(f"{args.rows} synthetic rows, {len(QUERIES)} queries x {args.repeats}")
+    print("ilike %q%:      ", time_queries(legacy, args.repeats))
+    print("full-text:      ", time_queries(full_text, args.repeats))
+    print("relevance (rpc):", time_queries(relevance, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""API worker startup: import time and resident memory of ``import server``.
+
+Each sample is a fresh interpreter running ``python -X importtime -c
+"import server"``, so nothing is shared with earlier samples:
+
+    python -m tests.benchmarks.bench_startup --samples 5
+
+Reports the cumulative import time of ``server`` (median of the samples),
+peak RSS after the import, whether pandas/NumPy/pyarrow were loaded, and
+the slowest top-level imports. Exits non-zero when the median import time
+or the RSS is over ``--max-import-ms``/``--max-rss-mb``, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from tests.benchmarks.common import BACKEND_DIR
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow")
+PROBE = (
+    "import json, resource, sys; import server; "
+    "print(json.dumps({'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "
+    "'heavy': sorted(m for m in %r if m in sys.modules)}))" % (HEAVY_MODULES,)
+)
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def sample():
+    """One fresh interpreter: (server import µs, top-level imports, probe result)."""
+    env = dict(os.environ, SUPABASE_URL="http://localhost:54321", SUPABASE_ANON_KEY="bench-anon-key")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    total, top_level = None, {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), (len(match.group(3)) - 1) // 2, match.group(4)
+        if name == "server":
+            total = cumulative
+        elif depth == 1:
+            # Direct imports of server
+            top_level[name] = cumulative
+    return total, top_level, json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--max-import-ms", type=float, default=1500)
+    parser.add_argument("--max-rss-mb", type=float, default=100)
+    args = parser.parse_args()
+
+    results = [sample() for _ in range(args.samples)]
+    import_ms = statistics.median(total for total, _, _ in results) / 1000
+    rss_mb = max(probe["rss_mb"] for _, _, probe in results)
+    heavy = results[-1][2]["heavy"]
+    slowest = sorted(results[-1][1].items(), key=lambda item: -item[1])[: args.top]
+    print({
+        "samples": args.samples,
+        "server_import_ms": round(import_ms, 1),
+        "rss_mb": round(rss_mb, 1),
+        "heavy_modules_loaded": heavy,
+    })
+    for name, micros in slowest:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if import_ms > args.max_import_ms:
+        failures.append(f"import {import_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"RSS {rss_mb:.0f} MB > {args.max_rss_mb:.0f} MB")
+    if failures:
+        print("REGRESSION: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Trending engine at 1M events/hour.
+
+Replays ``--events`` events spread evenly over one simulated hour (views,
+watchlist adds and reviews, Zipf-distributed over ``--titles`` titles) into
+a ``TrendingEngine``. Every ``--query-every`` events it serves a top-20 for
+each period:
+
+    python -m tests.benchmarks.bench_trending --events 1000000 --titles 20000
+
+Reports ingest rate, ``top()`` latency, engine memory and the checkpoint
+cost. ``full sort`` ranks every title by decayed score on each query, the
+obvious alternative to the maintained heap, for comparison.
+"""
+import argparse
+import heapq
+import math
+import random
+import time
+import tracemalloc
+
+from tests.benchmarks.common import BACKEND_DIR, summarize  # noqa: F401  (puts backend/ on sys.path)
+
+KINDS = ["view"] * 8 + ["watchlist", "review"]
+
+
+def make_events(count, titles, seconds, seed=11):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(titles)]
+    ids = rng.choices(range(titles), weights=weights, k=count)
+    start = time.time() - seconds
+    step = seconds / count
+    return [(f"c{ids[i]}", KINDS[i % len(KINDS)], start + i * step) for i in range(count)]
+
+
+def full_sort_top(engine, period_name, limit, now):
+    period = engine.periods[period_name]
+    decay = math.exp(-(now - period.landmark) / period.tau)
+    ordinals = heapq.nlargest(limit, range(len(period.scores)), key=period.scores.__getitem__)
+    return [(engine.ids[ordinal], period.scores[ordinal] * decay) for ordinal in ordinals]
+
+
+def main():
+    from trending import TrendingEngine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--titles", type=int, default=20_000)
+    parser.add_argument("--seconds", type=float, default=3600, help="simulated time the events span")
+    parser.add_argument("--query-every", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    events = make_events(args.events, args.titles, args.seconds)
+    tracemalloc.start()
+    engine = TrendingEngine()
+    top_samples, sort_samples, ingest = [], [], 0.0
+    for start in range(0, len(events), args.query_every):
+        batch = events[start:start + args.query_every]
+        began = time.perf_counter()
+        for content_id, kind, at in batch:
+            engine.record(content_id, kind, at)
+        ingest += time.perf_counter() - began
+        now = batch[-1][2]
+        for period in engine.periods:
+            began = time.perf_counter()
+            heap_top = engine.top(period, args.limit, now)
+            top_samples.append(time.perf_counter() - began)
+            if start % (args.query_every * 50) == 0:
+                began = time.perf_counter()
+                sorted_top = full_sort_top(engine, period, args.limit, now)
+                sort_samples.append(time.perf_counter() - began)
+                assert [item[0] for item in heap_top] == [item[0] for item in sorted_top]
+    engine_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    began = time.perf_counter()
+    rows = engine.take_pending()
+    take_ms = (time.perf_counter() - began) * 1000
+    began = time.perf_counter()
+    engine.load(rows)
+    load_ms = (time.perf_counter() - began) * 1000
+
+    print({
+        "events": args.events,
+        "titles_scored": len(engine.ids),
+        "ingest_events_per_s": round(args.events / ingest),
+        "headroom_vs_1M_per_hour": round(args.events / ingest / (1_000_000 / 3600)),
+        "engine_mb": round(engine_bytes / 2**20, 2),
+    })
+    print({"query": "heap top-%d" % args.limit, **summarize(top_samples)})
+    print({"query": "full sort top-%d" % args.limit, **summarize(sort_samples)})
+    print({"checkpoint_rows": len(rows), "take_pending_ms": round(take_ms, 1), "load_ms": round(load_ms, 1)})
+
+
+if __name__ == "__main__":
+    main()
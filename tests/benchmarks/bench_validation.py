@@ -0,0 +1,103 @@
+"""Bulk-import validation: per-row ``iterrows`` loop vs ``normalize_frame``.
+
+Times converting one spreadsheet chunk into ``content`` rows, no database
+involved:
+
+    python -m tests.benchmarks.bench_validation --rows 2000 20000 100000
+
+``legacy_rows`` is the loop the importer used before validation was
+vectorized, kept here as the baseline.
+"""
+import argparse
+import json
+import time
+import uuid
+
+import pandas as pd
+
+from tests.benchmarks.common import BACKEND_DIR  # noqa: F401  (puts backend/ on sys.path)
+from tests.benchmarks.bench_import import HEADER, catalog_csv
+
+REQUIRED_FIELDS = ["title", "year", "country", "content_type", "synopsis", "rating"]
+
+
+def legacy_row(row):
+    for field in REQUIRED_FIELDS:
+        if pd.isna(row.get(field)):
+            raise ValueError(f"Missing required field: {field}")
+
+    return {
+        "id": str(uuid.uuid4()),
+        "title": str(row['title']),
+        "original_title": str(row.get('original_title', '')) if pd.notna(row.get('original_title')) else None,
+        "synopsis": str(row['synopsis']),
+        "year": int(row['year']),
+        "country": str(row['country']),
+        "content_type": str(row['content_type']),
+        "rating": float(row['rating']),
+        "poster_url": str(row.get('poster_url', '')) if pd.notna(row.get('poster_url')) else None,
+        "banner_url": str(row.get('banner_url', '')) if pd.notna(row.get('banner_url')) else None,
+        "episodes": int(row['episodes']) if pd.notna(row.get('episodes')) else None,
+        "duration": int(row['duration']) if pd.notna(row.get('duration')) else None,
+        "genres": str(row.get('genres', '')).split(',') if pd.notna(row.get('genres')) else [],
+        "streaming_platforms": str(row.get('streaming_platforms', '')).split(',') if pd.notna(row.get('streaming_platforms')) else [],
+        "tags": str(row.get('tags', '')).split(',') if pd.notna(row.get('tags')) else [],
+        "cast": json.loads(row['cast']) if pd.notna(row.get('cast')) and str(row['cast']).startswith('[') else [],
+        "crew": json.loads(row['crew']) if pd.notna(row.get('crew')) and str(row['crew']).startswith('[') else []
+    }
+
+
+def legacy_rows(frame):
+    rows, errors = [], []
+    for index, row in frame.iterrows():
+        try:
+            rows.append(legacy_row(row))
+        except Exception as e:
+            errors.append((index + 1, str(e)))
+    return rows, errors
+
+
+def vectorized_rows(frame):
+    from importer import clean_records, normalize_frame
+
+    clean, errors = normalize_frame(frame)
+    return clean_records(clean), errors
+
+
+def best_of(fn, frame, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows, _ = fn(frame)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(rows)
+
+
+def main():
+    import io
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[2000, 20_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--missing-every", type=int, default=500, help="blank the title of every Nth row")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        frame = pd.read_csv(io.BytesIO(catalog_csv(rows)), usecols=HEADER)
+        if args.missing_every:
+            frame.loc[frame.index % args.missing_every == 0, "title"] = None
+        legacy, legacy_count = best_of(legacy_rows, frame, args.repeat)
+        vectorized, vectorized_count = best_of(vectorized_rows, frame, args.repeat)
+        assert legacy_count == vectorized_count
+        print({
+            "rows": rows,
+            "iterrows_ms": round(legacy * 1000, 1),
+            "vectorized_ms": round(vectorized * 1000, 1),
+            "iterrows_rows_per_s": round(rows / legacy),
+            "vectorized_rows_per_s": round(rows / vectorized),
+            "speedup": round(legacy / vectorized, 1),
+        })
+
+
+if __name__ == "__main__":
+    main()
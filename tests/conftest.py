@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-anon-key")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from tests.fake_supabase import FakeSupabase  # noqa: E402
+from facets import FacetCatalog  # noqa: E402
+from featured import FeaturedRails  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from totals import TotalsCache  # noqa: E402
+from trending import TrendingEngine  # noqa: E402
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeSupabase()
+    fake.tables["content"] = []
+    monkeypatch.setattr(server, "supabase", fake)
+    # Totals cached by one test must not leak into the next
+    monkeypatch.setattr(server, "totals_cache", TotalsCache())
+    monkeypatch.setattr(server, "response_cache", ResponseCache())
+    monkeypatch.setattr(server, "facet_catalog", FacetCatalog())
+    monkeypatch.setattr(server, "featured_rails", FeaturedRails())
+    monkeypatch.setattr(server, "trending_engine", TrendingEngine())
+    monkeypatch.setattr(server, "trending_rows", {})
+    monkeypatch.setattr(server, "import_jobs", server.create_import_jobs())
+    return fake
+
+
+@pytest.fixture
+def client(fake_db):
+    # Not used as a context manager, so startup and shutdown hooks do not run
+    return TestClient(server.app)
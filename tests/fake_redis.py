@@ -0,0 +1,85 @@
+"""In-memory stand-in for the ``redis.asyncio`` client calls the app makes."""
+import asyncio
+import fnmatch
+import time
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+        self.subscriptions = set()
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        return entry
+
+    async def get(self, key):
+        self.calls.append(("get", key))
+        entry = self._live(key)
+        return None if entry is None else entry[0]
+
+    async def mget(self, *keys):
+        self.calls.append(("mget",) + keys)
+        return [None if entry is None else entry[0] for entry in map(self._live, keys)]
+
+    async def incr(self, key):
+        self.calls.append(("incr", key))
+        entry = self._live(key)
+        value = int(entry[0]) + 1 if entry is not None else 1
+        self.data[key] = (str(value).encode(), entry[1] if entry is not None else None)
+        return value
+
+    async def set(self, key, value, ex=None):
+        self.calls.append(("set", key))
+        self.data[key] = (value.encode() if isinstance(value, str) else value, time.time() + ex if ex else None)
+        return True
+
+    async def delete(self, *keys):
+        self.calls.append(("delete",) + keys)
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def scan_iter(self, match="*"):
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match) and self._live(key) is not None:
+                yield key
+
+    async def publish(self, channel, message):
+        self.calls.append(("publish", channel))
+        data = message.encode() if isinstance(message, str) else message
+        receivers = [pubsub for pubsub in self.subscriptions if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub.queue.put_nowait({"type": "message", "channel": channel.encode(), "data": data})
+        return len(receivers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def disconnect(self):
+        """Drop every subscriber's connection, as a server restart would."""
+        for pubsub in list(self.subscriptions):
+            pubsub.queue.put_nowait(ConnectionError("connection lost"))
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.channels = set()
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        self.channels.update(channels)
+        self.redis.subscriptions.add(self)
+
+    async def listen(self):
+        while True:
+            message = await self.queue.get()
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+    async def aclose(self):
+        self.redis.subscriptions.discard(self)
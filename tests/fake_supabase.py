@@ -0,0 +1,534 @@
+"""In-memory stand-in for the supabase-py client.
+
+Implements the slice of the PostgREST query builder API that ``server.py``
+uses, backed by plain lists of dicts. Every ``execute()`` is recorded in
+``FakeSupabase.queries`` and can be slowed down with a blocking ``time.sleep``
+to mimic a network round trip, which is what the load benchmarks rely on.
+"""
+import copy
+import re
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+# (table, column) -> referenced table, for embedded selects like
+# ``content:content_id (title, poster_url)``
+FOREIGN_KEYS = {
+    ("watchlist", "content_id"): "content",
+    ("watchlist", "user_id"): "profiles",
+    ("reviews", "content_id"): "content",
+    ("reviews", "user_id"): "profiles",
+}
+
+_EMBED_RE = re.compile(r"(\w+)\s*:\s*(\w+)\s*\(([^()]*)\)")
+
+
+def _coerce(value, sample):
+    """Convert a filter string from ``or_()`` to the type stored in the row."""
+    if isinstance(value, str) and isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        try:
+            return type(sample)(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _ilike(pattern, value):
+    """ILIKE with ``\\`` escapes, after PostgREST's ``*`` -> ``%``."""
+    if value is None:
+        return False
+    regex = ""
+    for escaped, char in re.findall(r"(\\)?(.)", str(pattern).replace("*", "%"), re.DOTALL):
+        if escaped or char not in "%_":
+            regex += re.escape(char)
+        else:
+            regex += ".*" if char == "%" else "."
+    return re.match(regex + "$", str(value), re.IGNORECASE | re.DOTALL) is not None
+
+
+def _compare(op, left, right):
+    if op == "eq":
+        return left == right
+    if op == "neq":
+        return left != right
+    if op == "is":
+        return left is None if str(right).lower() == "null" else left is (str(right).lower() == "true")
+    if left is None:
+        return False
+    if op == "gt":
+        return left > right
+    if op == "gte":
+        return left >= right
+    if op == "lt":
+        return left < right
+    if op == "lte":
+        return left <= right
+    if op == "ilike":
+        return _ilike(right, left)
+    if op == "like":
+        return _ilike(right, left)
+    if op == "in":
+        return left in right
+    if op == "cs":
+        return left is not None and all(item in left for item in right)
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def _search_text(row):
+    parts = [row.get("title"), row.get("original_title"), row.get("synopsis")] + list(row.get("tags") or [])
+    return " ".join(str(p) for p in parts if p).lower()
+
+
+def _text_match(row, query):
+    """Rough stand-in for ``search_vector @@ websearch_to_tsquery(...)``."""
+    haystack = _search_text(row)
+    # An empty tsquery (only punctuation) matches nothing
+    terms = re.findall(r"\w+", query.lower())
+    return bool(terms) and all(term in haystack for term in terms)
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def _split_top_level(expr):
+    parts, depth, current, quoted = [], 0, "", False
+    for char in expr:
+        if char == '"':
+            quoted = not quoted
+        elif char == "(" and not quoted:
+            depth += 1
+        elif char == ")" and not quoted:
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _parse_logic(expr):
+    """Parse a PostgREST ``or=(...)`` filter string into a predicate."""
+    predicates = []
+    for part in _split_top_level(expr):
+        part = part.strip()
+        if part.startswith("and(") and part.endswith(")"):
+            inner = _parse_logic(part[4:-1])
+            predicates.append(lambda row, inner=inner: all(p(row) for p in inner))
+            continue
+        if part.startswith("or(") and part.endswith(")"):
+            inner = _parse_logic(part[3:-1])
+            predicates.append(lambda row, inner=inner: any(p(row) for p in inner))
+            continue
+        column, rest = part.split(".", 1)
+        if rest.startswith(("wfts", "plfts", "phfts", "fts")):
+            # e.g. search_vector.wfts(simple)."query"
+            value = _unquote(rest.split(").", 1)[1] if ")." in rest else rest.split(".", 1)[1])
+            predicates.append(lambda row, v=value: _text_match(row, v))
+            continue
+        op, value = rest.split(".", 1)
+        value = _unquote(value)
+        if op == "in":
+            value = [v.strip().strip('"') for v in value.strip("()").split(",")]
+        predicates.append(
+            lambda row, c=column, o=op, v=value: _compare(o, row.get(c), _coerce(v, row.get(c)))
+        )
+    return predicates
+
+
+def _parse_select(columns):
+    embeds = [(alias, fk, [c.strip() for c in cols.split(",") if c.strip()])
+              for alias, fk, cols in _EMBED_RE.findall(columns)]
+    plain = _EMBED_RE.sub("", columns)
+    plain = [c.strip() for c in plain.split(",") if c.strip()]
+    return plain, embeds
+
+
+def _project(row, columns):
+    if not columns or "*" in columns:
+        return dict(row)
+    return {c: row.get(c) for c in columns}
+
+
+class FakeResponse(SimpleNamespace):
+    pass
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table_name = table
+        self.operation = "select"
+        self.columns = "*"
+        self.count_mode = None
+        self.head = False
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.offset = None
+        self.row_limit = None
+        self.upsert_conflict = None
+        self.ignore_duplicates = False
+        self._negate_next = False
+        self.id_filter = None
+        # Rows of a set-returning function called through rpc()
+        self.source = None
+
+    # Operations
+    def select(self, *columns, count=None, head=None):
+        self.operation = "select"
+        self.columns = ",".join(columns) if columns else "*"
+        self.count_mode = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.operation = "insert"
+        self.payload = rows
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False, **kwargs):
+        self.operation = "upsert"
+        self.payload = rows
+        self.upsert_conflict = on_conflict or "id"
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data, **kwargs):
+        self.operation = "update"
+        self.payload = data
+        return self
+
+    def delete(self, **kwargs):
+        self.operation = "delete"
+        return self
+
+    # Filters
+    def _filter(self, predicate):
+        if self._negate_next:
+            self._negate_next = False
+            self.filters.append(lambda row: not predicate(row))
+        else:
+            self.filters.append(predicate)
+        return self
+
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def eq(self, column, value):
+        if column == "id" and not self._negate_next and self.id_filter is None:
+            self.id_filter = value
+        return self._filter(lambda row: _compare("eq", row.get(column), value))
+
+    def neq(self, column, value):
+        return self._filter(lambda row: _compare("neq", row.get(column), value))
+
+    def gt(self, column, value):
+        return self._filter(lambda row: _compare("gt", row.get(column), value))
+
+    def gte(self, column, value):
+        return self._filter(lambda row: _compare("gte", row.get(column), value))
+
+    def lt(self, column, value):
+        return self._filter(lambda row: _compare("lt", row.get(column), value))
+
+    def lte(self, column, value):
+        return self._filter(lambda row: _compare("lte", row.get(column), value))
+
+    def is_(self, column, value):
+        return self._filter(lambda row: _compare("is", row.get(column), value))
+
+    def ilike(self, column, pattern):
+        return self._filter(lambda row: _compare("ilike", row.get(column), pattern))
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(lambda row: _compare("in", row.get(column), values))
+
+    def contains(self, column, values):
+        return self._filter(lambda row: _compare("cs", row.get(column), values))
+
+    def or_(self, expr, **kwargs):
+        predicates = _parse_logic(expr)
+        return self._filter(lambda row: any(p(row) for p in predicates))
+
+    def text_search(self, column, query, options=None):
+        return self._filter(lambda row: _text_match(row, query))
+
+    # Modifiers
+    def order(self, column, desc=False, nullsfirst=None, **kwargs):
+        self.orders.append((column, desc, nullsfirst))
+        return self
+
+    def range(self, start, end):
+        self.offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def limit(self, size, **kwargs):
+        self.row_limit = size
+        return self
+
+    # Execution
+    def _matching(self, rows):
+        if self.id_filter is not None and self.source is None:
+            row = self.client._by_id(self.table_name).get(self.id_filter)
+            rows = [row] if row is not None else []
+        return [row for row in rows if all(f(row) for f in self.filters)]
+
+    def _sorted(self, rows):
+        for column, desc, nullsfirst in reversed(self.orders):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=desc)
+            # PostgREST puts NULLs first for DESC and last for ASC by default
+            if nullsfirst is None:
+                nullsfirst = desc
+            rows = missing + present if nullsfirst else present + missing
+        return rows
+
+    def _embed(self, source, row, embeds):
+        for alias, fk, cols in embeds:
+            target = FOREIGN_KEYS.get((self.table_name, fk))
+            match = self.client._by_id(target).get(source.get(fk)) if target else None
+            row[alias] = _project(match, cols) if match is not None else None
+        return row
+
+    def execute(self):
+        self.client._record(self)
+        with self.client.lock:
+            if self.operation != "select":
+                self.client._indexes.clear()
+            return self._execute()
+
+    def _execute(self):
+        if self.source is not None:
+            table = self.source()
+        else:
+            table = self.client.tables.setdefault(self.table_name, [])
+        if self.operation == "insert":
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            inserted = [self.client._prepare_row(self.table_name, row) for row in rows]
+            self.client._check_constraints(self.table_name, inserted)
+            self.client._check_unique(self.table_name, inserted)
+            table.extend(inserted)
+            return FakeResponse(data=copy.deepcopy(inserted), count=None)
+        if self.operation == "upsert":
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            keys = [k.strip() for k in self.upsert_conflict.split(",")]
+            written = []
+            for row in rows:
+                existing = next((r for r in table if all(r.get(k) == row.get(k) for k in keys)), None)
+                if existing is not None and self.ignore_duplicates:
+                    # ON CONFLICT DO NOTHING; only new rows are returned
+                    continue
+                if existing is not None:
+                    existing.update(row)
+                    self.client._generate(self.table_name, existing)
+                    written.append(existing)
+                else:
+                    new_row = self.client._prepare_row(self.table_name, row)
+                    table.append(new_row)
+                    written.append(new_row)
+            return FakeResponse(data=copy.deepcopy(written), count=None)
+        matching = self._matching(table)
+        if self.operation == "update":
+            for row in matching:
+                row.update(copy.deepcopy(self.payload))
+                self.client._generate(self.table_name, row)
+            return FakeResponse(data=copy.deepcopy(matching), count=None)
+        if self.operation == "delete":
+            self.client.tables[self.table_name] = [r for r in table if r not in matching]
+            return FakeResponse(data=copy.deepcopy(matching), count=None)
+
+        count = len(matching) if self.count_mode else None
+        if self.head:
+            return FakeResponse(data=[], count=count)
+        rows = self._sorted(matching) if self.orders else matching
+        start = self.offset or 0
+        if self.row_limit is not None:
+            rows = rows[start:start + self.row_limit]
+        else:
+            rows = rows[start:]
+        plain, embeds = _parse_select(self.columns)
+        data = [self._embed(row, _project(row, plain), embeds) for row in rows]
+        return FakeResponse(data=copy.deepcopy(data), count=count)
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.table_name = f"rpc:{name}"
+        self.operation = "rpc"
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        self.client._record(self)
+        with self.client.lock:
+            data = self.client.functions[self.name](self.client, **self.params)
+        return FakeResponse(data=copy.deepcopy(data), count=None)
+
+
+class FakeAuth:
+    def __init__(self, client):
+        self.client = client
+        self.users = {}
+        self.admin = FakeAuthAdmin(client)
+
+    def add_user(self, token, user_id=None, email="user@example.com", metadata=None):
+        user = SimpleNamespace(
+            id=user_id or str(uuid.uuid4()),
+            email=email,
+            user_metadata=metadata or {},
+        )
+        self.users[token] = user
+        return user
+
+    def get_user(self, token):
+        self.client._record(SimpleNamespace(table_name="auth", operation="get_user"))
+        return SimpleNamespace(user=self.users.get(token))
+
+
+class FakeAuthAdmin:
+    def __init__(self, client):
+        self.client = client
+        self.signed_out = []
+
+    def sign_out(self, jwt, scope="global"):
+        self.client._record(SimpleNamespace(table_name="auth", operation="sign_out"))
+        self.signed_out.append((jwt, scope))
+
+
+def _watchlist_status_counts(client, p_user_id):
+    counts = {}
+    for row in client.tables.get("watchlist", []):
+        if row.get("user_id") == p_user_id:
+            counts[row.get("status")] = counts.get(row.get("status"), 0) + 1
+    return [{"status": status, "count": count} for status, count in counts.items()]
+
+
+def _search_content_ranked(client, q):
+    terms = re.findall(r"\w+", q.lower())
+    needle = q.lower()
+
+    def rank(row):
+        title = f"{row.get('title') or ''} {row.get('original_title') or ''}".lower()
+        text = _search_text(row)
+        return sum(3 * title.count(t) + text.count(t) for t in terms)
+
+    matches = [
+        row for row in client.tables.get("content", [])
+        if _text_match(row, q)
+        or needle in (row.get("title") or "").lower()
+        or needle in (row.get("original_title") or "").lower()
+    ]
+    return sorted(matches, key=lambda row: (-rank(row), -(row.get("rating") or 0), str(row.get("id"))))
+
+
+_search_content_ranked.setof = True
+
+def _content_fingerprint(row):
+    from importer import content_fingerprint
+
+    return content_fingerprint(row)
+
+
+# Python versions of the SQL functions in backend/supabase_schema.sql;
+# ``setof`` functions return rows that can be filtered and ranged like a table
+DEFAULT_FUNCTIONS = {
+    "watchlist_status_counts": _watchlist_status_counts,
+    "search_content_ranked": _search_content_ranked,
+}
+
+
+class FakeSupabase:
+    """Drop-in replacement for ``supabase.Client`` in tests and benchmarks."""
+
+    def __init__(self, latency=0.0):
+        self.tables = {}
+        self.functions = dict(DEFAULT_FUNCTIONS)
+        self._indexes = {}
+        self.queries = []
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.auth = FakeAuth(self)
+        self._next_id = 1
+        self.unique = {
+            "watchlist": [("user_id", "content_id")],
+            "reviews": [("user_id", "content_id")],
+        }
+        # table -> [(constraint name, predicate every inserted row must pass)]
+        self.checks = {}
+        # table -> {column: function of the row}, like GENERATED ALWAYS columns
+        self.generated = {"content": {"fingerprint": _content_fingerprint}}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def _by_id(self, table):
+        index = self._indexes.get(table)
+        rows = self.tables.get(table, [])
+        # Tests also replace or extend table lists directly
+        if index is None or index[0] is not rows or index[1] != len(rows):
+            index = (rows, len(rows), {row.get("id"): row for row in rows})
+            self._indexes[table] = index
+        return index[2]
+
+    def rpc(self, name, params=None, count=None, **kwargs):
+        function = self.functions[name]
+        if getattr(function, "setof", False):
+            query = FakeQuery(self, f"rpc:{name}")
+            query.operation = "select"
+            query.count_mode = count
+            query.source = lambda: copy.deepcopy(function(self, **(params or {})))
+            return query
+        return FakeRpc(self, name, params)
+
+    def _record(self, query):
+        self.queries.append((query.table_name, query.operation))
+        delay = self.latency(query) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+
+    def _prepare_row(self, table, row):
+        row = copy.deepcopy(row)
+        now = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+        if "id" not in row:
+            with self.lock:
+                row["id"] = self._next_id if table in ("watchlist", "reviews") else str(uuid.uuid4())
+                self._next_id += 1
+        row.setdefault("created_at", now)
+        row.setdefault("updated_at", now)
+        return self._generate(table, row)
+
+    def _generate(self, table, row):
+        for column, function in self.generated.get(table, {}).items():
+            row[column] = function(row)
+        return row
+
+    def _check_constraints(self, table, rows):
+        for name, predicate in self.checks.get(table, []):
+            for row in rows:
+                if not predicate(row):
+                    raise Exception(f'new row for relation "{table}" violates check constraint "{name}"')
+
+    def _check_unique(self, table, rows):
+        for columns in self.unique.get(table, []):
+            seen = {tuple(r.get(c) for c in columns) for r in self.tables.get(table, [])}
+            for row in rows:
+                key = tuple(row.get(c) for c in columns)
+                if key in seen:
+                    raise Exception(f"duplicate key value violates unique constraint on {table}")
+                seen.add(key)
+
+    def reset_queries(self):
+        self.queries.clear()
@@ -0,0 +1,20 @@
+def test_dashboard_genres_come_from_one_joined_query(client, fake_db):
+    fake_db.auth.add_user("token-u1", user_id="u1")
+    fake_db.tables["content"] = [
+        {"id": "c1", "genres": ["drama", "thriller"]},
+        {"id": "c2", "genres": ["thriller"]},
+        {"id": "c3", "genres": None},
+    ]
+    fake_db.tables["watchlist"] = [
+        {"id": 1, "user_id": "u1", "content_id": "c1", "status": "completed"},
+        {"id": 2, "user_id": "u1", "content_id": "c2", "status": "watching"},
+        {"id": 3, "user_id": "u1", "content_id": "c3", "status": "dropped"},
+        {"id": 4, "user_id": "u2", "content_id": "c1", "status": "completed"},
+    ]
+    response = client.get("/api/analytics/dashboard", headers={"Authorization": "Bearer token-u1"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_content_watched"] == 2
+    assert body["completion_rate"] == 33.3
+    assert body["favorite_genres"] == [{"genre": "thriller", "count": 2}, {"genre": "drama", "count": 1}]
+    assert response.headers["X-Query-Count"] == "1"
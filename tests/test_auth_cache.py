@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+
+import server
+from auth_cache import AuthUser, SharedRevocations, TokenCache, TokenVerifier, hash_token
+from tests.fake_redis import FakeRedis
+
+SECRET = "test-jwt-secret-with-enough-bytes-for-hs256"
+
+
+def make_token(sub="user-1", exp_in=3600, secret=SECRET, **claims):
+    payload = {"sub": sub, "aud": "authenticated", "exp": int(time.time()) + exp_in,
+               "email": "user@example.com", "user_metadata": {"username": "user1"}}
+    payload.update(claims)
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+@pytest.fixture
+def local_auth(monkeypatch):
+    monkeypatch.setattr(server, "token_cache", TokenCache(max_size=3, ttl=60))
+    monkeypatch.setattr(server, "token_verifier", TokenVerifier(None, SECRET))
+    return server.token_cache
+
+
+def test_cache_is_bounded_lru():
+    cache = TokenCache(max_size=2, ttl=60)
+    for token in ("a", "b", "c"):
+        cache.put(token, AuthUser(id=token))
+    assert cache.get("a") is None
+    assert cache.get("c").id == "c"
+    assert cache.stats()["size"] == 2
+
+
+def test_cache_entry_expires_with_token():
+    cache = TokenCache(ttl=60)
+    cache.put("t", AuthUser(id="u"), token_exp=time.time() - 1)
+    assert cache.get("t") is None
+    assert cache.misses == 1
+
+
+def test_local_verification_skips_gotrue(client, fake_db, local_auth):
+    token = make_token()
+    for _ in range(3):
+        response = client.get("/api/premium/check", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+    assert ("auth", "get_user") not in fake_db.queries
+    assert local_auth.stats()["hits"] == 2
+    assert local_auth.stats()["misses"] == 1
+
+
+@pytest.mark.parametrize("token", [
+    make_token(exp_in=-10),
+    make_token(secret="another-secret-that-is-also-long-enough"),
+    make_token(aud="anon"),
+])
+def test_invalid_tokens_are_rejected(client, local_auth, token):
+    response = client.get("/api/premium/check", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_logout_revokes_token(client, fake_db, local_auth):
+    token = make_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/premium/check", headers=headers).status_code == 200
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+    assert client.get("/api/premium/check", headers=headers).status_code == 401
+    assert fake_db.auth.admin.signed_out == [(token, "local")]
+
+
+def test_logout_reaches_every_worker():
+    redis = FakeRedis()
+    token = make_token()
+
+    async def scenario():
+        first, second = TokenCache(), TokenCache()
+        first_revocations, second_revocations = SharedRevocations(redis, first), SharedRevocations(redis, second)
+        second_revocations.start()
+        await asyncio.sleep(0)
+        second.put(token, AuthUser(id="user-1"))
+
+        await first_revocations.revoke(hash_token(token), first.revoke(token))
+        await asyncio.sleep(0)
+        await second_revocations.stop()
+        # Dropped from the other worker's cache and denylisted there...
+        assert second.get(token) is None and second.is_revoked(token)
+        # ...and refused by a worker that missed the message
+        return await SharedRevocations(redis, TokenCache()).is_revoked(hash_token(token))
+
+    assert asyncio.run(scenario())
+
+
+def test_tokens_logged_out_elsewhere_are_refused(client, local_auth, monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(server, "shared_revocations", SharedRevocations(redis, local_auth))
+    token = make_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+    assert ("set", "auth-revoked:" + hash_token(token)) in redis.calls
+
+    # This worker never saw the token
+    monkeypatch.setattr(server, "token_cache", TokenCache())
+    assert client.get("/api/premium/check", headers=headers).status_code == 401
+
+
+def test_opaque_tokens_fall_back_to_gotrue(client, fake_db, local_auth):
+    fake_db.auth.add_user("opaque-token", user_id="user-2")
+    headers = {"Authorization": "Bearer opaque-token"}
+    assert client.get("/api/premium/check", headers=headers).status_code == 200
+    assert client.get("/api/premium/check", headers=headers).status_code == 200
+    assert fake_db.queries.count(("auth", "get_user")) == 1
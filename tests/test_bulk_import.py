@@ -0,0 +1,232 @@
+import asyncio
+import csv
+import io
+
+import pytest
+
+import importer
+from importer import BatchInserter, ImportReport
+
+HEADER = ["title", "year", "country", "content_type", "synopsis", "rating", "genres"]
+
+
+def make_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def catalog_rows(count):
+    return [[f"Title {i}", 2000 + i % 20, "Japan", "movie", "Synopsis", 7.5, "Drama,Comedy"] for i in range(count)]
+
+
+def upload(client, data, name="catalog.csv"):
+    return client.post("/api/admin/bulk-import", params={"wait": "true"}, files={"file": (name, data, "text/csv")})
+
+
+def test_rows_are_inserted_in_chunks(client, fake_db, monkeypatch):
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 100)
+    response = upload(client, make_csv(catalog_rows(250)))
+    body = response.json()
+    assert body["successful_imports"] == 250
+    assert body["failed_imports"] == 0
+    assert len(fake_db.tables["content"]) == 250
+    assert [q for q in fake_db.queries if q == ("content", "insert")] == [("content", "insert")] * 3
+    assert fake_db.tables["content"][0]["genres"] == ["Drama", "Comedy"]
+
+
+def test_bad_rows_are_isolated_and_reported_by_row_number(client, fake_db):
+    fake_db.checks["content"] = [("rating_range", lambda row: 0 <= row["rating"] <= 10)]
+    rows = catalog_rows(40)
+    rows[6][5] = 42
+    rows[31][5] = 11
+    rows[20][0] = ""  # caught by validation before any insert
+    body = upload(client, make_csv(rows)).json()
+    assert body["successful_imports"] == 37
+    assert body["failed_imports"] == 3
+    assert body["errors"][0] == "Row 21: Missing required field: title"
+    assert sorted(body["errors"][1:]) == [
+        'Row 32: new row for relation "content" violates check constraint "rating_range"',
+        'Row 7: new row for relation "content" violates check constraint "rating_range"',
+    ]
+    titles = {row["title"] for row in fake_db.tables["content"]}
+    assert "Title 6" not in titles and "Title 31" not in titles and "Title 30" in titles
+
+
+def test_bisect_cost_is_logarithmic():
+    report = ImportReport()
+    attempts = []
+
+    async def insert(rows):
+        attempts.append(len(rows))
+        if any(row["title"] == "bad" for row in rows):
+            raise ValueError("rejected")
+        return rows
+
+    async def run():
+        inserter = BatchInserter(insert, report, batch_size=64)
+        for i in range(64):
+            await inserter.add(i + 1, {"id": str(i), "title": "bad" if i == 37 else f"t{i}"})
+        await inserter.flush()
+        return inserter
+
+    inserter = asyncio.run(run())
+    assert report.successful == 63
+    assert report.errors == ["Row 38: rejected"]
+    # 1 full chunk, then 2 halves per level down to a single row
+    assert inserter.requests == 1 + 2 * 6
+
+
+def test_rows_missing_from_the_response_are_reported():
+    report = ImportReport()
+
+    async def insert(rows):
+        # e.g. a row policy filtered one of them out of the returned data
+        return rows[1:]
+
+    async def run():
+        inserter = BatchInserter(insert, report, batch_size=10)
+        await inserter.add(1, {"id": "a", "title": "First"})
+        await inserter.add(2, {"id": "b", "title": "Second"})
+        await inserter.flush()
+
+    asyncio.run(run())
+    assert report.to_response()["errors"] == ["Row 1: Failed to insert First"]
+    assert report.successful == 1
+
+
+@pytest.mark.parametrize("batch_size", [1, 7])
+def test_facets_see_every_imported_row(client, fake_db, monkeypatch, batch_size):
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", batch_size)
+    upload(client, make_csv(catalog_rows(15)))
+    counts = client.get("/api/countries").json()["counts"]
+    assert counts == {"Japan": 15}
+
+
+def test_normalize_frame_splits_clean_and_error_rows():
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        "title": ["Kept", None, "Bad year", "Bad cast", "Lists"],
+        "year": [2001, 2002, "soon", 2004, "2005"],
+        "country": ["Japan"] * 5,
+        "content_type": ["movie"] * 5,
+        "synopsis": ["s"] * 5,
+        "rating": [7.5, 8, 6, 5, "9.1"],
+        "episodes": [None, None, None, None, 12.0],
+        "genres": ["Drama, Comedy ,", None, "Drama", "Drama", " Thriller,,Crime "],
+        "cast": ['[{"name": "Lead"}]', None, None, "[not json", None],
+    }, index=range(10, 15))
+    clean, errors = importer.normalize_frame(frame)
+
+    assert errors.to_dict("records") == [
+        {"row": 12, "error": "Missing required field: title"},
+        {"row": 13, "error": "Invalid year: soon"},
+        {"row": 14, "error": "Invalid cast JSON"},
+    ]
+    assert list(clean.index) == [10, 14]
+    first, last = importer.clean_records(clean)
+    assert first["genres"] == ["Drama", "Comedy"] and first["cast"] == [{"name": "Lead"}]
+    assert first["episodes"] is None and first["original_title"] is None and first["crew"] == []
+    assert last["genres"] == ["Thriller", "Crime"]
+    assert (last["year"], last["rating"], last["episodes"]) == (2005, 9.1, 12)
+    assert type(last["year"]) is int and type(last["episodes"]) is int
+
+
+def test_upsert_reimport_updates_changed_rows_and_skips_the_rest(client, fake_db):
+    rows = catalog_rows(20)
+    assert upload(client, make_csv(rows)).json()["inserted"] == 20
+
+    rows[3][5] = 9.0
+    rows[4][6] = "Thriller"
+    rows.append(["Title 20", 2000, "Japan", "movie", "Synopsis", 6.0, "Drama"])
+    rows.append(["  title   0 ", 2000, "JAPAN", "Movie", "Synopsis", 7.5, "Drama,Comedy"])  # same as row 1
+    fake_db.queries.clear()
+    body = client.post(
+        "/api/admin/bulk-import",
+        params={"wait": "true", "mode": "upsert"},
+        files={"file": ("catalog.csv", make_csv(rows), "text/csv")},
+    ).json()
+
+    assert (body["inserted"], body["updated"], body["unchanged"]) == (1, 2, 18)
+    assert body["errors"] == ["Row 22: Duplicate of row 1"]
+    assert len(fake_db.tables["content"]) == 21
+    by_title = {row["title"]: row for row in fake_db.tables["content"]}
+    assert by_title["Title 3"]["rating"] == 9.0 and by_title["Title 4"]["genres"] == ["Thriller"]
+    # One fingerprint lookup for the chunk, then one insert and one batched update
+    assert fake_db.queries.count(("content", "select")) == 1
+    assert fake_db.queries.count(("content", "insert")) == 1
+    assert fake_db.queries.count(("content", "upsert")) == 1
+    assert client.get("/api/genres").json()["counts"] == {"Comedy": 19, "Drama": 20, "Thriller": 1}
+
+
+def test_fingerprints_ignore_case_and_spacing():
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        "title": ["Your  Name", " your name"], "original_title": [None, None], "year": [2016, 2016],
+        "country": ["Japan", "japan "], "content_type": ["movie", "MOVIE"], "synopsis": ["s", "s"], "rating": [8, 8],
+    })
+    clean, _ = importer.normalize_frame(frame)
+    first, second = importer.fingerprints(clean)
+    assert first == second == importer.content_fingerprint(importer.clean_records(clean)[0])
+    assert first != importer.content_fingerprint({**importer.clean_records(clean)[0], "year": 2017})
+
+
+def test_inserter_bounds_batches_in_flight():
+    report = ImportReport()
+    active, peak = [0], [0]
+
+    async def insert(rows):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.005)
+        active[0] -= 1
+        return rows
+
+    async def run():
+        inserter = BatchInserter(insert, report, batch_size=5, workers=3)
+        for i in range(100):
+            await inserter.add(i + 1, {"id": str(i), "title": f"t{i}"})
+            # Backpressure: never more than ``workers`` batches started
+            assert len(inserter.in_flight()) <= 3
+        await inserter.flush()
+
+    asyncio.run(run())
+    assert peak[0] == 3
+    assert report.successful == 100
+
+
+def test_transient_errors_are_retried_not_bisected(monkeypatch):
+    from db import QueryTimeout
+
+    monkeypatch.setattr(importer, "IMPORT_RETRY_BASE_SECONDS", 0)
+    report = ImportReport()
+    calls = []
+
+    async def flaky(rows):
+        calls.append(len(rows))
+        if len(calls) <= 2:
+            raise QueryTimeout("Database call timed out after 15s")
+        return rows
+
+    async def down(rows):
+        raise QueryTimeout("Database call timed out after 15s")
+
+    async def run(insert):
+        inserter = BatchInserter(insert, report, batch_size=8, workers=1)
+        for i in range(8):
+            await inserter.add(i + 1, {"id": str(i), "title": f"t{i}"})
+        await inserter.flush()
+        return inserter
+
+    inserter = asyncio.run(run(flaky))
+    assert calls == [8, 8, 8] and inserter.retries == 2
+    assert report.successful == 8
+
+    inserter = asyncio.run(run(down))
+    # Gives up after the retries and fails the batch without splitting it
+    assert inserter.requests == importer.IMPORT_RETRIES + 1
+    assert report.failed == 8
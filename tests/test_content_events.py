@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import server
+from content_events import ContentChange, ContentEventBus, RedisTransport
+from search_index import ContentIndex
+from tests.fake_redis import FakeRedis
+
+ROW = {"id": "c1", "title": "Parasite", "country": "South Korea", "genres": ["thriller"], "content_type": "movie"}
+
+
+def test_local_subscribers_run_inside_publish_and_failures_are_isolated():
+    bus = ContentEventBus()
+    seen = []
+
+    @bus.subscribe
+    def broken(change):
+        raise RuntimeError("boom")
+
+    bus.subscribe(lambda change: seen.append((change.kind, change.ids, change.local)))
+    bus.publish("saved", [ROW])
+    assert seen == [("saved", ["c1"], True)]
+    assert bus.stats()["errors"] == 1 and bus.stats()["fan_out"] is False
+
+
+def test_changes_reach_other_workers_batched_and_not_echoed():
+    redis = FakeRedis()
+
+    async def scenario():
+        workers = [ContentEventBus(RedisTransport(redis), flush_seconds=0.01) for _ in range(3)]
+        seen = {index: [] for index in range(3)}
+        for index, bus in enumerate(workers):
+            bus.subscribe(lambda change, index=index: seen[index].append(change))
+            bus.start()
+        await asyncio.sleep(0)
+
+        for i in range(20):
+            workers[0].publish("saved", [dict(ROW, id=f"c{i}")])
+        workers[0].publish("deleted", [dict(ROW, id="c3")])
+        await asyncio.sleep(0.05)
+        for bus in workers:
+            await bus.stop()
+        return workers, seen
+
+    workers, seen = asyncio.run(scenario())
+    # The writer saw each change once, locally
+    assert len(seen[0]) == 21 and all(change.local for change in seen[0])
+    for index in (1, 2):
+        assert [change.ids for change in seen[index]] == [[f"c{i}"] for i in range(20)] + [["c3"]]
+        assert not any(change.local for change in seen[index])
+        assert seen[index][0].rows[0]["title"] == "Parasite"
+    # 21 changes, one message
+    assert [call for call in redis.calls if call[0] == "publish"] == [("publish", "content-events")]
+    assert workers[0].stats()["sent"] == 1 and workers[1].stats()["received"] == 1
+
+
+def test_large_batches_carry_ids_only():
+    bus = ContentEventBus(max_rows=2)
+    changes = [ContentChange("saved", [dict(ROW, id=f"c{i}")]) for i in range(3)]
+    batch = json.loads(bus.encode(changes))
+    assert [change["ids"] for change in batch["changes"]] == [["c0"], ["c1"], ["c2"]]
+    assert all(change["rows"] is None for change in batch["changes"])
+
+
+def test_listener_resyncs_after_reconnecting():
+    redis = FakeRedis()
+
+    async def scenario():
+        bus = ContentEventBus(RedisTransport(redis, retry_seconds=0))
+        seen = []
+        bus.subscribe(seen.append)
+        bus.start()
+        await asyncio.sleep(0)
+        redis.disconnect()
+        await asyncio.sleep(0.01)
+        assert len(redis.subscriptions) == 1
+        await bus.stop()
+        return seen
+
+    seen = asyncio.run(scenario())
+    assert [(change.kind, change.local) for change in seen] == [("resync", False)]
+
+
+def test_remote_changes_refresh_this_workers_catalog_views(client, fake_db, monkeypatch):
+    fake_db.tables["content"] = [dict(ROW, rating=8.6, created_at="2024-01-01")]
+    monkeypatch.setattr(server, "content_index", ContentIndex())
+    assert client.get("/api/content/c1").json()["title"] == "Parasite"
+    assert client.get("/api/countries").json()["countries"] == ["South Korea"]
+    client.get("/api/content/search", params={"query": "parasite"})
+
+    # Another worker renames the title and adds one from Japan
+    renamed = dict(ROW, title="Parasite (2019)")
+    added = dict(ROW, id="c2", title="Shoplifters", country="Japan")
+    fake_db.tables["content"] = [dict(renamed, rating=8.6, created_at="2024-01-01"), dict(added, rating=7.9, created_at="2024-01-02")]
+    message = json.dumps({"origin": "another-worker", "changes": [{"kind": "saved", "ids": ["c1", "c2"], "rows": [renamed, added]}]})
+    server.content_events.receive(message)
+
+    assert client.get("/api/content/c1").json()["title"] == "Parasite (2019)"
+    assert client.get("/api/countries").json()["countries"] == ["Japan", "South Korea"]
+    found = client.get("/api/content/search", params={"query": "shoplifters"}).json()["contents"]
+    assert [row["id"] for row in found] == ["c2"]
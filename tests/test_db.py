@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+import pytest
+
+import db
+
+
+class SlowQuery:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def execute(self):
+        time.sleep(self.delay)
+        return "done"
+
+
+def test_execute_does_not_block_event_loop():
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await db.execute(SlowQuery(0.2))
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result == "done"
+    # The loop kept running while the blocking call sat on the thread pool
+    assert ticks >= 10
+
+
+def test_execute_enforces_timeout():
+    with pytest.raises(db.QueryTimeout):
+        asyncio.run(db.execute(SlowQuery(0.5), timeout=0.05))
+
+
+def test_content_list_goes_through_fake_backend(client, fake_db):
+    fake_db.tables["content"] = [
+        {"id": "a", "title": "Parasite", "synopsis": "", "created_at": "2024-01-01"},
+        {"id": "b", "title": "Your Name", "synopsis": "", "created_at": "2024-01-02"},
+    ]
+    response = client.get("/api/content")
+    assert response.status_code == 200
+    body = response.json()
+    assert [c["id"] for c in body["contents"]] == ["b", "a"]
+    assert body["total"] == 2
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+import server
+from facets import FacetCatalog
+
+ROW = {"title": "Parasite", "synopsis": "s", "year": 2019, "country": "South Korea",
+       "content_type": "movie", "genres": ["thriller", "drama"], "rating": 8.6}
+
+
+@pytest.fixture
+def catalog(fake_db, monkeypatch):
+    monkeypatch.setattr(server, "facet_catalog", FacetCatalog())
+    fake_db.tables["content"] = [
+        {"id": "c1", "country": "Japan", "content_type": "movie", "genres": ["drama", "drama"]},
+        {"id": "c2", "country": "Japan", "content_type": "series", "genres": ["romance"]},
+    ]
+    return server.facet_catalog
+
+
+def test_facets_are_loaded_once_and_counted(client, fake_db, catalog):
+    first = client.get("/api/genres")
+    assert first.json() == {"genres": ["drama", "romance"], "counts": {"drama": 1, "romance": 1}}
+    assert client.get("/api/countries").json()["counts"] == {"Japan": 2}
+    assert client.get("/api/content-types").json()["content_types"] == ["movie", "series"]
+    assert [q for q in fake_db.queries if q[0] == "content"] == [("content", "select")]
+
+
+def test_backing_table_is_preferred(client, fake_db, catalog):
+    fake_db.tables["content_facets"] = [{"facet": "country", "value": "Spain", "count": 3}]
+    assert client.get("/api/countries").json() == {"countries": ["Spain"], "counts": {"Spain": 3}}
+    assert ("content", "select") not in fake_db.queries
+
+
+def test_conditional_get_returns_304_until_a_write(client, catalog):
+    response = client.get("/api/countries")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert "max-age" in response.headers["Cache-Control"]
+    assert client.get("/api/countries", headers={"If-None-Match": etag}).status_code == 304
+
+    created = client.post("/api/admin/content", json=ROW).json()
+    changed = client.get("/api/countries", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["counts"] == {"Japan": 2, "South Korea": 1}
+
+    client.put(f"/api/admin/content/{created['id']}", json={**ROW, "country": "Japan"})
+    assert client.get("/api/countries").json()["counts"] == {"Japan": 3}
+    client.delete(f"/api/admin/content/{created['id']}")
+    assert client.get("/api/genres").json()["counts"] == {"drama": 1, "romance": 1}
+
+
+def test_search_can_include_facets(client, catalog):
+    body = client.get("/api/content/search", params={"include_facets": True}).json()
+    assert body["facets"]["country"] == {"Japan": 2}
+    assert "facets" not in client.get("/api/content/search").json()
+
+
+def test_a_load_racing_a_write_is_read_again():
+    catalog = FacetCatalog()
+    table = {"Japan": 2}
+    reads = []
+
+    async def load_facet_rows():
+        reads.append(1)
+        if len(reads) == 1:
+            # The write below commits before this read's snapshot, and its
+            # add() lands while the read is in flight: it is counted in both
+            await asyncio.sleep(0.01)
+        return [{"facet": "country", "value": value, "count": count} for value, count in table.items()]
+
+    async def load_content_rows():
+        return []
+
+    async def write():
+        await asyncio.sleep(0)
+        table["Japan"] += 1
+        catalog.add([{"country": "Japan"}])
+
+    async def scenario():
+        await asyncio.gather(catalog.ensure_loaded(load_facet_rows, load_content_rows), write())
+
+    asyncio.run(scenario())
+    assert catalog.counts["country"] == {"Japan": 3}
+    assert len(reads) == 2 and not catalog.is_stale()
@@ -0,0 +1,81 @@
+import asyncio
+
+import server
+from featured import FeaturedRails
+
+ROWS = [
+    {"id": "c1", "title": "Parasite", "country": "South Korea", "rating": 8.6, "created_at": "2024-01-01", "genres": []},
+    {"id": "c2", "title": "Shoplifters", "country": "Japan", "rating": 7.9, "created_at": "2024-03-01", "genres": []},
+    {"id": "c3", "title": "Oldboy", "country": "South Korea", "rating": 8.4, "created_at": "2024-02-01", "genres": []},
+]
+NEW_TITLE = {"title": "Roma", "synopsis": "s", "year": 2018, "country": "Mexico", "content_type": "movie", "genres": [], "rating": 9.1}
+
+
+def titles(response):
+    return [row["title"] for row in response.json()]
+
+
+def test_rails_are_served_from_one_snapshot(client, fake_db):
+    fake_db.tables["content"] = [dict(row) for row in ROWS]
+    assert titles(client.get("/api/content/featured", params={"category": "trending"})) == ["Parasite", "Oldboy", "Shoplifters"]
+    # Three category rails and one per country, plus loading the facet catalog
+    built = len(fake_db.queries)
+    assert built == 3 + 2 + 2
+
+    assert titles(client.get("/api/content/featured", params={"category": "new_releases", "limit": 2})) == ["Shoplifters", "Oldboy"]
+    assert titles(client.get("/api/content/featured", params={"category": "by_country", "country": "South Korea"})) == ["Parasite", "Oldboy"]
+    assert client.get("/api/content/featured", params={"category": "by_country", "country": "Spain"}).json() == []
+    response = client.get("/api/content/featured", params={"category": "top_rated", "limit": 1})
+    assert titles(response) == ["Parasite"]
+    assert response.headers["X-Snapshot-Age"] == "0" and response.headers["X-Query-Count"] == "0"
+    assert len(fake_db.queries) == built
+    assert client.get("/api/content/featured", headers={"If-None-Match": response.headers["ETag"]}).status_code == 200
+    assert client.get("/api/content/featured", params={"category": "top_rated", "limit": 1}, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_writes_rebuild_the_snapshot(client, fake_db):
+    fake_db.tables["content"] = [dict(row) for row in ROWS]
+    client.get("/api/content/featured")
+    assert client.post("/api/admin/content", json=NEW_TITLE).status_code == 200
+    assert titles(client.get("/api/content/featured", params={"category": "top_rated"}))[0] == "Roma"
+    assert titles(client.get("/api/content/featured", params={"category": "by_country", "country": "Mexico"})) == ["Roma"]
+
+
+def test_other_categories_are_queried_as_before(client, fake_db):
+    fake_db.tables["content"] = [dict(row) for row in ROWS]
+    response = client.get("/api/content/featured", params={"category": "by_country"})
+    assert len(response.json()) == 3 and "X-Snapshot-Age" not in response.headers
+    assert server.featured_rails.rails is None
+
+
+def test_scheduler_rebuilds_once_per_burst_of_writes():
+    rows = [dict(row) for row in ROWS]
+    loads = []
+
+    async def load_rail(category, country, limit):
+        loads.append((category, country))
+        await asyncio.sleep(0.01)
+        return sorted(rows, key=lambda row: -row["rating"])[:limit]
+
+    async def load_countries():
+        return []
+
+    async def scenario():
+        rails = FeaturedRails(refresh_seconds=60, debounce_seconds=0.02)
+        rails.start(load_rail, load_countries)
+        await rails.ensure_loaded(load_rail, load_countries)
+        assert rails.rebuilds == 1
+
+        rows.append({"id": "c4", "title": "Roma", "rating": 9.1})
+        for _ in range(10):
+            rails.changed()
+        # Served from the previous snapshot until the rebuild lands
+        await rails.ensure_loaded(load_rail, load_countries)
+        assert rails.rail(("top_rated", None), 1)[0]["title"] == "Parasite"
+        await asyncio.sleep(0.1)
+        assert rails.rebuilds == 2 and rails.is_current()
+        assert rails.rail(("top_rated", None), 1)[0]["title"] == "Roma"
+        await rails.stop()
+
+    asyncio.run(scenario())
+    assert len(loads) == 6
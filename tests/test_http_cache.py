@@ -0,0 +1,67 @@
+import http_cache
+import server
+from http_cache import etag_matches
+
+ROW = {
+    "id": "c1", "title": "Parasite", "synopsis": "A family schemes.", "year": 2019, "country": "South Korea",
+    "content_type": "movie", "genres": ["thriller"], "rating": 8.6, "cast": [{"name": "Song Kang-ho"}],
+    "created_at": "2024-01-01", "updated_at": "2024-01-01T00:00:00",
+}
+
+
+def test_content_detail_revalidates_without_querying(client, fake_db, monkeypatch):
+    fake_db.tables["content"] = [dict(ROW)]
+    first = client.get("/api/content/c1")
+    etag = first.headers["ETag"]
+    assert first.json()["cast"] == [{"name": "Song Kang-ho"}]
+    assert etag.startswith('"') and first.headers["Cache-Control"] == http_cache.CACHE_CONTROL["content"]
+
+    rendered = []
+    monkeypatch.setattr(server, "render_json", lambda value: rendered.append(value) or http_cache.render_json(value))
+    queries = len(fake_db.queries)
+    again = client.get("/api/content/c1", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == etag and again.headers["X-Query-Count"] == "0"
+    assert len(fake_db.queries) == queries and rendered == []
+
+
+def test_content_detail_etag_follows_updated_at(client, fake_db):
+    fake_db.tables["content"] = [dict(ROW)]
+    etag = client.get("/api/content/c1").headers["ETag"]
+    update = {key: ROW[key] for key in ("synopsis", "year", "country", "content_type", "genres", "rating")}
+    assert client.put("/api/admin/content/c1", json={**update, "title": "Parasite (2019)"}).status_code == 200
+
+    changed = client.get("/api/content/c1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["title"] == "Parasite (2019)"
+    assert changed.headers["ETag"] != etag
+
+
+def test_lists_have_weak_etags_and_their_own_policy(client, fake_db, monkeypatch):
+    fake_db.tables["content"] = [dict(ROW)]
+    monkeypatch.setitem(http_cache.CACHE_CONTROL, "featured", "public, max-age=5")
+    response = client.get("/api/content/featured")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"') and response.headers["Cache-Control"] == "public, max-age=5"
+    assert response.json()[0]["title"] == "Parasite"
+    assert client.get("/api/content/featured", headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+    search = client.get("/api/content/search", params={"genre": "thriller"})
+    assert search.headers["ETag"].startswith('W/"') and search.headers["ETag"] != etag
+    assert client.get("/api/content/search", params={"genre": "drama"}, headers={"If-None-Match": search.headers["ETag"]}).status_code == 200
+
+
+def test_etag_matching_is_weak_and_accepts_lists():
+    assert etag_matches('W/"abc"', '"abc"') and etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('"x", "abc"', '"abc"') and etag_matches("*", '"abc"')
+    assert not etag_matches('"abcd"', '"abc"') and not etag_matches(None, '"abc"')
+
+
+def test_content_detail_404s_only_for_missing_rows(client, fake_db, monkeypatch):
+    assert client.get("/api/content/missing").status_code == 404
+
+    async def broken(query, timeout=None):
+        raise RuntimeError('relation "content" not found')
+
+    monkeypatch.setattr(server, "execute", broken)
+    response = client.get("/api/content/c1")
+    assert response.status_code == 500 and "not found" in response.json()["detail"]
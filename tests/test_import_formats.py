@@ -0,0 +1,117 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+from importer import BatchInserter, ImportReport, count_rows, import_frames, read_frames  # noqa: E402
+
+
+def catalog_records(count):
+    return [
+        {
+            "title": f"Title {i}",
+            "year": 2000 + i % 20,
+            "country": "Japan",
+            "content_type": "movie",
+            "synopsis": "Synopsis",
+            "rating": 7.5,
+            "genres": ["Drama", " Comedy ", ""],
+            "tags": None,
+            "cast": [{"name": "Lead", "character": f"Hero {i}"}],
+            "crew": [],
+            "internal_notes": "not imported",
+        }
+        for i in range(count)
+    ]
+
+
+def write_parquet(path, records):
+    pq.write_table(pa.Table.from_pylist(records), path, row_group_size=4)
+    return str(path)
+
+
+def write_arrow(path, records, stream=False):
+    table = pa.Table.from_pylist(records)
+    with pa.OSFile(str(path), "wb") as sink:
+        with (pa.ipc.new_stream if stream else pa.ipc.new_file)(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=3):
+                writer.write_batch(batch)
+    return str(path)
+
+
+def write_jsonl(path, records):
+    path.write_text("\n".join(json.dumps(record) for record in records) + "\n")
+    return str(path)
+
+
+WRITERS = {
+    "catalog.parquet": write_parquet,
+    "catalog.arrow": write_arrow,
+    "catalog.arrows": lambda path, records: write_arrow(path, records, stream=True),
+    "catalog.jsonl": write_jsonl,
+}
+
+
+def import_file(path, chunk_rows=5):
+    rows, report = [], ImportReport()
+
+    async def insert(batch):
+        rows.extend(batch)
+        return batch
+
+    asyncio.run(import_frames(read_frames(path, chunk_rows), BatchInserter(insert, report, 4), report))
+    return rows, report
+
+
+@pytest.mark.parametrize("name", sorted(WRITERS))
+def test_native_lists_are_imported_as_they_are(tmp_path, name):
+    records = catalog_records(12)
+    records[7]["title"] = None
+    path = WRITERS[name](tmp_path / name, records)
+
+    rows, report = import_file(path)
+    assert report.successful == 11
+    assert report.errors == ["Row 8: Missing required field: title"]
+    assert rows[0]["genres"] == ["Drama", "Comedy"]
+    assert rows[0]["tags"] == []
+    assert rows[3]["cast"] == [{"name": "Lead", "character": "Hero 3"}]
+    assert rows[3]["year"] == 2003 and rows[3]["rating"] == 7.5
+
+
+def test_arrow_readers_prune_columns_and_regroup_batches(tmp_path):
+    for name in ("catalog.parquet", "catalog.arrow"):
+        path = WRITERS[name](tmp_path / name, catalog_records(11))
+        frames = list(read_frames(path, chunk_rows=5))
+        assert [len(frame) for frame in frames] == [5, 5, 1]
+        assert frames[2].index.tolist() == [10]
+        assert "internal_notes" not in frames[0].columns
+
+
+def test_string_cells_still_parse_in_columnar_files(tmp_path):
+    records = catalog_records(2)
+    for record in records:
+        record.update(genres="Drama, Comedy", cast='[{"name": "Lead"}]')
+    rows, report = import_file(write_parquet(tmp_path / "catalog.parquet", records))
+    assert report.successful == 2
+    assert rows[0]["genres"] == ["Drama", "Comedy"] and rows[0]["cast"] == [{"name": "Lead"}]
+
+
+def test_row_counts_come_from_metadata(tmp_path):
+    assert count_rows(write_parquet(tmp_path / "catalog.parquet", catalog_records(9))) == 9
+    assert count_rows(write_arrow(tmp_path / "catalog.arrow", catalog_records(9))) == 9
+    assert count_rows(write_arrow(tmp_path / "catalog.arrows", catalog_records(9), stream=True)) is None
+    assert count_rows(write_jsonl(tmp_path / "catalog.jsonl", catalog_records(9))) == 9
+
+
+def test_parquet_upload(client, fake_db):
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist(catalog_records(6)), buffer)
+    files = {"file": ("catalog.parquet", buffer.getvalue(), "application/octet-stream")}
+    body = client.post("/api/admin/bulk-import", params={"wait": "true"}, files=files).json()
+    assert body["successful_imports"] == 6
+    assert fake_db.tables["content"][0]["genres"] == ["Drama", "Comedy"]
+    assert fake_db.tables["content"][0]["cast"] == [{"name": "Lead", "character": "Hero 0"}]
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+import import_jobs
+import importer
+import server
+from import_jobs import ImportJobManager
+from tests.test_bulk_import import catalog_rows, make_csv
+
+
+class Upload:
+    """The parts of ``UploadFile`` the job manager reads."""
+
+    def __init__(self, data, filename="catalog.csv"):
+        self.filename = filename
+        self.data = data
+
+    async def read(self, size=-1):
+        chunk, self.data = (self.data, b"") if size < 0 else (self.data[:size], self.data[size:])
+        return chunk
+
+
+class Store:
+    """Job records and content rows, standing in for the database."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.content = {}
+        self.writable = True
+
+    async def insert(self, rows):
+        for row in rows:
+            assert row["id"] not in self.content, "row inserted twice"
+            self.content[row["id"]] = row
+        return rows
+
+    async def save(self, record):
+        if self.writable:
+            self.jobs[record["id"]] = dict(record)
+
+    async def load(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def existing_ids(self, ids):
+        return {i for i in ids if i in self.content}
+
+    def manager(self, directory):
+        return ImportJobManager(self.insert, self.save, self.load, self.existing_ids, directory=str(directory), chunk_rows=10)
+
+
+def test_background_import_reports_progress(fake_db):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            files = {"file": ("catalog.csv", make_csv(catalog_rows(25)), "text/csv")}
+            started = await client.post("/api/admin/bulk-import", files=files)
+            assert started.status_code == 202
+            job_id = started.json()["job_id"]
+            assert started.json()["expected_rows"] == 25
+            for _ in range(200):
+                progress = (await client.get(f"/api/admin/bulk-import/jobs/{job_id}")).json()
+                if progress["status"] == "completed":
+                    return progress
+                await asyncio.sleep(0.01)
+            raise AssertionError(progress)
+
+    progress = asyncio.run(scenario())
+    assert progress["processed_rows"] == 25
+    assert progress["successful_imports"] == 25
+    assert len(fake_db.tables["content"]) == 25
+    record = fake_db.tables["import_jobs"][0]
+    assert record["status"] == "completed" and record["processed_rows"] == 25
+    assert not os.path.exists(record["path"])
+
+
+def test_cancel_stops_after_a_chunk_and_resume_finishes(tmp_path, monkeypatch):
+    store = Store()
+    # One batch in flight, so the gate holds the import at its first chunk
+    monkeypatch.setattr(importer, "IMPORT_WORKERS", 1)
+
+    async def scenario():
+        manager = store.manager(tmp_path)
+        gate, started = asyncio.Event(), asyncio.Event()
+        insert = store.insert
+
+        async def gated_insert(rows):
+            started.set()
+            await gate.wait()
+            return await insert(rows)
+
+        manager.insert = gated_insert
+        job = await manager.submit(Upload(make_csv(catalog_rows(35))))
+        await started.wait()
+        await manager.cancel(job.id)
+        gate.set()
+        await manager.wait(job)
+        assert job.status == "cancelled"
+        # The chunk already sent finishes; nothing after it starts
+        assert job.processed_rows == 10 < 35 and len(store.content) == 10
+
+        resumed = await manager.resume(job.id)
+        await manager.wait(resumed)
+        return resumed
+
+    job = asyncio.run(scenario())
+    assert job.status == "completed"
+    assert job.processed_rows == 35 and job.report.successful == 35
+    assert len(store.content) == 35
+    assert store.jobs[job.id]["status"] == "completed"
+
+
+def test_resume_after_lost_worker_does_not_reinsert_rows(tmp_path, monkeypatch):
+    store = Store()
+    monkeypatch.setattr(import_jobs, "IMPORT_JOB_STALE_SECONDS", 0)
+
+    async def first_worker():
+        manager = store.manager(tmp_path)
+
+        async def insert(rows):
+            await store.insert(rows)
+            if any(row["title"] == "Title 19" for row in rows):
+                # The worker dies once rows 11-20 are in the table, before
+                # the job records them as committed
+                store.writable = False
+                await asyncio.Event().wait()
+            return rows
+
+        manager.insert = insert
+        job = await manager.submit(Upload(make_csv(catalog_rows(30))))
+        while store.writable:
+            await asyncio.sleep(0.001)
+        await manager.shutdown()
+        return job.id
+    job_id = asyncio.run(first_worker())
+    record = store.jobs[job_id]
+    assert record["status"] == "running"
+    assert record["processed_rows"] <= 10 and record["dispatched_rows"] >= 20
+    store.writable = True
+
+    async def second_worker():
+        manager = store.manager(tmp_path)
+        assert (await manager.get(job_id)).status == "interrupted"
+        job = await manager.resume(job_id)
+        await manager.wait(job)
+        return job
+
+    job = asyncio.run(second_worker())
+    assert job.status == "completed"
+    assert len(store.content) == 30
+    assert job.report.successful == 30 and job.report.failed == 0
+
+
+def test_stopped_jobs_release_their_upload(tmp_path, monkeypatch):
+    store = Store()
+
+    async def scenario():
+        manager = store.manager(tmp_path)
+        job = await manager.submit(Upload(make_csv(catalog_rows(5))))
+        await manager.cancel(job.id)
+        await manager.wait(job)
+        assert job.status == "cancelled" and os.path.exists(job.path)
+        discarded = await manager.discard(job.id)
+        assert discarded.status == "discarded" and not os.path.exists(job.path)
+        assert store.jobs[job.id]["status"] == "discarded"
+
+        # An abandoned job's file goes once it outlives the TTL
+        job = await manager.submit(Upload(make_csv(catalog_rows(5))))
+        await manager.cancel(job.id)
+        await manager.wait(job)
+        assert manager.expire_files() == 0
+        monkeypatch.setattr(import_jobs, "IMPORT_JOB_FILE_TTL_SECONDS", 0)
+        assert manager.expire_files(now=time.time() + 1) == 1
+        try:
+            await manager.resume(job.id)
+        except import_jobs.JobConflict as e:
+            return str(e)
+
+    assert asyncio.run(scenario()) == "The uploaded file is not available on this worker"
+    assert os.listdir(tmp_path) == []
+
+
+def test_event_stream_and_invalid_transitions(client, fake_db):
+    files = {"file": ("catalog.csv", make_csv(catalog_rows(3)), "text/csv")}
+    job_id = client.post("/api/admin/bulk-import", params={"wait": "true"}, files=files).json()["job_id"]
+
+    response = client.get(f"/api/admin/bulk-import/jobs/{job_id}/events")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [event["status"] for event in events] == ["completed"]
+
+    assert client.post(f"/api/admin/bulk-import/jobs/{job_id}/resume").status_code == 409
+    assert client.post(f"/api/admin/bulk-import/jobs/{job_id}/cancel").status_code == 409
+    assert client.post(f"/api/admin/bulk-import/jobs/{job_id}/discard").status_code == 409
+    assert client.get("/api/admin/bulk-import/jobs/missing").status_code == 404
@@ -0,0 +1,138 @@
+import asyncio
+import csv
+import os
+import tracemalloc
+
+from importer import BatchInserter, ImportReport, import_frames, read_frames, spool_upload
+
+HEADER = ["title", "year", "country", "content_type", "synopsis", "rating", "genres", "cast"]
+
+
+def catalog_row(i):
+    return [f"Title {i}", 2000 + i % 20, "Japan", "movie", "A synopsis " * 40, 7.5, "Drama,Comedy", '[{"name": "Lead"}]']
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(HEADER)
+        writer.writerows(catalog_row(i) for i in range(rows))
+    return str(path)
+
+
+def write_xlsx(path, rows):
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(HEADER)
+    for i in range(rows):
+        sheet.append(catalog_row(i))
+    workbook.save(path)
+    return str(path)
+
+
+async def discard(rows):
+    # Stands in for the database without keeping anything
+    return rows
+
+
+def import_peak(path, chunk_rows=500):
+    """Peak traced allocation while importing ``path``, in bytes."""
+    report = ImportReport()
+    tracemalloc.start()
+    try:
+        asyncio.run(import_frames(read_frames(path, chunk_rows), BatchInserter(discard, report, 200), report))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak, report
+
+
+def test_csv_import_memory_does_not_grow_with_file_size(tmp_path):
+    small_peak, small = import_peak(write_csv(tmp_path / "small.csv", 1_000))
+    large_path = write_csv(tmp_path / "large.csv", 10_000)
+    large_peak, large = import_peak(large_path)
+    assert small.successful == 1_000 and large.successful == 10_000
+    assert os.path.getsize(large_path) > 4_000_000
+    # One chunk and one batch in flight, whatever the file size
+    assert large_peak < small_peak * 1.5
+    assert large_peak < 6_000_000
+
+
+def test_xlsx_is_read_in_bounded_chunks(tmp_path):
+    path = write_xlsx(tmp_path / "catalog.xlsx", 2_500)
+    frames = read_frames(path, chunk_rows=1_000)
+    sizes = [len(frame) for frame in frames]
+    assert sizes == [1_000, 1_000, 500]
+
+    peak, report = import_peak(path)
+    assert report.successful == 2_500
+    # Bounded apart from the workbook's shared-string table
+    assert peak < 8_000_000
+
+
+def test_row_numbers_continue_across_chunks(tmp_path):
+    path = tmp_path / "gaps.csv"
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(HEADER)
+        for i in range(9):
+            row = catalog_row(i)
+            if i in (1, 7):
+                row[0] = ""
+            writer.writerow(row)
+    report = ImportReport()
+    asyncio.run(import_frames(read_frames(str(path), chunk_rows=4), BatchInserter(discard, report, 3), report))
+    assert report.total_rows == 9
+    assert report.errors == ["Row 2: Missing required field: title", "Row 8: Missing required field: title"]
+
+
+def test_xlsx_row_numbers_count_blank_rows(tmp_path):
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    for i in range(6):
+        row = catalog_row(i)
+        if i == 4:
+            row[0] = None
+        sheet.append(row if i not in (1, 2) else [None] * len(HEADER))
+    path = str(tmp_path / "blanks.xlsx")
+    workbook.save(path)
+
+    report = ImportReport()
+    asyncio.run(import_frames(read_frames(path, chunk_rows=2), BatchInserter(discard, report, 3), report))
+    assert report.successful == 3
+    assert report.errors == ["Row 5: Missing required field: title"]
+
+
+class StreamingUpload:
+    """Async ``read(size)`` over generated bytes, like ``UploadFile``."""
+
+    def __init__(self, filename, total_bytes):
+        self.filename = filename
+        self.remaining = total_bytes
+        self.largest_read = 0
+
+    async def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        self.largest_read = max(self.largest_read, size)
+        self.remaining -= size
+        return b"x" * size
+
+
+def test_spool_upload_copies_in_small_chunks(tmp_path):
+    total_bytes = 32 * 1024 * 1024
+    upload = StreamingUpload("Catalog.CSV", total_bytes)
+    tracemalloc.start()
+    try:
+        path = asyncio.run(spool_upload(upload, directory=str(tmp_path)))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert path.endswith(".csv")
+    assert os.path.getsize(path) == total_bytes
+    assert upload.largest_read <= 1024 * 1024
+    assert peak < 4 * 1024 * 1024
@@ -0,0 +1,98 @@
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def catalog(fake_db):
+    # Duplicate timestamps and ratings, plus NULL ratings, exercise the id
+    # tie-break and the NULL block
+    fake_db.tables["content"] = [
+        {"id": f"c{i:02d}", "title": f"Heist {i}" if i % 2 else f"Drama {i}",
+         "created_at": f"2024-01-{i // 3 + 1:02d}", "rating": None if i % 5 == 0 else float(i % 4)}
+        for i in range(23)
+    ]
+    return fake_db
+
+
+def walk(client, path, key, **params):
+    seen, cursor, requests = [], None, 0
+    while True:
+        response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        seen += [item["id"] for item in body[key]]
+        cursor = body["next_cursor"]
+        requests += 1
+        if not cursor:
+            return seen, requests
+
+
+def expected_order(rows, column, descending):
+    present = sorted((r for r in rows if r[column] is not None), key=lambda r: (r[column], r["id"]), reverse=descending)
+    missing = sorted((r for r in rows if r[column] is None), key=lambda r: r["id"], reverse=descending)
+    return [r["id"] for r in present + missing]
+
+
+def test_content_cursor_walk_visits_every_row_once(client, catalog):
+    seen, requests = walk(client, "/api/content", "contents", limit=5)
+    assert seen == expected_order(catalog.tables["content"], "created_at", True)
+    assert requests == 5
+
+
+def test_cursor_page_matches_offset_page(client, catalog):
+    first = client.get("/api/content", params={"limit": 4}).json()
+    by_cursor = client.get("/api/content", params={"limit": 4, "cursor": first["next_cursor"]}).json()
+    by_page = client.get("/api/content", params={"limit": 4, "page": 2}).json()
+    assert by_cursor["contents"] == by_page["contents"]
+
+
+@pytest.mark.parametrize("sort_order", ["desc", "asc"])
+def test_search_cursor_keeps_nulls_last(client, catalog, sort_order):
+    seen, _ = walk(client, "/api/content/search", "contents", limit=4, sort_by="rating", sort_order=sort_order)
+    assert seen == expected_order(catalog.tables["content"], "rating", sort_order == "desc")
+
+
+def test_search_cursor_combines_with_text_filter(client, catalog):
+    seen, _ = walk(client, "/api/content/search", "contents", limit=3, query="heist", sort_by="rating")
+    heists = [row for row in catalog.tables["content"] if row["title"].startswith("Heist")]
+    assert seen == expected_order(heists, "rating", True)
+
+
+def test_relevance_uses_offset_cursor(client, catalog):
+    seen, requests = walk(client, "/api/content/search", "contents", limit=4, query="heist", sort_by="relevance")
+    assert sorted(seen) == sorted(row["id"] for row in catalog.tables["content"] if row["title"].startswith("Heist"))
+    assert requests == 3
+
+
+def test_watchlist_and_history_cursors(client, fake_db):
+    fake_db.auth.add_user("token-u1", user_id="u1")
+    fake_db.tables["content"] = [{"id": "c1", "title": "T"}]
+    fake_db.tables["watchlist"] = [
+        {"id": i, "user_id": "u1", "content_id": "c1", "status": "watching",
+         "created_at": f"2024-01-0{i % 3 + 1}", "updated_at": f"2024-02-0{i % 4 + 1}"}
+        for i in range(1, 8)
+    ]
+    headers = {"Authorization": "Bearer token-u1"}
+    ids, cursor = [], None
+    while True:
+        body = client.get("/api/watchlist", params={"limit": 3, **({"cursor": cursor} if cursor else {})},
+                          headers=headers).json()
+        ids += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert ids == expected_order(fake_db.tables["watchlist"], "created_at", True)
+
+    body = client.get("/api/analytics/history", params={"limit": 5}, headers=headers).json()
+    rest = client.get("/api/analytics/history", params={"limit": 5, "cursor": body["next_cursor"]}, headers=headers).json()
+    assert len(body["history"]) + len(rest["history"]) == 7
+    assert rest["next_cursor"] is None
+
+
+def test_bad_cursors_are_rejected(client, catalog):
+    assert client.get("/api/content", params={"cursor": "not base64!"}).status_code == 400
+    rating_cursor = encode_cursor({"k": "rating", "d": True, "v": 3.0, "i": "c03"})
+    response = client.get("/api/content/search", params={"cursor": rating_cursor, "sort_order": "asc"})
+    assert response.status_code == 400
+    assert decode_cursor(rating_cursor, "rating", True)["i"] == "c03"
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+import server
+from profiles import ProfileLoader, UsernameCache
+
+
+@pytest.fixture
+def user(fake_db, monkeypatch):
+    monkeypatch.setattr(server, "username_cache", UsernameCache())
+    fake_db.tables["profiles"] = [
+        {"id": "u1", "username": "mina", "first_name": "Mina"},
+        {"id": "u2", "username": "joon", "first_name": "Joon"},
+    ]
+    fake_db.tables["reviews"] = [{"id": 1, "user_id": "u2", "content_id": "c1", "rating": 9}]
+    fake_db.auth.add_user("token-u1", user_id="u1")
+    return {"Authorization": "Bearer token-u1"}
+
+
+def profile_queries(fake_db):
+    return [q for q in fake_db.queries if q[0] == "profiles"]
+
+
+def test_loader_batches_loads_in_the_same_tick(fake_db, user):
+    async def scenario():
+        loader = ProfileLoader(server.fetch_profiles, server.fetch_profile_by_username, UsernameCache())
+        first = await asyncio.gather(loader.load("u1"), loader.load("u2"), loader.load("u1"))
+        again = await loader.load("u2")
+        return first, again
+
+    (a, b, c), again = asyncio.run(scenario())
+    assert a["username"] == "mina" and b["username"] == "joon" and c is a
+    assert again["username"] == "joon"
+    assert profile_queries(fake_db) == [("profiles", "select")]
+
+
+def test_me_fetches_profile_once(client, fake_db, user):
+    response = client.get("/api/auth/me", headers=user)
+    assert response.status_code == 200
+    assert response.json()["username"] == "mina"
+    assert response.headers["X-Query-Count"] == "1"
+
+
+def test_username_resolution_is_cached_across_requests(client, fake_db, user):
+    first = client.get("/api/social/stats/joon")
+    second = client.get("/api/social/stats/joon")
+    assert first.json()["public_reviews"] == second.json()["public_reviews"] == 1
+    assert first.headers["X-Query-Count"] == "2"
+    assert second.headers["X-Query-Count"] == "1"
+    assert len(profile_queries(fake_db)) == 1
+
+
+def test_rename_writes_through_username_cache(client, fake_db, user):
+    assert client.get("/api/social/stats/mina").status_code == 200
+    response = client.put("/api/auth/profile", json={"username": "mina_k"}, headers=user)
+    assert response.status_code == 200
+
+    renamed = client.get("/api/social/stats/mina_k")
+    assert renamed.status_code == 200
+    assert renamed.headers["X-Query-Count"] == "1"
+    assert client.get("/api/social/stats/mina").status_code == 404
@@ -0,0 +1,189 @@
+import asyncio
+
+import httpx
+import pytest
+
+import server
+from response_cache import RedisStore, ResponseCache, response_key
+from tests.fake_redis import FakeRedis
+
+
+def test_concurrent_misses_share_one_load():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": len(calls)}
+
+    async def scenario():
+        cache = ResponseCache(ttl=60)
+        results = await asyncio.gather(*(cache.get_or_load("key", load) for _ in range(500)))
+        return cache, results
+
+    cache, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result == {"value": 1} for result in results)
+    stats = cache.stats()
+    assert stats["misses"] == 500 and stats["coalesced"] == 499 and stats["loads"] == 1
+
+
+def test_stale_entries_are_served_while_one_refresh_runs():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def scenario():
+        cache = ResponseCache(ttl=0.02, stale_seconds=60)
+        assert await cache.get_or_load("key", load) == 1
+        await asyncio.sleep(0.03)
+        # Stale: answered at once from the old value, refreshed once behind it
+        stale = await asyncio.gather(*(cache.get_or_load("key", load) for _ in range(20)))
+        assert stale == [1] * 20
+        await asyncio.sleep(0.02)
+        assert await cache.get_or_load("key", load) == 2
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert stats["stale_hits"] == 20 and stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_ratio"] == pytest.approx(21 / 22)
+
+
+def test_failed_loads_are_not_cached():
+    attempts = []
+
+    async def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def scenario():
+        cache = ResponseCache(ttl=60)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("key", load)
+        return await cache.get_or_load("key", load), cache
+
+    value, cache = asyncio.run(scenario())
+    assert value == "ok" and cache.stats()["errors"] == 1
+
+
+def test_loads_started_before_an_invalidation_are_not_stored():
+    release = None
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        cache = ResponseCache(ttl=60)
+
+        async def old_load():
+            await release.wait()
+            return "old"
+
+        pending = asyncio.ensure_future(cache.get_or_load("key", old_load))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        release.set()
+        assert await pending == "old"
+
+        async def new_load():
+            return "new"
+
+        return await cache.get_or_load("key", new_load)
+
+    assert asyncio.run(scenario()) == "new"
+
+
+def test_workers_share_entries_through_redis():
+    redis = FakeRedis()
+
+    async def scenario():
+        first, second = ResponseCache(RedisStore(redis), ttl=60), ResponseCache(RedisStore(redis), ttl=60)
+        calls = []
+
+        async def load():
+            calls.append(1)
+            return {"title": "Parasite"}
+
+        await first.get_or_load("key", load)
+        assert await second.get_or_load("key", load) == {"title": "Parasite"}
+        assert len(calls) == 1 and second.stats()["hits"] == 1
+
+        first.invalidate()
+        await first._invalidating
+        second.invalidate(shared=False)
+        assert await second.get_or_load("key", load) == {"title": "Parasite"}
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_a_load_from_before_a_write_is_not_shared_after_it():
+    redis = FakeRedis()
+
+    async def scenario():
+        writer, filler, reader = (ResponseCache(RedisStore(redis), ttl=60) for _ in range(3))
+        release = asyncio.Event()
+
+        async def old_load():
+            await release.wait()
+            return "old"
+
+        async def new_load():
+            return "new"
+
+        # Another worker's fill reads the database before the write...
+        pending = asyncio.ensure_future(filler.get_or_load("key", old_load))
+        await asyncio.sleep(0)
+        writer.invalidate()
+        await asyncio.sleep(0)
+        # ...and stores its body in Redis after the write invalidated it
+        release.set()
+        assert await pending == "old"
+        assert "response-cache:key" in redis.data
+        return await reader.get_or_load("key", new_load)
+
+    assert asyncio.run(scenario()) == "new"
+
+
+def test_catalog_endpoints_are_cached_until_a_content_write(client, fake_db):
+    fake_db.tables["content"] = [
+        {"id": "c1", "title": "Parasite", "rating": 8.6, "country": "South Korea", "genres": ["thriller"], "created_at": "2024-01-01"},
+    ]
+    for _ in range(3):
+        assert client.get("/api/content/search").json()["contents"][0]["title"] == "Parasite"
+        assert client.get("/api/content/c1").json()["title"] == "Parasite"
+    assert len(fake_db.queries) == 2
+
+    update = {
+        "title": "Parasite (2019)", "synopsis": "A family schemes.", "year": 2019, "country": "South Korea",
+        "content_type": "movie", "genres": ["thriller"], "rating": 8.6,
+    }
+    assert client.put("/api/admin/content/c1", json=update).status_code == 200
+    assert client.get("/api/content/c1").json()["title"] == "Parasite (2019)"
+    stats = client.get("/api/admin/cache/stats").json()["responses"]
+    assert stats["hits"] == 4 and stats["misses"] == 3
+
+
+def test_concurrent_cold_requests_make_one_query(fake_db):
+    fake_db.tables["content"] = [{"id": f"c{i}", "title": f"Title {i}", "rating": 8.0, "created_at": "2024-01-01"} for i in range(5)]
+    fake_db.latency = 0.02
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.get("/api/content/search", params={"include_total": "false"}) for _ in range(200)))
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert all(response.status_code == 200 for response in responses)
+    assert fake_db.queries == [("content", "select")]
+
+
+def test_keys_ignore_unset_parameters():
+    assert response_key("featured", category="trending", country=None, limit=10) == response_key("featured", limit=10, category="trending")
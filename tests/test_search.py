@@ -0,0 +1,55 @@
+import pytest
+
+
+@pytest.fixture
+def catalog(fake_db):
+    fake_db.tables["content"] = [
+        {"id": "c1", "title": "Parasite", "original_title": "기생충", "synopsis": "A poor family schemes.",
+         "country": "South Korea", "content_type": "movie", "rating": 8.6, "tags": ["korean"]},
+        {"id": "c2", "title": "Money Heist", "original_title": "La Casa de Papel",
+         "synopsis": "Robbers plan a heist on the family mint.", "country": "Spain",
+         "content_type": "series", "rating": 8.2, "tags": ["heist"]},
+        {"id": "c3", "title": "Family Heist", "original_title": None, "synopsis": "A heist.",
+         "country": "Spain", "content_type": "movie", "rating": 6.0, "tags": []},
+    ]
+    return fake_db
+
+
+def ids(response):
+    return [c["id"] for c in response.json()["contents"]]
+
+
+def test_relevance_ranks_title_matches_first(client, catalog):
+    response = client.get("/api/content/search", params={"query": "heist", "sort_by": "relevance"})
+    assert response.status_code == 200
+    assert ids(response) == ["c2", "c3"]
+    assert response.json()["total"] == 2
+    # Ranked page and total come back together
+    assert response.headers["X-Query-Count"] == "1"
+
+
+def test_relevance_applies_filters(client, catalog):
+    response = client.get("/api/content/search",
+                          params={"query": "heist", "sort_by": "relevance", "content_type": "movie"})
+    assert ids(response) == ["c3"]
+
+
+def test_original_title_substring_matches(client, catalog):
+    response = client.get("/api/content/search", params={"query": "생충"})
+    assert ids(response) == ["c1"]
+
+
+def test_relevance_without_query_sorts_by_rating(client, catalog):
+    response = client.get("/api/content/search", params={"sort_by": "relevance"})
+    assert ids(response) == ["c1", "c2", "c3"]
+
+
+@pytest.mark.parametrize("query", ["%", "_", "*", "Heist_"])
+def test_like_wildcards_match_only_themselves(client, catalog, query):
+    response = client.get("/api/content/search", params={"query": query})
+    assert ids(response) == []
+
+
+def test_like_wildcards_in_titles_still_match(client, catalog):
+    catalog.tables["content"].append({"id": "c4", "title": "100% Wolf", "rating": 5.0, "tags": []})
+    assert ids(client.get("/api/content/search", params={"query": "100%"})) == ["c4"]
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+import server
+from search_index import ContentIndex, tokenize
+
+ROWS = [
+    {"id": "c1", "title": "Parasite", "original_title": "기생충", "synopsis": "A poor family schemes.",
+     "country": "South Korea", "content_type": "movie", "genres": ["Thriller", "Drama"],
+     "year": 2019, "rating": 8.6, "tags": ["korean"], "cast": [{"name": "Song Kang-ho"}]},
+    {"id": "c2", "title": "Money Heist", "original_title": "La Casa de Papel",
+     "synopsis": "Robbers plan a heist on the family mint.", "country": "Spain",
+     "content_type": "series", "genres": ["Crime"], "year": 2017, "rating": 8.2, "tags": ["heist"],
+     "cast": [{"name": "Úrsula Corberó"}]},
+    {"id": "c3", "title": "Family Heist", "original_title": None, "synopsis": "A heist.",
+     "country": "Spain", "content_type": "movie", "genres": ["Comedy", "Crime"],
+     "year": 2021, "rating": None, "tags": []},
+    {"id": "c4", "title": "千と千尋の神隠し", "original_title": "Spirited Away", "synopsis": None,
+     "country": "Japan", "content_type": "movie", "genres": ["Animation"], "year": 2001, "rating": 8.6},
+]
+
+
+@pytest.fixture
+def index():
+    index = ContentIndex()
+    index.rebuild([dict(row) for row in ROWS])
+    return index
+
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_tokenize_splits_cjk_into_bigrams():
+    assert tokenize("Money Heist: 기생충") == ["money", "heist", "기생", "생충"]
+    assert tokenize("千と千尋") == ["千と", "と千", "千尋"]
+
+
+def test_text_match_requires_every_token(index):
+    rows, total = index.search("family heist")
+    assert sorted(ids(rows)) == ["c2", "c3"]
+    assert total == 2
+    # Title, tag and synopsis hits outrank a title-only hit
+    assert ids(index.search("heist", sort_by="relevance")[0]) == ["c2", "c3"]
+
+
+def test_last_token_matches_as_prefix(index):
+    assert ids(index.search("paras")[0]) == ["c1"]
+    assert ids(index.search("song kan")[0]) == ["c1"]
+
+
+def test_cjk_substring_and_cast_match(index):
+    assert ids(index.search("千尋")[0]) == ["c4"]
+    assert ids(index.search("생충")[0]) == ["c1"]
+    assert ids(index.search("corberó")[0]) == ["c2"]
+
+
+def test_bitset_filters(index):
+    assert ids(index.search(country="Spain")[0]) == ["c2", "c3"]
+    assert ids(index.search(genre="Crime", content_type="movie")[0]) == ["c3"]
+    assert ids(index.search(year_from=2010, year_to=2019)[0]) == ["c1", "c2"]
+    rows, total = index.search(rating_min=8.3)
+    assert sorted(ids(rows)) == ["c1", "c4"] and total == 2
+    assert index.search("heist", rating_max=8.2)[1] == 1
+
+
+def test_sort_and_pagination_keep_nulls_last(index):
+    assert ids(index.search(sort_order="asc")[0]) == ["c2", "c1", "c4", "c3"]
+    rows, total = index.search(sort_by="year", offset=1, limit=2)
+    assert ids(rows) == ["c1", "c2"] and total == 4
+
+
+def test_upsert_and_remove_update_postings_and_bitsets(index):
+    index.upsert([dict(ROWS[1], title="Bank Job", country="Korea")])
+    assert ids(index.search("money")[0]) == []
+    assert ids(index.search("bank")[0]) == ["c2"]
+    assert ids(index.search(country="Spain")[0]) == ["c3"]
+    index.remove(["c3"])
+    assert index.search(country="Spain")[1] == 0
+    assert "family" in index.postings and 3 not in index.postings["family"]
+
+
+@pytest.fixture
+def memory_engine(fake_db, monkeypatch):
+    fake_db.tables["content"] = [dict(row) for row in ROWS]
+    monkeypatch.setattr(server, "content_index", ContentIndex())
+    return fake_db
+
+
+def test_search_endpoint_served_from_memory_after_load(client, memory_engine):
+    client.get("/api/content/search", params={"query": "heist"})
+    response = client.get("/api/content/search", params={"query": "heist", "sort_by": "relevance"})
+    assert response.status_code == 200
+    assert ids(response.json()["contents"]) == ["c2", "c3"]
+    assert response.headers["X-Query-Count"] == "0"
+
+
+def test_admin_writes_keep_index_fresh(client, memory_engine):
+    client.get("/api/content/search")
+    payload = {"title": "Heist Night", "country": "Japan", "content_type": "movie", "year": 2020,
+               "synopsis": "", "genres": [], "rating": 7.0}
+    created = client.post("/api/admin/content", json=payload).json()
+    assert ids(client.get("/api/content/search", params={"query": "heist", "country": "Japan"}).json()["contents"]) == [created["id"]]
+
+    client.delete(f"/api/admin/content/{created['id']}")
+    assert client.get("/api/content/search", params={"query": "heist", "country": "Japan"}).json()["total"] == 0
+
+
+def test_updates_reuse_the_title_ordinal(index):
+    for rating in (7.0, 7.5, 9.5):
+        index.upsert([dict(ROWS[2], rating=rating, title="Family Heist Redux")])
+    assert len(index.rows) == len(ROWS) and len(index.doc_keys) == len(ROWS)
+    assert index.alive.bit_length() == len(ROWS)
+    assert ids(index.search(rating_min=9.0)[0]) == ["c3"]
+    assert index.search(rating_max=7.6)[1] == 0
+    assert ids(index.search("redux")[0]) == ["c3"]
+
+
+def test_writes_during_a_load_are_kept():
+    index = ContentIndex()
+    gate = asyncio.Event()
+
+    async def load_rows():
+        # Read before the writes below land
+        rows = [dict(row) for row in ROWS]
+        await gate.wait()
+        return rows
+
+    async def scenario():
+        load = asyncio.ensure_future(index.ensure_loaded(load_rows))
+        await asyncio.sleep(0)
+        index.upsert([{"id": "c5", "title": "Beta", "country": "Spain"}])
+        index.remove(["c1"])
+        gate.set()
+        await load
+
+    asyncio.run(scenario())
+    assert ids(index.search("beta")[0]) == ["c5"]
+    assert index.search("parasite") == ([], 0)
@@ -0,0 +1,33 @@
+import asyncio
+
+from typer.testing import CliRunner
+
+import manage
+from seed import SAMPLE_CONTENT, seed_sample_content
+
+
+def test_seeding_is_one_batched_idempotent_write(fake_db):
+    inserted = asyncio.run(seed_sample_content(fake_db, force=True))
+    assert len(inserted) == len(SAMPLE_CONTENT)
+    assert fake_db.queries == [("content", "upsert")]
+
+    # A second run, or a second machine racing the first, adds nothing
+    assert asyncio.run(seed_sample_content(fake_db, force=True)) == []
+    assert len(fake_db.tables["content"]) == len(SAMPLE_CONTENT)
+
+
+def test_seeding_skips_a_catalog_with_content(fake_db):
+    fake_db.tables["content"] = [{"id": "existing", "title": "Imported"}]
+    assert asyncio.run(seed_sample_content(fake_db)) == []
+    assert fake_db.queries == [("content", "select")]
+
+
+def test_seed_command(fake_db, monkeypatch):
+    monkeypatch.setattr(manage, "create_supabase", lambda: fake_db)
+    runner = CliRunner()
+    result = runner.invoke(manage.app, ["seed"])
+    assert result.exit_code == 0, result.output
+    assert f"Seeded {len(SAMPLE_CONTENT)} of {len(SAMPLE_CONTENT)}" in result.output
+    result = runner.invoke(manage.app, ["seed"])
+    assert "nothing seeded" in result.output
+    assert len(fake_db.tables["content"]) == len(SAMPLE_CONTENT)
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+import server
+from tests.conftest import BACKEND_DIR
+from tests.fake_supabase import FakeSupabase
+
+# Time from entering the app's lifespan to the first response
+STARTUP_BUDGET_SECONDS = 0.25
+
+
+def test_importing_the_api_does_not_load_heavy_dependencies():
+    probe = "import json, sys; import server; print(json.dumps([m for m in ('pandas', 'numpy', 'pyarrow') if m in sys.modules]))"
+    env = dict(os.environ, SUPABASE_URL="http://localhost:54321", SUPABASE_ANON_KEY="test-anon-key")
+    completed = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    assert json.loads(completed.stdout.splitlines()[-1]) == []
+
+
+def test_the_client_is_created_by_the_lifespan_hook(monkeypatch):
+    created = []
+    monkeypatch.setattr(server, "supabase", None)
+    monkeypatch.setattr(server, "create_client", lambda url, key: created.append(url) or FakeSupabase())
+    with TestClient(server.app):
+        assert isinstance(server.supabase, FakeSupabase)
+    assert created == [server.supabase_url]
+
+
+def test_startup_does_no_database_work_and_fits_the_budget(monkeypatch):
+    # Every query would cost more than the whole budget
+    fake = FakeSupabase(latency=STARTUP_BUDGET_SECONDS)
+    fake.tables["content"] = []
+    monkeypatch.setattr(server, "supabase", fake)
+    monkeypatch.setattr(server, "import_jobs", server.create_import_jobs())
+
+    start = time.perf_counter()
+    with TestClient(server.app) as client:
+        assert client.get("/api/").status_code == 200
+        elapsed = time.perf_counter() - start
+    assert fake.queries == []
+    assert elapsed < STARTUP_BUDGET_SECONDS
@@ -0,0 +1,93 @@
+import pytest
+
+import server
+from totals import TotalsCache, totals_key
+
+
+@pytest.fixture
+def catalog(fake_db):
+    fake_db.tables["content"] = [
+        {"id": f"c{i}", "title": f"Heist {i}" if i < 3 else f"Drama {i}", "country": "Spain",
+         "content_type": "movie", "rating": float(i), "created_at": f"2024-01-0{i + 1}"}
+        for i in range(8)
+    ]
+    return fake_db
+
+
+def test_content_total_respects_search(client, catalog):
+    body = client.get("/api/content", params={"search": "heist"}).json()
+    assert body["total"] == 3
+    assert client.get("/api/admin/content", params={"search": "drama"}).json()["total"] == 5
+
+
+def test_total_rides_on_page_request_then_comes_from_cache(client, catalog):
+    first = client.get("/api/content/search", params={"country": "Spain", "limit": 2})
+    assert first.json()["total"] == 8
+    assert first.headers["X-Query-Count"] == "1"
+    catalog.tables["content"].pop()
+    # Still cached: out-of-band writes show up after the TTL
+    second = client.get("/api/content/search", params={"country": "Spain", "limit": 2, "page": 2})
+    assert second.json()["total"] == 8
+    assert server.totals_cache.hits == 1
+
+
+def test_cursor_pages_count_separately_once(client, catalog):
+    first = client.get("/api/content", params={"limit": 3}).json()
+    response = client.get("/api/content", params={"limit": 3, "cursor": first["next_cursor"]})
+    assert response.json()["total"] == 8
+    assert response.headers["X-Query-Count"] == "1"
+
+    server.totals_cache.invalidate()
+    response = client.get("/api/content", params={"limit": 3, "cursor": first["next_cursor"]})
+    assert response.json()["total"] == 8
+    assert response.headers["X-Query-Count"] == "2"
+
+
+def test_include_total_false_skips_counting(client, catalog):
+    response = client.get("/api/content/search", params={"query": "heist", "include_total": "false"})
+    assert response.json()["total"] is None
+    assert server.totals_cache.stats()["size"] == 0
+
+
+def test_relevance_without_total_still_pages(client, catalog):
+    params = {"query": "heist", "sort_by": "relevance", "include_total": "false", "limit": 2}
+    first = client.get("/api/content/search", params=params).json()
+    second = client.get("/api/content/search", params={**params, "cursor": first["next_cursor"]}).json()
+    assert len(first["contents"]) + len(second["contents"]) == 3
+    assert second["next_cursor"] is None
+
+
+def test_count_mode_is_validated(client, catalog):
+    assert client.get("/api/content", params={"count_mode": "planned"}).json()["total"] == 8
+    assert client.get("/api/content", params={"count_mode": "roughly"}).status_code == 422
+
+
+def test_writes_invalidate_totals(client, catalog):
+    assert client.get("/api/content", params={"search": "heist"}).json()["total"] == 3
+    payload = {"title": "Heist Again", "synopsis": "", "year": 2024, "country": "Spain",
+               "content_type": "movie", "genres": [], "rating": 5}
+    client.post("/api/admin/content", json=payload)
+    assert client.get("/api/content", params={"search": "heist"}).json()["total"] == 4
+
+
+def test_cache_expiry_modes_and_invalidation(monkeypatch):
+    cache = TotalsCache(ttl=10)
+    now = [100.0]
+    monkeypatch.setattr("totals.time.monotonic", lambda: now[0])
+    key = totals_key(query="heist", country=None)
+    assert key == (("query", "heist"),)
+
+    cache.put("content", key, "exact", 3)
+    # An exact total also answers approximate lookups
+    assert cache.get("content", key, "planned") == 3
+    cache.put("content", key, "planned", 1000)
+    assert cache.get("content", key, "exact") == 3
+
+    now[0] += 11
+    assert cache.get("content", key, "exact") is None
+
+    cache.put("content", key, "exact", 3)
+    cache.put("reviews", key, "exact", 1)
+    cache.invalidate("content")
+    assert cache.get("content", key, "exact") is None
+    assert cache.get("reviews", key, "exact") == 1
@@ -0,0 +1,193 @@
+import asyncio
+import math
+import random
+
+import pytest
+
+import server
+from trending import TrendingEngine, _timestamp
+
+DAY = 86400.0
+NOW = 1_700_000_000.0
+
+
+def brute_force(events, period_seconds, now):
+    scores = {}
+    for content_id, weight, at in events:
+        scores[content_id] = scores.get(content_id, 0.0) + weight * math.exp(-(now - at) / period_seconds)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def test_periods_rank_recent_and_sustained_activity_differently():
+    engine = TrendingEngine()
+    for day in range(20):
+        for _ in range(3):
+            engine.record("steady", "view", at=NOW - day * DAY)
+    for _ in range(4):
+        engine.record("burst", "watchlist", at=NOW - 3600)
+    assert [content_id for content_id, _ in engine.top("day", 2, now=NOW)] == ["burst", "steady"]
+    assert [content_id for content_id, _ in engine.top("month", 2, now=NOW)] == ["steady", "burst"]
+    score = dict(engine.top("day", 2, now=NOW))["burst"]
+    assert score == pytest.approx(12 * math.exp(-1 / 24))
+
+
+def test_top_k_matches_a_full_sort():
+    rng = random.Random(3)
+    engine = TrendingEngine(top_k=10)
+    events = []
+    for i in range(5000):
+        content_id = f"c{int(rng.paretovariate(1.2)) % 300}"
+        kind = rng.choice(["view", "view", "view", "watchlist", "review"])
+        at = NOW - 7 * DAY + i * 100
+        engine.record(content_id, kind, at=at)
+        events.append((content_id, engine.weights[kind], at))
+    now = NOW - 7 * DAY + 5000 * 100
+    for period, seconds in (("day", DAY), ("week", 7 * DAY)):
+        expected = brute_force(events, seconds, now)[:10]
+        top = engine.top(period, 10, now=now)
+        assert [content_id for content_id, _ in top] == [content_id for content_id, _ in expected]
+        assert [score for _, score in top] == pytest.approx([score for _, score in expected])
+
+
+def test_scores_stay_finite_across_many_periods():
+    engine = TrendingEngine(windows={"minute": 60.0})
+    for i in range(200):
+        engine.record("a", "view", at=NOW + i * 60)
+    engine.record("b", "review", at=NOW + 199 * 60)
+    (leader, score), _ = engine.top("minute", 2, now=NOW + 199 * 60)
+    assert leader == "b" and score == pytest.approx(5.0)
+    assert engine.periods["minute"].landmark > NOW
+
+
+def test_deleted_titles_leave_the_rankings():
+    engine = TrendingEngine(top_k=2)
+    for content_id, count in (("a", 3), ("b", 2), ("c", 1)):
+        for _ in range(count):
+            engine.record(content_id, "view", at=NOW)
+    engine.forget(["a"])
+    assert [content_id for content_id, _ in engine.top("week", 2, now=NOW)] == ["b", "c"]
+
+
+class ScoreTable:
+    """What add_trending_scores does to trending_scores."""
+
+    def __init__(self):
+        self.rows = {}
+        self.fail = False
+
+    async def save(self, rows):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        for row in rows:
+            key = (row["content_id"], row["period"])
+            seconds = {"day": DAY, "week": 7 * DAY, "month": 30 * DAY}[row["period"]]
+            if key in self.rows:
+                old = self.rows[key]
+                elapsed = _timestamp(row["as_of"]) - _timestamp(old["as_of"])
+                row = dict(row, score=old["score"] * math.exp(-elapsed / seconds) + row["score"])
+            self.rows[key] = dict(row)
+
+    async def load(self):
+        return [dict(row) for row in self.rows.values()]
+
+
+def test_checkpoints_merge_every_workers_events():
+    table = ScoreTable()
+
+    async def scenario():
+        first, second = TrendingEngine(), TrendingEngine()
+        for _ in range(3):
+            first.record("parasite", "view")
+        second.record("parasite", "review")
+        second.record("roma", "watchlist")
+        await first.checkpoint(table.save, table.load)
+        await second.checkpoint(table.save, table.load)
+        await first.checkpoint(table.save, table.load)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    for engine in (first, second):
+        top = engine.top("week", 2)
+        assert [content_id for content_id, _ in top] == ["parasite", "roma"]
+        assert [score for _, score in top] == pytest.approx([8.0, 3.0], rel=1e-4)
+    assert first.stats()["pending"] == 0 and first.stats()["checkpoints"] == 2
+
+
+def test_scores_that_could_not_be_saved_go_out_next_time():
+    table = ScoreTable()
+
+    async def scenario():
+        engine = TrendingEngine()
+        engine.record("parasite", "review")
+        table.fail = True
+        with pytest.raises(RuntimeError):
+            await engine.checkpoint(table.save, table.load)
+        engine.record("parasite", "view")
+        table.fail = False
+        await engine.checkpoint(table.save, table.load)
+        return engine
+
+    engine = asyncio.run(scenario())
+    assert table.rows[("parasite", "day")]["score"] == pytest.approx(6.0, rel=1e-4)
+    assert engine.top("day", 1)[0][1] == pytest.approx(6.0, rel=1e-4)
+
+
+def test_scores_of_deleted_titles_are_not_retried():
+    table = ScoreTable()
+
+    class ForeignKeyViolation(Exception):
+        code = "23503"
+
+    async def scenario():
+        engine = TrendingEngine()
+        engine.record("deleted", "review")
+
+        async def save(rows):
+            raise ForeignKeyViolation("trending_scores_content_id_fkey")
+
+        await engine.checkpoint(save)
+        engine.record("parasite", "view")
+        await engine.checkpoint(table.save, table.load)
+        return engine
+
+    engine = asyncio.run(scenario())
+    assert {content_id for content_id, _ in table.rows} == {"parasite"}
+    assert engine.stats()["pending"] == 0 and engine.stats()["errors"] == 1
+
+
+def test_trending_endpoint_ranks_by_activity(client, fake_db):
+    fake_db.auth.add_user("token-u1", user_id="u1")
+    fake_db.tables["content"] = [
+        {"id": f"c{i}", "title": f"Title {i}", "rating": 9 - i, "created_at": "2024-01-01", "country": "Japan", "genres": []}
+        for i in range(4)
+    ]
+    headers = {"Authorization": "Bearer token-u1"}
+    for _ in range(2):
+        assert client.post("/api/analytics/view", params={"content_id": "c3"}, headers=headers).status_code == 200
+    assert client.post("/api/watchlist", json={"content_id": "c2"}, headers=headers).status_code == 200
+
+    body = client.get("/api/discovery/trending", params={"time_period": "day", "limit": 3}).json()["trending_content"]
+    assert [content["id"] for content in body] == ["c2", "c3", "c0"]
+    assert body[0]["trending_score"] == pytest.approx(3.0, rel=1e-3) and body[2]["trending_score"] is None
+
+    # Rankings and their rows are now in memory
+    response = client.get("/api/discovery/trending", params={"time_period": "day", "limit": 2})
+    assert response.headers["X-Query-Count"] == "0"
+    assert client.get("/api/discovery/trending", params={"time_period": "year"}).status_code == 422
+
+
+def test_full_row_cache_keeps_every_ranked_title(client, fake_db, monkeypatch):
+    monkeypatch.setattr(server, "TRENDING_ROWS_SIZE", 3)
+    fake_db.tables["content"] = [
+        {"id": f"c{i}", "title": f"Title {i}", "rating": 5, "created_at": "2024-01-01", "genres": []} for i in range(4)
+    ]
+    for i in range(3):
+        server.trending_engine.record(f"c{i}", "review")
+    assert len(client.get("/api/discovery/trending", params={"limit": 3}).json()["trending_content"]) == 3
+
+    # c3 overflows the row cache, which must not cost c0-c2 their place
+    for _ in range(2):
+        server.trending_engine.record("c3", "review")
+    body = client.get("/api/discovery/trending", params={"limit": 4}).json()["trending_content"]
+    assert [content["id"] for content in body][0] == "c3"
+    assert all(content["trending_score"] is not None for content in body)
@@ -0,0 +1,50 @@
+import pytest
+
+
+@pytest.fixture
+def headers(fake_db):
+    fake_db.auth.add_user("token-u1", user_id="u1")
+    fake_db.tables["content"] = [{"id": f"c{i}", "title": f"Title {i}"} for i in range(6)]
+    statuses = ["want_to_watch", "watching", "watching", "completed", "dropped"]
+    fake_db.tables["watchlist"] = [
+        {"id": i, "user_id": "u1", "content_id": f"c{i}", "status": status,
+         "created_at": f"2024-01-0{i + 1}", "updated_at": f"2024-01-0{i + 1}"}
+        for i, status in enumerate(statuses)
+    ]
+    fake_db.tables["watchlist"].append(
+        {"id": 99, "user_id": "u2", "content_id": "c5", "status": "watching",
+         "created_at": "2024-01-09", "updated_at": "2024-01-09"}
+    )
+    return {"Authorization": "Bearer token-u1"}
+
+
+EXPECTED_COUNTS = {"want_to_watch": 1, "watching": 2, "completed": 1, "dropped": 1}
+
+
+def test_watchlist_page_uses_two_queries(client, headers):
+    response = client.get("/api/watchlist", params={"limit": 2}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 5
+    assert len(body["items"]) == 2
+    assert body["items"][0]["content"]["title"] == "Title 4"
+    assert body["status_counts"] == EXPECTED_COUNTS
+    assert int(response.headers["X-Query-Count"]) <= 2
+
+
+def test_watchlist_status_filter_keeps_overall_counts(client, headers):
+    response = client.get("/api/watchlist", params={"status": "watching"}, headers=headers)
+    body = response.json()
+    assert body["total"] == 2
+    assert body["status_counts"] == EXPECTED_COUNTS
+    assert int(response.headers["X-Query-Count"]) <= 2
+
+
+def test_watchlist_stats_uses_two_queries(client, headers):
+    response = client.get("/api/watchlist/stats", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status_counts"] == EXPECTED_COUNTS
+    assert body["total_content"] == 5
+    assert len(body["recent_activity"]) == 5
+    assert int(response.headers["X-Query-Count"]) <= 2